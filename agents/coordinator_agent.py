@@ -3,39 +3,276 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from typing import Dict, Any
-from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from datetime import date as date_cls, datetime
 
-from nest import Agent, tool
+from nest import Agent, codec, tool
+from utils.festival_calendar import get_calendar
+from utils.memo import LRUMemo, file_fingerprint
+from utils.metrics import Counter, Histogram, register_cache
 
-from agents.data_agent import collect_all_data
+from agents.data_agent import collect_all_data, collect_batch_data
 from agents.pollution_agent import predict_pollution_impact
 from agents.festival_agent import predict_festival_impact
 from agents.disease_agent import analyze_disease_season
-from agents.predictor_agent import predict_hospital_load
+from agents.predictor_agent import predict_hospital_load, predict_hospital_load_batch
 from agents.ops_agent import generate_resource_plan
 
 
+# Memoized pipeline results. Entries for past dates built from real upstream
+# data never change; forecast dates and synthetic/fallback inputs expire
+# after PIPELINE_MEMO_TTL seconds so fresher upstream data gets picked up.
+PIPELINE_MEMO_SIZE = int(os.getenv("PIPELINE_MEMO_SIZE", "4096"))
+PIPELINE_MEMO_TTL = float(os.getenv("PIPELINE_MEMO_TTL", "900"))
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules whose code determines a result given the collected data
+_RULE_FILES = [
+    os.path.join(_ROOT, "agents", name)
+    for name in (
+        "coordinator_agent.py", "data_agent.py", "pollution_agent.py", "festival_agent.py",
+        "disease_agent.py", "predictor_agent.py", "ops_agent.py",
+    )
+] + [os.path.join(_ROOT, "utils", name) for name in ("model_helpers.py", "preprocessor.py")]
+RULES_FINGERPRINT = file_fingerprint(_RULE_FILES)
+_MEMO = LRUMemo(PIPELINE_MEMO_SIZE)
+
+STAGE_SECONDS = Histogram("pipeline_stage_seconds", "Latency of each prediction pipeline stage", ["stage"])
+PIPELINE_RUNS = Counter("pipeline_runs_total", "run_prediction_pipeline calls by result", ["result"])
+register_cache("pipeline_memo", lambda: (_MEMO.hits, _MEMO.misses))
+
+# ?view=compact on the API and nest servers: the prediction, requirements and
+# summary without the echoed data bundle and the per-agent details, which
+# prediction.drivers repeats
+COMPACT_FIELDS = (
+    "city", "date", "generated_at", "freshness",
+    "prediction.loads", "prediction.risk_level", "prediction.combined_severity", "prediction.confidence",
+    "operations.resource_plan.requirements", "summary",
+)
+codec.register_view("compact", COMPACT_FIELDS)
+
+
+def pipeline_version() -> str:
+    """Fingerprint of the rule code and reference data behind a result."""
+    return f"{RULES_FINGERPRINT}-{get_calendar().version}"
+
+
+def uses_fallback_data(data_payload: Dict[str, Any]) -> bool:
+    """True when collection failed or fell back to synthetic pollution/weather."""
+    if "error" in data_payload:
+        return True
+    sources = (data_payload.get("pollution", {}).get("source"), data_payload.get("weather", {}).get("source"))
+    return "synthetic" in sources
+
+
+def _memo_ttl(date: str, data_payload: Dict[str, Any]) -> float:
+    if uses_fallback_data(data_payload) or date >= date_cls.today().isoformat():
+        return PIPELINE_MEMO_TTL
+    return None
+
+
 @tool
 def run_prediction_pipeline(city: str, date: str) -> Dict[str, Any]:
-    """Run the full multi-agent pipeline and return consolidated prediction."""
-    data_payload = collect_all_data(city=city, date=date)
-    pollution_output = predict_pollution_impact(data_payload.get("pollution", {}))
-    festival_output = predict_festival_impact(
-        festivals=data_payload.get("festivals", []), date=date
-    )
-    disease_output = analyze_disease_season(
-        health_data=data_payload.get("health", {}), date=date
-    )
-    predictor_output = predict_hospital_load(
-        data_bundle=data_payload,
-        pollution_output=pollution_output,
-        festival_output=festival_output,
-        disease_output=disease_output,
-    )
-    ops_output = generate_resource_plan(load_prediction=predictor_output)
+    """Run the full multi-agent pipeline and return consolidated prediction.
+
+    Results are memoized per (city, date, pipeline version); repeated calls
+    return the same result object, which callers must not mutate.
+    """
+    key = (city, date, pipeline_version())
+    result = _MEMO.get(key)
+    if result is not None:
+        PIPELINE_RUNS.inc("memo_hit")
+        return result
+    with STAGE_SECONDS.time("total"):
+        with STAGE_SECONDS.time("collect"):
+            data_payload = collect_all_data(city=city, date=date)
+        result = _run_agents(city, date, data_payload)
+    _MEMO.put(key, result, ttl=_memo_ttl(date, data_payload))
+    PIPELINE_RUNS.inc("computed")
+    return result
+
+
+def cached_prediction(city: str, date: str) -> Optional[Dict[str, Any]]:
+    """Memoized result for (city, date) if there is one; never computes."""
+    result = _MEMO.get((city, date, pipeline_version()), count_miss=False)
+    if result is not None:
+        PIPELINE_RUNS.inc("memo_hit")
+    return result
+
+
+def memo_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the pipeline memo."""
+    return {**_MEMO.stats(), "pipeline_version": pipeline_version()}
+
+
+@tool
+def run_batch_pipeline(items: List[Dict[str, str]]) -> Dict[str, Any]:
+    """Run the pipeline for many (city, date) pairs in one pass.
+
+    Upstream data is fetched once per city date window, festival impact is
+    computed once per distinct date and festival list, the load rules are
+    evaluated for the whole batch in one vectorized pass, and failures are
+    reported per item instead of aborting the whole batch.
+
+    Args:
+        items: List of {"city": ..., "date": ...} dictionaries
+
+    Returns:
+        Dictionary with ``results[city][date]`` and ``errors[city][date]``
+    """
+    pairs: List[Tuple[str, str]] = []
+    seen = set()
+    for item in items:
+        pair = (item["city"], item["date"])
+        if pair not in seen:
+            seen.add(pair)
+            pairs.append(pair)
+
+    with STAGE_SECONDS.time("batch_collect"):
+        payloads = collect_batch_data(pairs)
+    festival_outputs: Dict[Tuple, Dict[str, Any]] = {}
+
+    results: Dict[str, Dict[str, Any]] = {}
+    errors: Dict[str, Dict[str, str]] = {}
+
+    # Per-item impact analysis; festival impact is shared by every item
+    # with the same date and festival list
+    analyzed = []
+    for city, date in pairs:
+        try:
+            data_payload = payloads[(city, date)]
+            festivals = data_payload.get("festivals", [])
+            key = (date, tuple(tuple(sorted(f.items())) for f in festivals))
+            if key not in festival_outputs:
+                with STAGE_SECONDS.time("festival"):
+                    festival_outputs[key] = predict_festival_impact(festivals=festivals, date=date)
+            outputs = _analyze(date, data_payload, festival_output=festival_outputs[key])
+            analyzed.append((city, date, data_payload, outputs))
+        except Exception as exc:
+            errors.setdefault(city, {})[date] = str(exc)
+
+    # Load rules evaluated across the whole batch in one vectorized pass
+    try:
+        with STAGE_SECONDS.time("batch_predict"):
+            predictions = predict_hospital_load_batch(
+                [(data_payload, *outputs) for _, _, data_payload, outputs in analyzed]
+            )
+    except Exception as exc:
+        # one bad item must not fail the batch: predict each item on its own
+        print(f"Batch prediction failed, predicting items one by one: {exc}")
+        predictions = None
+
+    for index, (city, date, data_payload, outputs) in enumerate(analyzed):
+        try:
+            if predictions is not None:
+                predictor_output = predictions[index]
+            else:
+                pollution_output, festival_output, disease_output = outputs
+                with STAGE_SECONDS.time("predict"):
+                    predictor_output = predict_hospital_load(
+                        data_bundle=data_payload,
+                        pollution_output=pollution_output,
+                        festival_output=festival_output,
+                        disease_output=disease_output,
+                    )
+            results.setdefault(city, {})[date] = _finalize(
+                city, date, data_payload, outputs, predictor_output
+            )
+        except Exception as exc:
+            errors.setdefault(city, {})[date] = str(exc)
+
+    return {
+        "results": results,
+        "errors": errors,
+        "count": len(pairs),
+        "failed": sum(len(v) for v in errors.values()),
+        "generated_at": datetime.utcnow().isoformat() + "Z",
+    }
+
+
+def iter_batch_pipeline(
+    items: List[Dict[str, str]], chunk_size: int = 16
+) -> Iterator[Tuple[str, str, Optional[Dict[str, Any]], Optional[str]]]:
+    """Run a large batch in chunks, yielding each item as its chunk finishes.
+
+    Pairs are processed in request order, ``chunk_size`` at a time, through
+    ``run_batch_pipeline``, so the first results are available after one chunk
+    and only one chunk's results are held in memory at once.
+
+    Yields:
+        (city, date, result, error) tuples; exactly one of result/error is set
+    """
+    pairs: List[Tuple[str, str]] = []
+    seen = set()
+    for item in items:
+        pair = (item["city"], item["date"])
+        if pair not in seen:
+            seen.add(pair)
+            pairs.append(pair)
+
+    for offset in range(0, len(pairs), chunk_size):
+        chunk = pairs[offset:offset + chunk_size]
+        try:
+            batch = run_batch_pipeline([{"city": city, "date": date} for city, date in chunk])
+        except Exception as exc:
+            for city, date in chunk:
+                yield city, date, None, str(exc)
+            continue
+        for city, date in chunk:
+            error = batch["errors"].get(city, {}).get(date)
+            result = batch["results"].get(city, {}).get(date)
+            if result is None and error is None:
+                error = "no result produced"
+            yield city, date, result, error
+
+
+def _analyze(
+    date: str,
+    data_payload: Dict[str, Any],
+    festival_output: Dict[str, Any] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """Run the pollution, festival and disease agents over a data payload."""
+    with STAGE_SECONDS.time("pollution"):
+        pollution_output = predict_pollution_impact(data_payload.get("pollution", {}))
+    if festival_output is None:
+        with STAGE_SECONDS.time("festival"):
+            festival_output = predict_festival_impact(
+                festivals=data_payload.get("festivals", []), date=date
+            )
+    with STAGE_SECONDS.time("disease"):
+        disease_output = analyze_disease_season(
+            health_data=data_payload.get("health", {}), date=date
+        )
+    return pollution_output, festival_output, disease_output
+
+
+def _run_agents(city: str, date: str, data_payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Run the analysis agents over an already collected data payload."""
+    outputs = _analyze(date, data_payload)
+    pollution_output, festival_output, disease_output = outputs
+    with STAGE_SECONDS.time("predict"):
+        predictor_output = predict_hospital_load(
+            data_bundle=data_payload,
+            pollution_output=pollution_output,
+            festival_output=festival_output,
+            disease_output=disease_output,
+        )
+    return _finalize(city, date, data_payload, outputs, predictor_output)
+
+
+def _finalize(
+    city: str,
+    date: str,
+    data_payload: Dict[str, Any],
+    outputs: Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]],
+    predictor_output: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Generate the resource plan and summary and assemble the final result."""
+    pollution_output, festival_output, disease_output = outputs
+    with STAGE_SECONDS.time("operations"):
+        ops_output = generate_resource_plan(load_prediction=predictor_output)
 
-    summary = build_summary(city, predictor_output, pollution_output, festival_output, disease_output)
+    with STAGE_SECONDS.time("summary"):
+        summary = build_summary(city, predictor_output, pollution_output, festival_output, disease_output)
 
     return {
         "city": city,
@@ -86,7 +323,7 @@ coordinator_agent = Agent(
         "Coordinates data collection, pollution/festival/disease analysis, overall prediction, "
         "and operational planning. Returns consolidated JSON and narrative summary."
     ),
-    tools=[run_prediction_pipeline],
+    tools=[run_prediction_pipeline, run_batch_pipeline],
 )
 
 if __name__ == "__main__":
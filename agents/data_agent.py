@@ -3,61 +3,241 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-import requests
+import hashlib
 import json
+import time
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 import random
+from concurrent.futures import ThreadPoolExecutor, wait
 from nest import Agent, tool
 from utils.preprocessor import clean_pollution_data, normalize_weather_data, normalize_festival_data
+from utils.data_cache import open_default_cache
+from utils.festival_calendar import FESTIVAL_WINDOW_DAYS, get_calendar
+from utils.metrics import Counter, Histogram, register_cache
+from utils.singleflight import SingleFlight
+from utils import http_client
 
 
-# Festival calendar for India (2024-2025)
-FESTIVAL_CALENDAR = {
-    "2024-10-31": {"name": "Diwali", "type": "religious", "impact_score": 0.8},
-    "2024-11-01": {"name": "Diwali", "type": "religious", "impact_score": 0.8},
-    "2024-11-12": {"name": "Diwali", "type": "religious", "impact_score": 0.7},
-    "2025-03-14": {"name": "Holi", "type": "religious", "impact_score": 0.6},
-    "2025-03-15": {"name": "Holi", "type": "religious", "impact_score": 0.6},
-    "2024-09-07": {"name": "Ganpati", "type": "religious", "impact_score": 0.7},
-    "2024-09-08": {"name": "Ganpati", "type": "religious", "impact_score": 0.7},
-    "2024-06-16": {"name": "Eid al-Adha", "type": "religious", "impact_score": 0.5},
-    "2024-10-03": {"name": "Navratri Start", "type": "religious", "impact_score": 0.6},
-    "2024-10-12": {"name": "Navratri End", "type": "religious", "impact_score": 0.6},
-}
+# Concurrent collection: all sources are fetched in parallel under one deadline
+CONCURRENT_COLLECTION = os.getenv("DATA_AGENT_CONCURRENT", "1") != "0"
+COLLECTION_DEADLINE = float(os.getenv("DATA_AGENT_DEADLINE", "6"))
+_FETCH_POOL = ThreadPoolExecutor(
+    max_workers=int(os.getenv("DATA_AGENT_WORKERS", "16")),
+    thread_name_prefix="data-agent",
+)
+
+# Range fetching: dates closer than RANGE_MAX_GAP_DAYS share one upstream
+# request, capped at RANGE_MAX_DAYS per request
+RANGE_MAX_GAP_DAYS = int(os.getenv("DATA_AGENT_RANGE_MAX_GAP", "7"))
+RANGE_MAX_DAYS = int(os.getenv("DATA_AGENT_RANGE_MAX_DAYS", "92"))
+
+# Last day each endpoint serves, in days from today; it rejects ranges past
+# that with a 400, so later days are left to the synthetic fallback
+AIR_QUALITY_HORIZON_DAYS = int(os.getenv("OPEN_METEO_AIR_QUALITY_DAYS", "7"))
+WEATHER_HORIZON_DAYS = int(os.getenv("OPEN_METEO_FORECAST_DAYS", "16"))
+
+# Upstream endpoints; point these at benchmarks/upstream_server.py for load tests
+AIR_QUALITY_URL = os.getenv("OPEN_METEO_AIR_QUALITY_URL", "https://air-quality-api.open-meteo.com/v1/air-quality")
+FORECAST_URL = os.getenv("OPEN_METEO_FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+
+# Persistent cache of per-day upstream records (None when disabled)
+POLLUTION_VARIABLES = "pm10,pm2_5"
+WEATHER_VARIABLES = "temperature_2m_max,temperature_2m_min,precipitation_sum"
+_CACHE = open_default_cache()
+
+# Upstream instrumentation, exposed on /metrics
+UPSTREAM_REQUESTS = Counter(
+    "upstream_requests_total", "Open-Meteo requests by outcome", ["source", "outcome"]
+)
+UPSTREAM_SECONDS = Histogram("upstream_request_seconds", "Open-Meteo request latency", ["source"])
+UPSTREAM_RECORDS = Counter(
+    "upstream_records_total", "Per-day records served, by origin (cache, api, synthetic)", ["source", "origin"]
+)
+if _CACHE is not None:
+    register_cache("upstream", lambda: (_CACHE.hits, _CACHE.misses))
+
+# Concurrent collections for the same (city, date) share one set of upstream calls
+_COLLECT_FLIGHT = SingleFlight("collect_all_data")
+
+
+def synthetic_rng(city: str, date: str, source: str) -> random.Random:
+    """Random generator seeded by (city, date, source).
+    
+    Synthetic values are a pure function of their inputs, so repeated
+    collections for the same city and day produce identical payloads.
+    """
+    seed = hashlib.sha256(f"{city}|{date}|{source}".encode("utf-8")).digest()
+    return random.Random(int.from_bytes(seed[:8], "big"))
 
 
 def fetch_pollution_data(city: str, date: str) -> Dict[str, Any]:
     """Fetch pollution data from Open-Meteo or generate synthetic data."""
+    return fetch_pollution_range(city, date, date)[date]
+
+
+def fetch_pollution_range(city: str, start_date: str, end_date: str) -> Dict[str, Dict[str, Any]]:
+    """Fetch pollution for a whole date window in one Open-Meteo request.
+    
+    Days already in the persistent cache are served from it; the remaining
+    span, up to the endpoint's forecast horizon, is fetched in one request and
+    its hourly PM readings are sliced into per-day records keyed by date. Days missing from the response (or the
+    whole window, if the request fails) fall back to synthetic data.
+    """
+    days = _date_range(start_date, end_date)
+    latitude, longitude = get_city_coords(city)
+    records = _cache_get("air-quality", latitude, longitude, POLLUTION_VARIABLES, days)
+    cached = len(records)
+    missing = _within_horizon([day for day in days if day not in records], AIR_QUALITY_HORIZON_DAYS)
+    if missing:
+        fetched = _request_pollution(latitude, longitude, missing[0], missing[-1])
+        _cache_put("air-quality", latitude, longitude, POLLUTION_VARIABLES, fetched)
+        records.update(fetched)
+    _count_origins("air-quality", days, cached, records)
+    
+    # Fallback: Generate synthetic data based on city and season
+    return {
+        day: records[day] if day in records else generate_synthetic_pollution(city, day)
+        for day in days
+    }
+
+
+def _request_pollution(latitude: float, longitude: float, start_date: str, end_date: str) -> Dict[str, Dict[str, Any]]:
+    """Request Open-Meteo air quality for a window; returns only days with data."""
+    records = {}
     try:
         # Try Open-Meteo Air Quality API
-        url = "https://air-quality-api.open-meteo.com/v1/air-quality"
+        url = AIR_QUALITY_URL
         params = {
-            "latitude": get_city_coords(city)[0],
-            "longitude": get_city_coords(city)[1],
-            "hourly": "pm10,pm2_5",
-            "start_date": date,
-            "end_date": date
+            "latitude": latitude,
+            "longitude": longitude,
+            "hourly": POLLUTION_VARIABLES,
+            "start_date": start_date,
+            "end_date": end_date
         }
-        response = requests.get(url, params=params, timeout=5)
+        response = _timed_get("air-quality", url, params)
         if response.status_code == 200:
             data = response.json()
             hourly = data.get('hourly', {})
-            if hourly.get('pm2_5') and hourly.get('pm10'):
-                pm25 = sum(hourly['pm2_5']) / len(hourly['pm2_5'])
-                pm10 = sum(hourly['pm10']) / len(hourly['pm10'])
-                aqi = calculate_aqi(pm25, pm10)
-                return {
-                    "aqi": aqi,
-                    "pm25": pm25,
-                    "pm10": pm10,
-                    "source": "open-meteo"
-                }
+            by_day = _group_hourly_by_day(hourly, ('pm2_5', 'pm10'))
+            for day, values in by_day.items():
+                if values['pm2_5'] and values['pm10']:
+                    pm25 = sum(values['pm2_5']) / len(values['pm2_5'])
+                    pm10 = sum(values['pm10']) / len(values['pm10'])
+                    aqi = calculate_aqi(pm25, pm10)
+                    records[day] = {
+                        "aqi": aqi,
+                        "pm25": pm25,
+                        "pm10": pm10,
+                        "source": "open-meteo"
+                    }
     except Exception as e:
         print(f"Open-Meteo API failed: {e}")
+    return records
+
+
+def _timed_get(source: str, url: str, params: Dict[str, Any]):
+    """GET an Open-Meteo endpoint, recording latency and outcome."""
+    started = time.perf_counter()
+    try:
+        # bounded as a whole so retries can't outlast the collection deadline
+        response = http_client.get(url, params=params, timeout=5, deadline=COLLECTION_DEADLINE)
+    except Exception:
+        UPSTREAM_REQUESTS.inc(source, "error")
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - started, source)
+    UPSTREAM_REQUESTS.inc(source, "ok" if response.status_code == 200 else f"http_{response.status_code}")
+    return response
+
+
+def _count_origins(source: str, days: List[str], cached: int, records: Dict[str, Any]) -> None:
+    served = sum(1 for day in days if day in records)
+    if cached:
+        UPSTREAM_RECORDS.inc(source, "cache", amount=cached)
+    if served > cached:
+        UPSTREAM_RECORDS.inc(source, "api", amount=served - cached)
+    if len(days) > served:
+        UPSTREAM_RECORDS.inc(source, "synthetic", amount=len(days) - served)
+
+
+def _cache_get(source: str, latitude: float, longitude: float, variables: str, days: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Look up cached per-day records; cache errors are treated as misses."""
+    if _CACHE is None:
+        return {}
+    try:
+        return _CACHE.get_many(source, latitude, longitude, variables, days)
+    except Exception as e:
+        print(f"Upstream cache read failed: {e}")
+        return {}
+
+
+def _cache_put(source: str, latitude: float, longitude: float, variables: str, records: Dict[str, Dict[str, Any]]) -> None:
+    """Store upstream per-day records; synthetic fallbacks are never cached."""
+    if _CACHE is None:
+        return
+    try:
+        _CACHE.put_many(source, latitude, longitude, variables, records)
+    except Exception as e:
+        print(f"Upstream cache write failed: {e}")
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Return persistent upstream cache counters."""
+    if _CACHE is None:
+        return {"enabled": False}
+    return {"enabled": True, **_CACHE.stats()}
+
+
+def _group_hourly_by_day(hourly: Dict[str, Any], variables: Tuple[str, ...]) -> Dict[str, Dict[str, List[float]]]:
+    """Split Open-Meteo hourly arrays into per-day value lists, dropping nulls."""
+    times = hourly.get('time') or []
+    by_day: Dict[str, Dict[str, List[float]]] = {}
+    for index, stamp in enumerate(times):
+        day = by_day.setdefault(stamp[:10], {var: [] for var in variables})
+        for var in variables:
+            series = hourly.get(var) or []
+            if index < len(series) and series[index] is not None:
+                day[var].append(series[index])
+    return by_day
+
+
+def _date_range(start_date: str, end_date: str) -> List[str]:
+    """Inclusive list of YYYY-MM-DD dates between start_date and end_date."""
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    days = (datetime.strptime(end_date, "%Y-%m-%d") - start).days
+    return [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days + 1)]
+
+
+def _within_horizon(days: List[str], horizon_days: int) -> List[str]:
+    """The days an endpoint can serve: no later than today + horizon_days."""
+    last = (datetime.utcnow() + timedelta(days=horizon_days)).strftime("%Y-%m-%d")
+    return [day for day in days if day <= last]
+
+
+def _date_windows(dates: List[str], max_gap: int = None, max_days: int = None) -> List[Tuple[str, str]]:
+    """Group dates into contiguous (start, end) fetch windows.
     
-    # Fallback: Generate synthetic data based on city and season
-    return generate_synthetic_pollution(city, date)
+    A new window starts when the next date is more than max_gap days after
+    the previous one, or when the window would exceed max_days.
+    """
+    if max_gap is None:
+        max_gap = RANGE_MAX_GAP_DAYS
+    if max_days is None:
+        max_days = RANGE_MAX_DAYS
+    windows: List[Tuple[str, str]] = []
+    ordered = sorted(set(dates))
+    if not ordered:
+        return windows
+    start = prev = datetime.strptime(ordered[0], "%Y-%m-%d")
+    for value in ordered[1:]:
+        current = datetime.strptime(value, "%Y-%m-%d")
+        if (current - prev).days > max_gap or (current - start).days >= max_days:
+            windows.append((start.strftime("%Y-%m-%d"), prev.strftime("%Y-%m-%d")))
+            start = current
+        prev = current
+    windows.append((start.strftime("%Y-%m-%d"), prev.strftime("%Y-%m-%d")))
+    return windows
 
 
 def get_city_coords(city: str) -> tuple:
@@ -112,10 +292,11 @@ def generate_synthetic_pollution(city: str, date: str) -> Dict[str, Any]:
     elif month in [3, 4, 5]:  # Summer
         base_aqi += 20
     
-    # Add random variation
-    aqi = base_aqi + random.randint(-20, 40)
-    pm25 = aqi * 0.6 + random.randint(-10, 20)
-    pm10 = aqi * 0.8 + random.randint(-15, 25)
+    # Add random variation (deterministic per city and date)
+    rng = synthetic_rng(city, date, "pollution")
+    aqi = base_aqi + rng.randint(-20, 40)
+    pm25 = aqi * 0.6 + rng.randint(-10, 20)
+    pm10 = aqi * 0.8 + rng.randint(-15, 25)
     
     return {
         "aqi": max(50, min(400, aqi)),
@@ -127,68 +308,100 @@ def generate_synthetic_pollution(city: str, date: str) -> Dict[str, Any]:
 
 def fetch_weather_data(city: str, date: str) -> Dict[str, Any]:
     """Fetch weather data from Open-Meteo or generate synthetic."""
+    return fetch_weather_range(city, date, date)[date]
+
+
+def fetch_weather_range(city: str, start_date: str, end_date: str) -> Dict[str, Dict[str, Any]]:
+    """Fetch daily weather for a whole date window in one Open-Meteo request.
+    
+    Cached days are served from the persistent cache; the request stops at the
+    endpoint's forecast horizon. Returns per-day records
+    keyed by date; days missing from the response fall back to synthetic data.
+    """
+    days = _date_range(start_date, end_date)
+    latitude, longitude = get_city_coords(city)
+    records = _cache_get("forecast", latitude, longitude, WEATHER_VARIABLES, days)
+    cached = len(records)
+    missing = _within_horizon([day for day in days if day not in records], WEATHER_HORIZON_DAYS)
+    if missing:
+        fetched = _request_weather(latitude, longitude, missing[0], missing[-1])
+        _cache_put("forecast", latitude, longitude, WEATHER_VARIABLES, fetched)
+        records.update(fetched)
+    _count_origins("forecast", days, cached, records)
+    
+    # Fallback: Synthetic data
+    return {
+        day: records[day] if day in records else generate_synthetic_weather(city, day)
+        for day in days
+    }
+
+
+def _request_weather(latitude: float, longitude: float, start_date: str, end_date: str) -> Dict[str, Dict[str, Any]]:
+    """Request Open-Meteo daily weather for a window; returns only days with data."""
+    records = {}
     try:
-        coords = get_city_coords(city)
-        url = "https://api.open-meteo.com/v1/forecast"
+        url = FORECAST_URL
         params = {
-            "latitude": coords[0],
-            "longitude": coords[1],
-            "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum",
-            "start_date": date,
-            "end_date": date,
+            "latitude": latitude,
+            "longitude": longitude,
+            "daily": WEATHER_VARIABLES,
+            "start_date": start_date,
+            "end_date": end_date,
             "timezone": "Asia/Kolkata"
         }
-        response = requests.get(url, params=params, timeout=5)
+        response = _timed_get("forecast", url, params)
         if response.status_code == 200:
             data = response.json()
             daily = data.get('daily', {})
-            if daily.get('temperature_2m_max'):
-                return {
-                    "temperature": (daily['temperature_2m_max'][0] + daily['temperature_2m_min'][0]) / 2,
-                    "humidity": random.randint(40, 80),
-                    "precipitation": daily.get('precipitation_sum', [0])[0],
-                    "wind_speed": random.uniform(5, 15),
+            times = daily.get('time') or [start_date]
+            t_max = daily.get('temperature_2m_max') or []
+            t_min = daily.get('temperature_2m_min') or []
+            precipitation = daily.get('precipitation_sum') or []
+            for index, day in enumerate(times):
+                if index >= len(t_max) or index >= len(t_min):
+                    break
+                if t_max[index] is None or t_min[index] is None:
+                    continue
+                # humidity and wind aren't requested; fill them deterministically
+                rng = synthetic_rng(f"{latitude},{longitude}", day, "weather-extras")
+                records[day] = {
+                    "temperature": (t_max[index] + t_min[index]) / 2,
+                    "humidity": rng.randint(40, 80),
+                    "precipitation": precipitation[index] if index < len(precipitation) and precipitation[index] is not None else 0,
+                    "wind_speed": rng.uniform(5, 15),
                     "source": "open-meteo"
                 }
     except Exception as e:
         print(f"Weather API failed: {e}")
-    
-    # Fallback: Synthetic data
+    return records
+
+
+def generate_synthetic_weather(city: str, date: str) -> Dict[str, Any]:
+    """Generate synthetic weather data (deterministic per city and date)."""
+    rng = synthetic_rng(city, date, "weather")
     month = int(date.split("-")[1])
     if month in [4, 5, 6]:  # Summer
-        temp = random.uniform(35, 45)
+        temp = rng.uniform(35, 45)
     elif month in [11, 12, 1, 2]:  # Winter
-        temp = random.uniform(15, 25)
+        temp = rng.uniform(15, 25)
     else:
-        temp = random.uniform(25, 35)
+        temp = rng.uniform(25, 35)
     
     return {
         "temperature": temp,
-        "humidity": random.randint(50, 90),
-        "precipitation": random.uniform(0, 20),
-        "wind_speed": random.uniform(5, 20),
+        "humidity": rng.randint(50, 90),
+        "precipitation": rng.uniform(0, 20),
+        "wind_speed": rng.uniform(5, 20),
         "source": "synthetic"
     }
 
 
-def fetch_festival_data(date: str) -> List[Dict[str, Any]]:
-    """Fetch festival data for the given date."""
-    festivals = []
-    
-    # Check exact date
-    if date in FESTIVAL_CALENDAR:
-        festivals.append(FESTIVAL_CALENDAR[date])
+def fetch_festival_data(date: str, city: str = None) -> List[Dict[str, Any]]:
+    """Fetch festivals on or within 2 days of the given date.
     
-    # Check nearby dates (within 2 days)
-    date_obj = datetime.strptime(date, "%Y-%m-%d")
-    for i in range(-2, 3):
-        check_date = (date_obj + timedelta(days=i)).strftime("%Y-%m-%d")
-        if check_date in FESTIVAL_CALENDAR and check_date != date:
-            fest = FESTIVAL_CALENDAR[check_date].copy()
-            fest['days_away'] = i
-            festivals.append(fest)
-    
-    return festivals
+    National festivals always apply; regional ones only when city matches.
+    """
+    return get_calendar().window(date, days=FESTIVAL_WINDOW_DAYS, city=city)
 
 
 def fetch_health_data(city: str, date: str) -> Dict[str, Any]:
@@ -209,48 +422,185 @@ def fetch_health_data(city: str, date: str) -> Dict[str, Any]:
     }
 
 
+def _gather_sources(city: str, date: str, deadline: float = None) -> Tuple[Dict[str, Any], Dict[str, Any], List[Dict[str, Any]], Dict[str, Any]]:
+    """Fetch pollution, weather, festival and health data concurrently.
+    
+    All four sources run on the shared fetch pool and are awaited under a
+    single deadline, so latency is set by the slowest source rather than the
+    sum. Sources that fail or miss the deadline fall back to synthetic data.
+    """
+    if deadline is None:
+        deadline = COLLECTION_DEADLINE
+    futures = {
+        "pollution": _FETCH_POOL.submit(fetch_pollution_data, city, date),
+        "weather": _FETCH_POOL.submit(fetch_weather_data, city, date),
+        "festivals": _FETCH_POOL.submit(fetch_festival_data, date, city),
+        "health": _FETCH_POOL.submit(fetch_health_data, city, date),
+    }
+    wait(futures.values(), timeout=deadline)
+    
+    fallbacks = {
+        "pollution": lambda: generate_synthetic_pollution(city, date),
+        "weather": lambda: generate_synthetic_weather(city, date),
+        "festivals": lambda: [],
+        "health": lambda: fetch_health_data(city, date),
+    }
+    results = {}
+    for name, future in futures.items():
+        if future.done() and future.exception() is None:
+            results[name] = future.result()
+        else:
+            reason = "deadline exceeded" if not future.done() else future.exception()
+            print(f"{name} source failed for {city} {date}: {reason}")
+            future.cancel()
+            results[name] = fallbacks[name]()
+    return results["pollution"], results["weather"], results["festivals"], results["health"]
+
+
 @tool
-def collect_all_data(city: str, date: str) -> Dict[str, Any]:
+def collect_all_data(city: str, date: str, concurrent: bool = None) -> Dict[str, Any]:
     """Collect all external data: pollution, weather, festivals, health.
     
     Args:
         city: City name (e.g., "Mumbai", "Delhi")
         date: Date in YYYY-MM-DD format
+        concurrent: Fetch sources in parallel under one deadline
+            (defaults to DATA_AGENT_CONCURRENT)
     
     Returns:
-        Dictionary with all collected data
+        Dictionary with all collected data. Concurrent calls for the same
+        city, date and mode share one collection and receive the same
+        dictionary.
     """
+    if concurrent is None:
+        concurrent = CONCURRENT_COLLECTION
+    # concurrent mode changes the result (deadline fallbacks), so it is part of the key
+    return _COLLECT_FLIGHT.do((city, date, concurrent), _collect_all_data, city, date, concurrent)
+
+
+def _collect_all_data(city: str, date: str, concurrent: bool) -> Dict[str, Any]:
     try:
-        # Fetch all data sources
-        pollution = fetch_pollution_data(city, date)
-        weather = fetch_weather_data(city, date)
-        festivals = fetch_festival_data(date)
-        health = fetch_health_data(city, date)
-        
-        # Clean and normalize
-        pollution_cleaned = clean_pollution_data(pollution)
-        weather_cleaned = normalize_weather_data(weather)
-        festivals_cleaned = normalize_festival_data(festivals)
+        if concurrent:
+            pollution, weather, festivals, health = _gather_sources(city, date)
+        else:
+            # Fetch all data sources
+            pollution = fetch_pollution_data(city, date)
+            weather = fetch_weather_data(city, date)
+            festivals = fetch_festival_data(date, city)
+            health = fetch_health_data(city, date)
         
-        return {
-            "city": city,
-            "date": date,
-            "pollution": pollution_cleaned,
-            "weather": weather_cleaned,
-            "festivals": festivals_cleaned,
-            "health": health,
-            "timestamp": datetime.now().isoformat()
-        }
+        return _build_payload(city, date, pollution, weather, festivals, health)
     except Exception as e:
-        return {
-            "error": str(e),
-            "city": city,
-            "date": date,
-            "pollution": clean_pollution_data({"aqi": 100, "pm25": 50, "pm10": 80}),
-            "weather": normalize_weather_data({"temperature": 25, "humidity": 60, "precipitation": 0, "wind_speed": 10}),
-            "festivals": [],
-            "health": {"dengue_risk": 0.3, "viral_fever_risk": 0.3, "h1n1_risk": 0.2}
-        }
+        return _fallback_payload(city, date, e)
+
+
+def collect_batch_data(pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """Collect data for many (city, date) pairs, sharing repeated lookups.
+    
+    Each city's dates are grouped into contiguous windows and pollution and
+    weather are fetched with one range request per window, then sliced back
+    into per-day records. Festivals come from one calendar scan per window. A failure
+    for one pair falls back to defaults for that pair only.
+    
+    Args:
+        pairs: List of (city, date) tuples
+    
+    Returns:
+        Dictionary mapping (city, date) to the same payload collect_all_data returns
+    """
+    dates_by_city: Dict[str, List[str]] = {}
+    for city, date in pairs:
+        dates_by_city.setdefault(city, []).append(date)
+    
+    windows = []
+    for city, dates in dates_by_city.items():
+        for start, end in _date_windows(dates):
+            windows.append((
+                city,
+                start,
+                end,
+                _FETCH_POOL.submit(fetch_pollution_range, city, start, end),
+                _FETCH_POOL.submit(fetch_weather_range, city, start, end),
+            ))
+    
+    pollution: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    weather: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    festivals: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    failures: Dict[str, Exception] = {}
+    calendar = get_calendar()
+    for city, start, end, pollution_future, weather_future in windows:
+        try:
+            # One calendar scan per window instead of a lookup per day
+            for day, found in calendar.windows(start, end, days=FESTIVAL_WINDOW_DAYS, city=city).items():
+                festivals[(city, day)] = found
+            for day, record in pollution_future.result().items():
+                pollution[(city, day)] = record
+            for day, record in weather_future.result().items():
+                weather[(city, day)] = record
+        except Exception as e:
+            failures[city] = e
+    
+    payloads: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for city, date in pairs:
+        if (city, date) in payloads:
+            continue
+        try:
+            if (city, date) not in pollution or (city, date) not in weather:
+                raise failures.get(city) or KeyError(f"no upstream data for {city} {date}")
+            health = fetch_health_data(city, date)
+            payloads[(city, date)] = _build_payload(
+                city, date, pollution[(city, date)], weather[(city, date)],
+                festivals.get((city, date), []), health
+            )
+        except Exception as e:
+            payloads[(city, date)] = _fallback_payload(city, date, e)
+    return payloads
+
+
+def collect_range_data(city: str, start_date: str, end_date: str) -> Dict[str, Dict[str, Any]]:
+    """Collect payloads for every day in [start_date, end_date] for one city.
+    
+    Returns a dictionary mapping each date to its collect_all_data payload.
+    """
+    pairs = [(city, day) for day in _date_range(start_date, end_date)]
+    return {date: payload for (_, date), payload in collect_batch_data(pairs).items()}
+
+
+def _build_payload(
+    city: str,
+    date: str,
+    pollution: Dict[str, Any],
+    weather: Dict[str, Any],
+    festivals: List[Dict[str, Any]],
+    health: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Clean and normalize raw source data into the agent payload."""
+    pollution_cleaned = clean_pollution_data(pollution)
+    weather_cleaned = normalize_weather_data(weather)
+    festivals_cleaned = normalize_festival_data(festivals)
+    
+    return {
+        "city": city,
+        "date": date,
+        "pollution": pollution_cleaned,
+        "weather": weather_cleaned,
+        "festivals": festivals_cleaned,
+        "health": health,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def _fallback_payload(city: str, date: str, error: Exception) -> Dict[str, Any]:
+    """Default payload used when data collection fails."""
+    return {
+        "error": str(error),
+        "city": city,
+        "date": date,
+        "pollution": clean_pollution_data({"aqi": 100, "pm25": 50, "pm10": 80}),
+        "weather": normalize_weather_data({"temperature": 25, "humidity": 60, "precipitation": 0, "wind_speed": 10}),
+        "festivals": [],
+        "health": {"dengue_risk": 0.3, "viral_fever_risk": 0.3, "h1n1_risk": 0.2}
+    }
 
 
 # Create and export agent
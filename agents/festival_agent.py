@@ -3,21 +3,35 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from nest import Agent, tool
+from utils.festival_calendar import FESTIVAL_WINDOW_DAYS, get_calendar
 
 
 @tool
-def predict_festival_impact(festivals: List[Dict[str, Any]], date: str) -> Dict[str, Any]:
+def predict_festival_impact(
+    festivals: Optional[List[Dict[str, Any]]] = None,
+    date: str = None,
+    city: str = None,
+) -> Dict[str, Any]:
     """Predict hospital surge based on festivals.
     
     Args:
-        festivals: List of festival dictionaries with name, date, type, impact_score
+        festivals: List of festival dictionaries with name, date, type, impact_score.
+            When omitted, festivals within FESTIVAL_WINDOW_DAYS of date are
+            looked up in the festival calendar (including regional ones for
+            city), the same window the data agent collects.
         date: Target date
+        city: City used for regional festival lookup
     
     Returns:
         Dictionary with predicted surge metrics
     """
+    if festivals is None:
+        if date is None:
+            raise ValueError("date is required when festivals are not given")
+        festivals = get_calendar().window(date, days=FESTIVAL_WINDOW_DAYS, city=city)
+    
     if not festivals:
         return {
             "festival_impact": {
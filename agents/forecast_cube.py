@@ -0,0 +1,229 @@
+"""Forecast Cube - Materialized pipeline results for every city over a rolling horizon.
+
+The cube is a SQLite table with one row per (city, date) cell. Each row holds
+the ``run_prediction_pipeline`` result as JSON, a fingerprint of the data
+payload and pipeline version it was computed from, and timestamps.
+``refresh`` collects payloads for every city over the next ``horizon_days``
+days through the cached range fetchers. It reruns the agents only for cells
+whose fingerprint changed and drops cells that have fallen behind the
+horizon. Serving is a primary key lookup. Cells that are older than
+FORECAST_MAX_AGE or were computed by a different pipeline version are
+reported as not current, and the API recomputes them instead of serving.
+Results built from fallback data (an upstream failure or synthetic
+pollution/weather) are never stored, so they can't be served as current.
+
+Run the precompute job with::
+
+    python -m agents.forecast_cube [--days 21] [--cities Mumbai,Delhi]
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from agents.coordinator_agent import _run_agents, pipeline_version, uses_fallback_data
+from agents.data_agent import collect_range_data
+from agents.predictor_agent import BASE_LOADS
+
+
+FORECAST_CUBE_ENABLED = os.getenv("FORECAST_CUBE_ENABLED", "1").lower() not in ("0", "false", "no")
+FORECAST_CUBE_PATH = os.getenv(
+    "FORECAST_CUBE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cache", "forecast_cube.sqlite3"),
+)
+FORECAST_HORIZON_DAYS = int(os.getenv("FORECAST_HORIZON_DAYS", "21"))
+# cells not checked for this long are flagged stale and recomputed on request
+FORECAST_MAX_AGE = float(os.getenv("FORECAST_MAX_AGE", "21600"))
+
+# payload keys that change on every collection without changing the inputs
+_VOLATILE_KEYS = ("timestamp",)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecast_cube (
+    city TEXT NOT NULL,
+    day TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    result TEXT NOT NULL,
+    computed_at REAL NOT NULL,
+    checked_at REAL NOT NULL,
+    version TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (city, day)
+);
+"""
+
+
+def freshness(
+    source: str,
+    fingerprint: str,
+    version: str,
+    computed_at: float,
+    checked_at: float,
+    max_age: float = FORECAST_MAX_AGE,
+) -> Dict[str, Any]:
+    """Freshness block attached to /predict results, for cube and live answers alike."""
+    age = max(0.0, time.time() - checked_at)
+    return {
+        "source": source,
+        "computed_at": datetime.utcfromtimestamp(computed_at).isoformat() + "Z",
+        "checked_at": datetime.utcfromtimestamp(checked_at).isoformat() + "Z",
+        "age_seconds": round(age, 1),
+        "stale": age > max_age,
+        "inputs_fingerprint": fingerprint,
+        "pipeline_version": version,
+        "current": age <= max_age and version == pipeline_version(),
+    }
+
+
+def inputs_fingerprint(data_payload: Dict[str, Any]) -> str:
+    """Stable hash of the inputs and pipeline version a result was computed from."""
+    inputs = {k: v for k, v in data_payload.items() if k not in _VOLATILE_KEYS}
+    inputs["_pipeline"] = pipeline_version()
+    encoded = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+class ForecastCube:
+    """SQLite store of pipeline results keyed by (city, date)."""
+
+    def __init__(self, path: str = FORECAST_CUBE_PATH, max_age: float = FORECAST_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(forecast_cube)")}
+        if "version" not in columns:
+            # cubes written before versions were stored; their cells count as outdated
+            self._conn.execute("ALTER TABLE forecast_cube ADD COLUMN version TEXT NOT NULL DEFAULT ''")
+        self._conn.commit()
+
+    def get(self, city: str, date: str) -> Optional[Dict[str, Any]]:
+        """Stored result with a ``freshness`` block, or None.
+
+        ``freshness.current`` is False when the cell is stale or was computed
+        by a different pipeline version; callers should recompute it then.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, result, computed_at, checked_at, version FROM forecast_cube "
+                "WHERE city=? AND day=?",
+                (city, date),
+            ).fetchone()
+        if row is None:
+            return None
+        fingerprint, result, computed_at, checked_at, version = row
+        block = freshness("cube", fingerprint, version, computed_at, checked_at, self.max_age)
+        return {**json.loads(result), "freshness": block}
+
+    def put(self, city: str, date: str, result: Dict[str, Any], fingerprint: str = None) -> None:
+        fingerprint = fingerprint or inputs_fingerprint(result.get("data", {}))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO forecast_cube "
+                "(city, day, fingerprint, result, computed_at, checked_at, version) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (city, date, fingerprint, json.dumps(result, default=str), now, now, pipeline_version()),
+            )
+            self._conn.commit()
+
+    def fingerprints(self, city: str, start: str, end: str) -> Dict[str, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT day, fingerprint FROM forecast_cube WHERE city=? AND day BETWEEN ? AND ?",
+                (city, start, end),
+            ).fetchall()
+        return dict(rows)
+
+    def refresh(self, cities: List[str] = None, days: int = FORECAST_HORIZON_DAYS, start: str = None) -> Dict[str, Any]:
+        """Recompute the cells in [start, start + days) whose inputs changed."""
+        started = time.perf_counter()
+        cities = cities or list(BASE_LOADS)
+        start = start or datetime.utcnow().strftime("%Y-%m-%d")
+        end = (datetime.strptime(start, "%Y-%m-%d") + timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        stats = {"cells": 0, "recomputed": 0, "unchanged": 0, "fallback": 0, "failed": 0, "expired": 0}
+
+        for city in cities:
+            payloads = collect_range_data(city, start, end)
+            known = self.fingerprints(city, start, end)
+            unchanged = []
+            for date, payload in payloads.items():
+                stats["cells"] += 1
+                fingerprint = inputs_fingerprint(payload)
+                if known.get(date) == fingerprint:
+                    unchanged.append(date)
+                    continue
+                if uses_fallback_data(payload):
+                    # leave the cell missing or aging rather than store fallback data
+                    stats["fallback"] += 1
+                    continue
+                try:
+                    self.put(city, date, _run_agents(city, date, payload), fingerprint)
+                    stats["recomputed"] += 1
+                except Exception as e:
+                    print(f"Forecast cube refresh failed for {city} {date}: {e}")
+                    stats["failed"] += 1
+            stats["unchanged"] += len(unchanged)
+            if unchanged:
+                with self._lock:
+                    self._conn.execute(
+                        f"UPDATE forecast_cube SET checked_at=? WHERE city=? AND day IN ({','.join('?' * len(unchanged))})",
+                        (time.time(), city, *unchanged),
+                    )
+                    self._conn.commit()
+
+        with self._lock:
+            stats["expired"] = self._conn.execute("DELETE FROM forecast_cube WHERE day < ?", (start,)).rowcount
+            self._conn.commit()
+        stats["seconds"] = round(time.perf_counter() - started, 2)
+        return stats
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, oldest, first_day, last_day = self._conn.execute(
+                "SELECT COUNT(*), MIN(checked_at), MIN(day), MAX(day) FROM forecast_cube"
+            ).fetchone()
+        return {
+            "path": self.path,
+            "cells": count,
+            "first_day": first_day,
+            "last_day": last_day,
+            "oldest_check_age_seconds": round(time.time() - oldest, 1) if oldest else None,
+        }
+
+
+def open_default_cube() -> Optional[ForecastCube]:
+    """Cube configured from the environment, or None when disabled."""
+    if not FORECAST_CUBE_ENABLED:
+        return None
+    return ForecastCube(FORECAST_CUBE_PATH)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Materialize the forecast cube")
+    parser.add_argument("--days", type=int, default=FORECAST_HORIZON_DAYS)
+    parser.add_argument("--start", help="first date (YYYY-MM-DD), default today")
+    parser.add_argument("--cities", help="comma-separated cities (default: all in BASE_LOADS)")
+    args = parser.parse_args(argv)
+
+    cube = ForecastCube(FORECAST_CUBE_PATH)
+    cities = args.cities.split(",") if args.cities else None
+    print(cube.refresh(cities=cities, days=args.days, start=args.start))
+    print(cube.stats())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
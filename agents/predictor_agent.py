@@ -3,14 +3,19 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 from datetime import datetime
 
+import numpy as np
+
 from nest import Agent, tool
 from utils.model_helpers import (
     predict_opd_load,
     predict_emergency_load,
     predict_icu_load,
+    predict_opd_load_array,
+    predict_emergency_load_array,
+    predict_icu_load_array,
 )
 
 
@@ -40,23 +45,86 @@ def predict_hospital_load(
     """Combine agent outputs and predict hospital resource loads."""
     city = data_bundle.get("city", "Mumbai")
     base = _get_base_load(city)
+    factors = _load_factors(data_bundle, festival_output, disease_output)
 
-    pollution = pollution_output.get("pollution_impact", {})
+    loads = {
+        "opd": predict_opd_load(base["opd"], factors),
+        "emergency": predict_emergency_load(base["emergency"], factors),
+        "icu": predict_icu_load(base["icu"], factors),
+    }
+    return _assemble_prediction(data_bundle, loads, pollution_output, festival_output, disease_output)
+
+
+def predict_hospital_load_batch(
+    items: List[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any], Dict[str, Any]]],
+) -> List[Dict[str, Any]]:
+    """Batch version of predict_hospital_load.
+
+    Args:
+        items: List of (data_bundle, pollution_output, festival_output, disease_output)
+
+    Returns:
+        One prediction per item, identical to calling predict_hospital_load on
+        each, with the OPD/emergency/ICU rules evaluated in one vectorized pass.
+    """
+    if not items:
+        return []
+    bases = [_get_base_load(bundle.get("city", "Mumbai")) for bundle, _, _, _ in items]
+    factors = [_load_factors(bundle, festival, disease) for bundle, _, festival, disease in items]
+
+    aqi = np.array([f["aqi"] for f in factors], dtype=np.float64)
+    festival_score = np.array([f["festival_score"] for f in factors], dtype=np.float64)
+    disease_score = np.array([f["disease_score"] for f in factors], dtype=np.float64)
+    temperature = np.array([f["temperature"] for f in factors], dtype=np.float64)
+
+    opd = predict_opd_load_array(
+        np.array([b["opd"] for b in bases]), aqi, festival_score, disease_score, temperature
+    )
+    emergency = predict_emergency_load_array(
+        np.array([b["emergency"] for b in bases]), aqi, festival_score, disease_score
+    )
+    icu = predict_icu_load_array(np.array([b["icu"] for b in bases]), aqi, disease_score)
+
+    return [
+        _assemble_prediction(
+            bundle,
+            {"opd": int(opd[i]), "emergency": int(emergency[i]), "icu": int(icu[i])},
+            pollution_output,
+            festival_output,
+            disease_output,
+        )
+        for i, (bundle, pollution_output, festival_output, disease_output) in enumerate(items)
+    ]
+
+
+def _load_factors(
+    data_bundle: Dict[str, Any],
+    festival_output: Dict[str, Any],
+    disease_output: Dict[str, Any],
+) -> Dict[str, float]:
+    """Extract the load model factors from a data bundle and agent outputs."""
     festival = festival_output.get("festival_impact", {})
     disease = disease_output.get("disease_impact", {})
-
-    factors = {
+    return {
         "aqi": data_bundle.get("pollution", {}).get("aqi", 80),
         "festival_score": festival.get("severity_score", 0),
         "disease_score": disease.get("severity_score", 0),
         "temperature": data_bundle.get("weather", {}).get("temperature", 30),
     }
 
-    loads = {
-        "opd": predict_opd_load(base["opd"], factors),
-        "emergency": predict_emergency_load(base["emergency"], factors),
-        "icu": predict_icu_load(base["icu"], factors),
-    }
+
+def _assemble_prediction(
+    data_bundle: Dict[str, Any],
+    loads: Dict[str, int],
+    pollution_output: Dict[str, Any],
+    festival_output: Dict[str, Any],
+    disease_output: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Derive secondary loads, severity and risk, and build the prediction dict."""
+    pollution = pollution_output.get("pollution_impact", {})
+    festival = festival_output.get("festival_impact", {})
+    disease = disease_output.get("disease_impact", {})
+
     loads["ventilator"] = max(5, int(loads["icu"] * 0.35))
     loads["pharmacy"] = int(loads["opd"] * 1.2)
 
@@ -82,7 +150,7 @@ def predict_hospital_load(
         risk = "Low"
 
     return {
-        "city": city,
+        "city": data_bundle.get("city", "Mumbai"),
         "date": data_bundle.get("date"),
         "loads": loads,
         "risk_level": risk,
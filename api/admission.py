@@ -0,0 +1,157 @@
+"""Admission control for blocking work called from async handlers.
+
+``AdmissionController.run`` executes a blocking function on a dedicated
+thread pool, off the event loop, so slow upstream calls never stall other
+requests such as health checks. At most ``max_concurrency`` calls run at
+once and at most ``max_queue`` more wait for a slot. When the queue is full,
+the call is rejected right away with 429. A call that waits longer than
+``queue_timeout`` seconds gets 503. Both rejections carry a Retry-After
+estimate derived from recent service times.
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Tuple
+
+from utils.metrics import CallbackMetric, Counter
+
+
+ADMISSIONS = Counter("api_admission_total", "Admission decisions by pool and outcome", ["pool", "outcome"])
+
+_controllers: Dict[str, "AdmissionController"] = {}
+
+
+class Saturated(Exception):
+    """Raised when a call is not admitted; maps to a 429/503 response."""
+
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionController:
+    """Bounded executor with a bounded wait queue in front of it.
+
+    Slots are handed directly from a finishing call to the oldest waiter, so
+    waiters are admitted in arrival order. Works across event loops and
+    threads, since slots are released from pool threads.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        # moving average of service time, for Retry-After
+        self.avg_seconds = 1.0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"admit-{name}")
+        _controllers[name] = self
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until a retry is likely to be admitted (at least 1)."""
+        backlog = self.waiting + self.running
+        return max(1, math.ceil(self.avg_seconds * backlog / self.max_concurrency))
+
+    async def _acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.running < self.max_concurrency:
+                self.running += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                ADMISSIONS.inc(self.name, "rejected_queue_full")
+                raise Saturated(429, self.retry_after(), f"{self.name} queue is full")
+            waiter = loop.create_future()
+            self._waiters.append((loop, waiter))
+        try:
+            await asyncio.wait_for(waiter, timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            ADMISSIONS.inc(self.name, "rejected_timeout")
+            raise Saturated(503, self.retry_after(), f"timed out waiting for a {self.name} slot") from None
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                with self._lock:
+                    try:
+                        self._waiters.remove((loop, waiter))
+                    except ValueError:
+                        pass
+
+    def _grant(self, waiter: asyncio.Future) -> None:
+        # runs on the waiter's loop; a waiter that gave up passes the slot on
+        if waiter.done():
+            self._release()
+        else:
+            waiter.set_result(None)
+
+    def _release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                loop, waiter = self._waiters.popleft()
+                if waiter.done():
+                    continue
+                try:
+                    loop.call_soon_threadsafe(self._grant, waiter)
+                    return
+                except RuntimeError:
+                    # that waiter's event loop is closed
+                    continue
+            self.running -= 1
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn`` on the pool once a slot is free; raises Saturated."""
+        return await (await self.start(fn, *args, **kwargs))
+
+    async def start(self, fn: Callable[..., Any], *args, **kwargs) -> "asyncio.Future":
+        """Admit ``fn`` and start it on the pool without waiting for it to finish.
+
+        Raises Saturated when not admitted; returns a future for the result.
+        """
+        await self._acquire()
+        ADMISSIONS.inc(self.name, "admitted")
+        started = time.perf_counter()
+
+        def finished(_future) -> None:
+            # the slot is held until the thread finishes, even if the request
+            # was cancelled, so the pool never runs more than max_concurrency
+            self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * (time.perf_counter() - started)
+            self._release()
+
+        try:
+            future = self._executor.submit(lambda: fn(*args, **kwargs))
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(finished)
+        return asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "running": self.running,
+            "waiting": self.waiting,
+            "avg_seconds": round(self.avg_seconds, 4),
+        }
+
+
+CallbackMetric(
+    "api_admission_running", "Calls running per admission pool", ["pool"],
+    lambda: {(name,): c.running for name, c in _controllers.items()},
+)
+CallbackMetric(
+    "api_admission_waiting", "Calls waiting for a slot per admission pool", ["pool"],
+    lambda: {(name,): c.waiting for name, c in _controllers.items()},
+)
@@ -1,11 +1,113 @@
 """FastAPI server exposing the hospital prediction endpoint."""
 import os
-from datetime import datetime
-from fastapi import FastAPI, HTTPException
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, validator
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, root_validator, validator
 
-from agents.coordinator_agent import run_prediction_pipeline
+from agents.coordinator_agent import (
+    cached_prediction,
+    iter_batch_pipeline,
+    pipeline_version,
+    run_batch_pipeline,
+    run_prediction_pipeline,
+    uses_fallback_data,
+)
+from agents.forecast_cube import FORECAST_HORIZON_DAYS, freshness, inputs_fingerprint, open_default_cube
+from api import streaming
+from api.admission import AdmissionController, Saturated
+from nest import codec
+from utils import metrics
+from utils.singleflight import AsyncSingleFlight
+
+
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "1000"))
+# Streamed batches hold one chunk in memory at a time, so they may be larger
+MAX_STREAM_ITEMS = int(os.getenv("MAX_STREAM_ITEMS", "20000"))
+STREAM_CHUNK_ITEMS = int(os.getenv("STREAM_CHUNK_ITEMS", "16"))
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "64"))
+
+# Pipeline runs happen on bounded pools off the event loop; requests beyond
+# concurrency + queue get 429, and ones left waiting past the timeout get 503
+predict_admission = AdmissionController(
+    "predict",
+    max_concurrency=int(os.getenv("PREDICT_MAX_CONCURRENCY", "8")),
+    max_queue=int(os.getenv("PREDICT_MAX_QUEUE", "32")),
+    queue_timeout=float(os.getenv("PREDICT_QUEUE_TIMEOUT", "2")),
+)
+batch_admission = AdmissionController(
+    "batch",
+    max_concurrency=int(os.getenv("BATCH_MAX_CONCURRENCY", "2")),
+    max_queue=int(os.getenv("BATCH_MAX_QUEUE", "4")),
+    queue_timeout=float(os.getenv("BATCH_QUEUE_TIMEOUT", "5")),
+)
+# identical concurrent /predict misses share one pipeline run and one slot
+predict_flight = AsyncSingleFlight("predict")
+
+# 0 leaves refreshing the cube to the `python -m agents.forecast_cube` job
+FORECAST_CUBE_REFRESH_SECONDS = float(os.getenv("FORECAST_CUBE_REFRESH_SECONDS", "0"))
+
+forecast_cube = open_default_cube()
+
+REQUEST_SECONDS = metrics.Histogram(
+    "api_request_seconds", "API request latency by route and status", ["method", "route", "status"]
+)
+ENCODE_SECONDS = metrics.Histogram("api_encode_seconds", "API JSON response encoding latency")
+CUBE_LOOKUPS = metrics.Counter("forecast_cube_lookups_total", "/predict forecast cube lookups", ["result"])
+STREAM_FIRST_ITEM_SECONDS = metrics.Histogram(
+    "api_stream_first_item_seconds", "Time from request to first streamed result", ["format"]
+)
+STREAM_ITEMS = metrics.Counter("api_stream_items_total", "Streamed batch items by outcome", ["format", "outcome"])
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse encoded with the shared codec (orjson when installed).
+
+    Records how long serializing the body takes. Bodies above
+    ``codec.COMPRESS_MIN_BYTES`` are compressed when ``content_encoding``
+    (negotiated from the request's Accept-Encoding) is given.
+    """
+
+    def __init__(self, content: Any, *args, content_encoding: Optional[str] = None, **kwargs):
+        self._accepted_encoding = content_encoding
+        self._applied_encoding = None
+        super().__init__(content, *args, **kwargs)
+        if self._applied_encoding:
+            self.headers["Content-Encoding"] = self._applied_encoding
+            self.headers["Vary"] = "Accept-Encoding"
+
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        try:
+            body = codec.dumps_json(content)
+        finally:
+            ENCODE_SECONDS.observe(time.perf_counter() - started)
+        body, self._applied_encoding = codec.compress(body, self._accepted_encoding)
+        return body
+
+
+def _resolve_fields(fields: Optional[str], view: Optional[str]) -> Optional[List[str]]:
+    try:
+        return codec.resolve_fields(fields, view)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _respond(request: Request, content: Any) -> TimedJSONResponse:
+    """JSON response compressed as the client's Accept-Encoding allows."""
+    encoding = codec.negotiate_encoding(request.headers.get("accept-encoding", ""))
+    return TimedJSONResponse(content, content_encoding=encoding)
+
+
+def _parse_date(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError as exc:
+        raise ValueError("date must be in YYYY-MM-DD format") from exc
 
 
 class PredictionRequest(BaseModel):
@@ -14,17 +116,61 @@ class PredictionRequest(BaseModel):
 
     @validator("date")
     def validate_date(cls, value: str) -> str:
-        try:
-            datetime.strptime(value, "%Y-%m-%d")
-        except ValueError as exc:
-            raise ValueError("date must be in YYYY-MM-DD format") from exc
+        _parse_date(value)
+        return value
+
+
+class BatchPredictionRequest(BaseModel):
+    items: Optional[List[PredictionRequest]] = Field(
+        None, description="Explicit list of city/date pairs"
+    )
+    cities: Optional[List[str]] = Field(None, description="Cities to combine with the date range")
+    start_date: Optional[str] = Field(None, description="First date of the range in YYYY-MM-DD")
+    end_date: Optional[str] = Field(None, description="Last date of the range (inclusive)")
+
+    @validator("start_date", "end_date")
+    def validate_range_date(cls, value: Optional[str]) -> Optional[str]:
+        if value is not None:
+            _parse_date(value)
         return value
 
+    @root_validator(skip_on_failure=True)
+    def validate_selection(cls, values):
+        has_range = values.get("cities") or values.get("start_date") or values.get("end_date")
+        if has_range:
+            if not (values.get("cities") and values.get("start_date") and values.get("end_date")):
+                raise ValueError("cities, start_date and end_date must be given together")
+            if values["end_date"] < values["start_date"]:
+                raise ValueError("end_date must not be before start_date")
+        elif not values.get("items"):
+            raise ValueError("provide either items or cities with start_date/end_date")
+        return values
+
+    def size(self) -> int:
+        """Number of pairs ``pairs()`` would produce, without expanding them."""
+        size = len(self.items or [])
+        if self.cities:
+            days = (_parse_date(self.end_date) - _parse_date(self.start_date)).days
+            size += len(self.cities) * (days + 1)
+        return size
+
+    def pairs(self) -> List[Tuple[str, str]]:
+        """Expand the request into (city, date) pairs."""
+        pairs = [(item.city, item.date) for item in self.items or []]
+        if self.cities:
+            start = _parse_date(self.start_date)
+            days = (_parse_date(self.end_date) - start).days
+            for city in self.cities:
+                for offset in range(days + 1):
+                    pairs.append((city, (start + timedelta(days=offset)).strftime("%Y-%m-%d")))
+        return pairs
+
 
 app = FastAPI(
     title="Predictive Hospital Management API",
     version="1.0.0",
     description="Agentic AI system to predict hospital surges in Indian cities.",
+    default_response_class=TimedJSONResponse,
 )
 
 # Allow local dev origins (Next.js frontend)
@@ -37,17 +183,224 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    # label by route template so path parameters don't explode cardinality
+    REQUEST_SECONDS.observe(
+        time.perf_counter() - started,
+        request.method,
+        getattr(route, "path", "unmatched"),
+        str(response.status_code),
+    )
+    return response
+
+
+@app.exception_handler(Saturated)
+async def saturated_handler(request: Request, exc: Saturated):
+    return TimedJSONResponse(
+        {"detail": exc.reason},
+        status_code=exc.status_code,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus metrics for this process."""
+    return Response(metrics.render(), headers={"Content-Type": metrics.CONTENT_TYPE})
+
+
+def _in_horizon(date: str) -> bool:
+    days_ahead = (_parse_date(date) - datetime.utcnow()).days
+    return -1 <= days_ahead < FORECAST_HORIZON_DAYS
+
+
+def _live_freshness(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Freshness block for a pipeline result, shaped like the cube's."""
+    try:
+        computed_at = datetime.fromisoformat(result["generated_at"].rstrip("Z")).replace(tzinfo=timezone.utc).timestamp()
+    except (KeyError, TypeError, ValueError):
+        computed_at = time.time()
+    fingerprint = inputs_fingerprint(result.get("data", {}))
+    return freshness("live", fingerprint, pipeline_version(), computed_at, computed_at)
+
+
+def _compute_prediction(city: str, date: str) -> Dict[str, Any]:
+    """Blocking pipeline run plus cube write; called on the admission pool."""
+    result = run_prediction_pipeline(city=city, date=date)
+    # fallback results expire from the memo; the cube would serve them for hours
+    if forecast_cube is not None and _in_horizon(date) and not uses_fallback_data(result.get("data", {})):
+        forecast_cube.put(city, date, result)
+    return result
+
+
+def _refresh_cube_forever() -> None:
+    while True:
+        try:
+            print(f"Forecast cube refreshed: {forecast_cube.refresh()}")
+        except Exception as exc:
+            print(f"Forecast cube refresh failed: {exc}")
+        threading.Event().wait(FORECAST_CUBE_REFRESH_SECONDS)
+
+
+@app.on_event("startup")
+def start_cube_refresher():
+    if forecast_cube is not None and FORECAST_CUBE_REFRESH_SECONDS > 0:
+        threading.Thread(target=_refresh_cube_forever, name="forecast-cube", daemon=True).start()
+
+
 @app.post("/predict")
-async def predict(req: PredictionRequest):
-    """Run the full coordinator pipeline."""
+async def predict(req: PredictionRequest, request: Request, fields: Optional[str] = None, view: Optional[str] = None):
+    """Serve from the forecast cube, or run the full coordinator pipeline.
+
+    Current cube cells and memo hits are answered inline; stale or outdated
+    cube cells are recomputed. Everything else runs through
+    the ``predict`` admission pool, with concurrent requests for the same
+    city and date coalesced into one run. ``?view=compact`` or ``?fields=a,b.c``
+    return only those subtrees.
+    """
+    projection = _resolve_fields(fields, view)
+    outdated = False
+    if forecast_cube is not None:
+        cached = forecast_cube.get(req.city, req.date)
+        if cached is None:
+            CUBE_LOOKUPS.inc("miss")
+        elif not cached["freshness"]["current"]:
+            CUBE_LOOKUPS.inc("outdated")
+            outdated = True
+        else:
+            CUBE_LOOKUPS.inc("hit")
+            return _respond(request, codec.project(cached, projection))
+    # an outdated cell goes through the pool so the recomputed result replaces it
+    result = None if outdated else cached_prediction(req.city, req.date)
+    if result is None:
+        try:
+            result = await predict_flight.do(
+                (req.city, req.date), predict_admission.run, _compute_prediction, req.city, req.date
+            )
+        except Saturated:
+            raise
+        except Exception as exc:
+            raise HTTPException(status_code=500, detail=str(exc)) from exc
+    result = {**result, "freshness": _live_freshness(result)}
+    return _respond(request, codec.project(result, projection))
+
+
+@app.get("/forecast/cube")
+async def forecast_cube_status():
+    """Size and age of the materialized forecast cube."""
+    if forecast_cube is None:
+        return {"enabled": False}
+    return {"enabled": True, "horizon_days": FORECAST_HORIZON_DAYS, **forecast_cube.stats()}
+
+
+@app.get("/admission")
+async def admission_status():
+    """Admission pool load and /predict request coalescing."""
+    return {
+        "predict": predict_admission.stats(),
+        "batch": batch_admission.stats(),
+        "coalescing": predict_flight.stats(),
+    }
+
+
+
+@app.post("/predict/batch")
+async def predict_batch(
+    req: BatchPredictionRequest, request: Request, fields: Optional[str] = None, view: Optional[str] = None
+):
+    """Run the pipeline for many city/date pairs in a single call.
+
+    ``view``/``fields`` are applied to each result.
+    """
+    projection = _resolve_fields(fields, view)
+    # check the size before expanding a cities x dates range into pairs
+    size = req.size()
+    if size > MAX_BATCH_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"batch of {size} items exceeds limit of {MAX_BATCH_ITEMS}",
+        )
+    pairs = req.pairs()
     try:
-        result = run_prediction_pipeline(city=req.city, date=req.date)
-        return result
+        batch = await batch_admission.run(
+            run_batch_pipeline, items=[{"city": city, "date": date} for city, date in pairs]
+        )
+    except Saturated:
+        raise
     except Exception as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
+    if projection:
+        batch["results"] = {
+            city: {date: codec.project(result, projection) for date, result in by_date.items()}
+            for city, by_date in batch["results"].items()
+        }
+    return _respond(request, batch)
+
+
+@app.post("/predict/stream")
+async def predict_stream(
+    req: BatchPredictionRequest,
+    request: Request,
+    format: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[str] = None,
+):
+    """Stream batch results as NDJSON lines or Server-Sent Events.
+
+    Each city/date result is sent as soon as its chunk finishes, followed by
+    a final ``{"done": true, ...}`` record (the ``end`` event for SSE). Use
+    ``?format=sse`` or ``Accept: text/event-stream`` for SSE. ``view``/``fields``
+    are applied to each result.
+    """
+    projection = _resolve_fields(fields, view)
+    # check the size before expanding a cities x dates range into pairs
+    size = req.size()
+    if size > MAX_STREAM_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"batch of {size} items exceeds limit of {MAX_STREAM_ITEMS}",
+        )
+    pairs = req.pairs()
+    if format is None:
+        format = "sse" if streaming.SSE in request.headers.get("accept", "") else "ndjson"
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be ndjson or sse")
+    encode = streaming.encode_sse if format == "sse" else streaming.encode_ndjson
+    started = time.perf_counter()
+
+    def produce():
+        count = failed = 0
+        items = [{"city": city, "date": date} for city, date in pairs]
+        try:
+            for city, date, result, error in iter_batch_pipeline(items, chunk_size=STREAM_CHUNK_ITEMS):
+                if count == 0:
+                    STREAM_FIRST_ITEM_SECONDS.observe(time.perf_counter() - started, format)
+                count += 1
+                if error is not None:
+                    failed += 1
+                    STREAM_ITEMS.inc(format, "error")
+                    yield encode({"city": city, "date": date, "error": error}, "error")
+                else:
+                    STREAM_ITEMS.inc(format, "ok")
+                    yield encode(codec.project(result, projection))
+        except Exception as exc:
+            yield encode({"error": str(exc)}, "error")
+        summary = {"done": True, "count": count, "failed": failed, "generated_at": datetime.utcnow().isoformat() + "Z"}
+        yield encode(summary, "end")
 
+    # streams hold a batch pool slot for their whole duration
+    body = await streaming.start_stream(produce, batch_admission, max_queued=STREAM_QUEUE_SIZE)
+    return StreamingResponse(
+        body,
+        media_type=streaming.SSE if format == "sse" else streaming.NDJSON,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,101 @@
+"""Streaming response helpers: NDJSON / Server-Sent Events over a bounded queue.
+
+A producer on an admission pool runs a blocking iterator (the batch
+pipeline) and hands encoded chunks to the response through an
+``asyncio.Queue`` of fixed size. When the client reads slowly the queue fills and the producer blocks, so
+work never runs far ahead of what has been sent. Memory stays bounded by the
+queue size no matter how large the batch is. If the client disconnects, the
+producer stops at its next handoff.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, AsyncIterator, Callable, Dict, Iterable
+
+from api.admission import AdmissionController
+from nest import codec
+
+NDJSON = "application/x-ndjson"
+SSE = "text/event-stream"
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+def encode_ndjson(record: Dict[str, Any], event: str = "result") -> bytes:
+    """One JSON document per line; ``event`` is implied by the record shape."""
+    return codec.dumps_json(record) + b"\n"
+
+
+def encode_sse(record: Dict[str, Any], event: str = "result") -> bytes:
+    """One Server-Sent Event with the record as its JSON data."""
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + codec.dumps_json(record) + b"\n\n"
+
+
+async def start_stream(
+    produce: Callable[[], Iterable[bytes]],
+    admission: AdmissionController,
+    max_queued: int = 64,
+    stall_timeout: float = 60.0,
+) -> AsyncIterator[bytes]:
+    """Admit a stream and return an async iterator over what ``produce()`` yields.
+
+    The producer runs on ``admission``'s pool and holds one of its slots
+    until it finishes, so streams share the pool's concurrency limit. If the
+    pool is saturated, this raises ``Saturated`` before any response is sent.
+    At most ``max_queued`` chunks are buffered between producer and
+    consumer. A producer that cannot hand off a chunk for ``stall_timeout``
+    seconds gives up its slot, for example when the response never started.
+    An exception in the producer is re-raised in the consumer.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+    cancelled = threading.Event()
+
+    def handoff(item) -> bool:
+        """Block until the consumer has room; False once it has gone away."""
+        try:
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        except RuntimeError:
+            # event loop closed
+            return False
+        deadline = time.monotonic() + stall_timeout
+        while True:
+            try:
+                future.result(timeout=0.25)
+                return True
+            except FutureTimeout:
+                if cancelled.is_set() or time.monotonic() > deadline:
+                    future.cancel()
+                    return False
+
+    def worker() -> None:
+        try:
+            for chunk in produce():
+                if cancelled.is_set() or not handoff(chunk):
+                    return
+        except Exception as exc:
+            handoff(_Failure(exc))
+            return
+        handoff(_DONE)
+
+    await admission.start(worker)
+
+    async def consume() -> AsyncIterator[bytes]:
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            cancelled.set()
+
+    return consume()
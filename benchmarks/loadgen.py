@@ -0,0 +1,165 @@
+"""Open-loop load generator for the prediction API.
+
+Sends ``POST /predict`` requests at a fixed target rate for a set duration
+and reports achieved throughput, status counts and p50/p95/p99 latency.
+Arrivals follow the schedule no matter how slowly the server answers. Each
+latency is measured from the request's scheduled start, so queueing on our
+side is counted as well and an overloaded server cannot hide its tail
+(coordinated omission).
+
+    python -m benchmarks.loadgen --url http://127.0.0.1:8000 --rps 50 --duration 30
+
+Requests cycle through ``--cities`` and ``--days`` consecutive dates from
+``--start``. Widen the date span to defeat the forecast cube and pipeline
+memo, or narrow it to measure the cached path.
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urlparse
+
+DEFAULT_CITIES = "Mumbai,Delhi,Bangalore,Chennai,Kolkata,Hyderabad,Pune,Ahmedabad"
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LoadGenerator:
+    """Fires requests on a fixed schedule from a pool of keep-alive clients."""
+
+    def __init__(self, url: str, bodies: List[bytes], rps: float, duration: float,
+                 concurrency: int = 64, timeout: float = 30.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 80
+        self.path = (parsed.path.rstrip("/") or "") + "/predict"
+        self.bodies = bodies
+        self.rps = rps
+        self.duration = duration
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def _send(self, scheduled: float, body: bytes) -> None:
+        # wait for the slot; a backlog fires immediately and counts the delay
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        try:
+            conn = self._connection()
+            conn.request("POST", self.path, body=body, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            status = str(response.status)
+            if response.getheader("Connection", "").lower() == "close":
+                conn.close()
+                self._local.conn = None
+        except Exception as exc:
+            status = type(exc).__name__
+            conn = getattr(self._local, "conn", None)
+            if conn is not None:
+                conn.close()
+            self._local.conn = None
+        elapsed = time.perf_counter() - scheduled
+        with self._lock:
+            self.latencies.append(elapsed)
+            self.statuses[status] += 1
+
+    def run(self) -> Dict[str, Any]:
+        total = int(self.rps * self.duration)
+        interval = 1.0 / self.rps
+        started = time.perf_counter() + 0.05
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="loadgen") as pool:
+            for index in range(total):
+                scheduled = started + index * interval
+                # don't let the submit queue run far ahead of the schedule
+                lead = scheduled - time.perf_counter() - 0.5
+                if lead > 0:
+                    time.sleep(lead)
+                pool.submit(self._send, scheduled, self.bodies[index % len(self.bodies)])
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        ok = sum(count for status, count in self.statuses.items() if status.startswith("2"))
+        ms = lambda value: round(value * 1000, 2)
+        return {
+            "target_rps": self.rps,
+            "requests": len(ordered),
+            "elapsed_seconds": round(elapsed, 2),
+            "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+            "success_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+            "statuses": dict(self.statuses),
+            "latency_ms": {
+                "mean": ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+                "p50": ms(_percentile(ordered, 0.50)),
+                "p95": ms(_percentile(ordered, 0.95)),
+                "p99": ms(_percentile(ordered, 0.99)),
+                "max": ms(ordered[-1]) if ordered else 0.0,
+            },
+        }
+
+
+def request_bodies(cities: List[str], start: str, days: int) -> List[bytes]:
+    """JSON bodies for every (city, date) pair, interleaved by date."""
+    first = datetime.strptime(start, "%Y-%m-%d")
+    pairs: List[Tuple[str, str]] = [
+        (city, (first + timedelta(days=offset)).strftime("%Y-%m-%d"))
+        for offset in range(days)
+        for city in cities
+    ]
+    return [json.dumps({"city": city, "date": date}).encode("utf-8") for city, date in pairs]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Drive /predict at a fixed request rate")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="API base URL")
+    parser.add_argument("--rps", type=float, default=20.0, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to generate load")
+    parser.add_argument("--concurrency", type=int, default=64, help="max requests in flight")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout, seconds")
+    parser.add_argument("--cities", default=DEFAULT_CITIES)
+    parser.add_argument("--start", default=datetime.utcnow().strftime("%Y-%m-%d"), help="first date")
+    parser.add_argument("--days", type=int, default=30, help="distinct dates to cycle through")
+    parser.add_argument("--output", help="also write the report as JSON here")
+    args = parser.parse_args(argv)
+
+    bodies = request_bodies(args.cities.split(","), args.start, args.days)
+    generator = LoadGenerator(args.url, bodies, args.rps, args.duration, args.concurrency, args.timeout)
+    print(f"Sending {int(args.rps * args.duration)} requests to {args.url}/predict at {args.rps} rps...")
+    report = generator.run()
+
+    latency = report["latency_ms"]
+    print(f"Throughput: {report['throughput_rps']} rps ({report['success_rps']} rps successful)")
+    print(f"Statuses:   {report['statuses']}")
+    print(f"Latency:    p50 {latency['p50']}ms  p95 {latency['p95']}ms  p99 {latency['p99']}ms  max {latency['max']}ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
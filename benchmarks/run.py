@@ -0,0 +1,369 @@
+"""Offline benchmark suite.
+
+Covers each agent tool in isolation, the full prediction pipeline, nest
+server request throughput and predictor inference. Upstream calls go to the
+in-process stub in benchmarks/stub_upstream.py, and the persistent upstream
+cache is disabled, so runs need no network and no state from earlier runs.
+
+    python -m benchmarks.run                          # run everything, write benchmarks/results/
+    python -m benchmarks.run --filter tools.          # only the tools suite
+    python -m benchmarks.run --filter predict_rows    # benchmarks whose name contains this
+    python -m benchmarks.run --save-baseline          # store this run as benchmarks/baseline.json
+    python -m benchmarks.run --compare --threshold 0.25
+
+With --compare, a benchmark regresses when its p50 latency is more than
+``threshold`` above the baseline, and the exit status is 1 if any regressed.
+Baselines are machine-specific, so record one on the box you compare on.
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# must be set before the agents are imported
+os.environ["DATA_CACHE_ENABLED"] = "0"
+os.environ.setdefault("NEST_WORKERS", "8")
+
+import argparse
+import http.client
+import json
+import platform
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+CITY = "Delhi"
+DATES = [f"2025-{month:02d}-{day:02d}" for month in (1, 4, 7, 10) for day in (3, 14, 25)]
+
+
+def measure(fn: Callable[[int], Any], iterations: int, warmup: int = 5) -> Dict[str, float]:
+    """Time ``fn(i)`` per call; returns latency percentiles in microseconds."""
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        t = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - t) * 1e6)
+    elapsed = time.perf_counter() - started
+    return _summarize(samples, iterations / elapsed)
+
+
+def _summarize(samples: List[float], ops_per_s: float) -> Dict[str, float]:
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "iterations": len(samples),
+        "mean_us": round(statistics.fmean(samples), 2),
+        "p50_us": round(pick(0.50), 2),
+        "p95_us": round(pick(0.95), 2),
+        "p99_us": round(pick(0.99), 2),
+        "ops_per_s": round(ops_per_s, 1),
+    }
+
+
+# agent tools ---------------------------------------------------------------
+
+def _payloads() -> List[Dict[str, Any]]:
+    from agents.data_agent import collect_all_data
+    return [collect_all_data(CITY, date) for date in DATES]
+
+
+def bench_tools(n: int) -> Dict[str, Dict[str, float]]:
+    from agents.data_agent import collect_all_data
+    from agents.pollution_agent import predict_pollution_impact
+    from agents.festival_agent import predict_festival_impact
+    from agents.disease_agent import analyze_disease_season
+    from agents.predictor_agent import predict_hospital_load
+    from agents.ops_agent import generate_resource_plan
+
+    payloads = _payloads()
+    pollution = [predict_pollution_impact(p["pollution"]) for p in payloads]
+    festival = [predict_festival_impact(festivals=p["festivals"], date=p["date"]) for p in payloads]
+    disease = [analyze_disease_season(health_data=p["health"], date=p["date"]) for p in payloads]
+    loads = [
+        predict_hospital_load(data_bundle=p, pollution_output=po, festival_output=fo, disease_output=do)
+        for p, po, fo, do in zip(payloads, pollution, festival, disease)
+    ]
+    k = len(payloads)
+    return {
+        "tools.collect_all_data": measure(lambda i: collect_all_data(CITY, DATES[i % k]), max(20, n // 10)),
+        "tools.predict_pollution_impact": measure(lambda i: predict_pollution_impact(payloads[i % k]["pollution"]), n),
+        "tools.predict_festival_impact": measure(
+            lambda i: predict_festival_impact(festivals=payloads[i % k]["festivals"], date=DATES[i % k]), n
+        ),
+        "tools.analyze_disease_season": measure(
+            lambda i: analyze_disease_season(health_data=payloads[i % k]["health"], date=DATES[i % k]), n
+        ),
+        "tools.predict_hospital_load": measure(
+            lambda i: predict_hospital_load(
+                data_bundle=payloads[i % k], pollution_output=pollution[i % k],
+                festival_output=festival[i % k], disease_output=disease[i % k],
+            ),
+            n,
+        ),
+        "tools.generate_resource_plan": measure(lambda i: generate_resource_plan(load_prediction=loads[i % k]), n),
+    }
+
+
+# full pipeline -------------------------------------------------------------
+
+def bench_pipeline(n: int) -> Dict[str, Dict[str, float]]:
+    from agents.coordinator_agent import _MEMO, run_prediction_pipeline
+
+    def cold(i):
+        _MEMO.clear()
+        run_prediction_pipeline(CITY, DATES[i % len(DATES)])
+
+    results = {"pipeline.run_prediction_pipeline": measure(cold, max(20, n // 10))}
+    run_prediction_pipeline(CITY, DATES[0])
+    results["pipeline.run_prediction_pipeline_memo_hit"] = measure(
+        lambda i: run_prediction_pipeline(CITY, DATES[0]), n
+    )
+    return results
+
+
+# nest server ---------------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_nest() -> int:
+    from nest import Agent, run
+    from agents.pollution_agent import predict_pollution_impact
+
+    port = _free_port()
+    agent = Agent(name="BenchAgent", tools=[predict_pollution_impact])
+    threading.Thread(target=run, args=(agent,), kwargs={"port": port}, daemon=True).start()
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return port
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("nest server did not start")
+
+
+def bench_nest(n: int) -> Dict[str, Dict[str, float]]:
+    import nest.nest as nest_module
+
+    # the per-request log line would dominate the measurement
+    nest_module.print = lambda *args, **kwargs: None
+    port = _start_nest()
+    body = json.dumps({"pollution_data": {"aqi": 180, "pm25": 90, "pm10": 140}})
+    headers = {"Content-Type": "application/json"}
+
+    def call(conn: http.client.HTTPConnection) -> None:
+        conn.request("POST", "/tool/predict_pollution_impact", body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"nest call failed with {response.status}")
+
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    results = {"nest.tool_call_keepalive": measure(lambda i: call(conn), n)}
+    conn.close()
+
+    # aggregate throughput with several keep-alive clients
+    clients, per_client = 4, max(50, n // 4)
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def client_loop(_):
+        local = []
+        c = http.client.HTTPConnection("127.0.0.1", port)
+        for _ in range(per_client):
+            t = time.perf_counter()
+            call(c)
+            local.append((time.perf_counter() - t) * 1e6)
+        c.close()
+        with lock:
+            latencies.extend(local)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        list(pool.map(client_loop, range(clients)))
+    results["nest.tool_call_4_clients"] = _summarize(latencies, len(latencies) / (time.perf_counter() - started))
+    return results
+
+
+# predictor -----------------------------------------------------------------
+
+def _bench_model():
+    """Deterministic forest trained on the bundled history (no registry needed)."""
+    import pandas as pd
+    from sklearn.ensemble import RandomForestRegressor
+
+    root = os.path.dirname(BENCH_DIR)
+    df = pd.read_csv(os.path.join(root, "data", "hospital_history.csv"))
+    X = df[["aqi", "temp", "season", "viral_cases", "festival_flag"]].to_numpy(dtype=float)
+    model = RandomForestRegressor(n_estimators=100, random_state=42).fit(X, df["hospital_load"].to_numpy())
+    return model, X
+
+
+def bench_predictor(n: int) -> Dict[str, Dict[str, float]]:
+    """predictor.main inference: predict_rows dispatch at 1/64/1000 rows and the MicroBatcher.
+
+    The service's model handle is pointed at a temporary registry holding the
+    deterministic bench model with its compact export, so results don't
+    depend on whatever is in models/registry.
+    """
+    import asyncio
+    import tempfile
+
+    import predictor.main as predictor
+    from utils.forest_eval import export_to_registry
+    from utils.model_registry import ModelHandle, ModelRegistry
+
+    model, X = _bench_model()
+    registry = ModelRegistry(tempfile.mkdtemp(prefix="bench-registry-"))
+    version = registry.publish(model, promote=True)
+    export_to_registry(registry, version, model)
+    predictor.model = ModelHandle(registry, refresh_seconds=3600, adapter=predictor.model.adapter)
+    predictor.predict_rows(X[:1].tolist())
+
+    rows = X.tolist()
+    k = len(rows)
+    batches = {size: rows[:size] for size in (64, 1000)}
+    results = {
+        "predictor.predict_rows_1": measure(lambda i: predictor.predict_rows([rows[i % k]]), n),
+        "predictor.predict_rows_64": measure(lambda i: predictor.predict_rows(batches[64]), max(20, n // 10)),
+        "predictor.predict_rows_1000": measure(lambda i: predictor.predict_rows(batches[1000]), max(20, n // 20)),
+    }
+
+    # 32 concurrent single-row requests coalesced by the MicroBatcher
+    concurrent = 32
+
+    async def burst(burst_rows):
+        return await asyncio.gather(*[predictor.batcher.submit(row) for row in burst_rows])
+
+    loop = asyncio.new_event_loop()
+    try:
+        results["predictor.microbatch_32_concurrent"] = measure(
+            lambda i: loop.run_until_complete(burst(rows[(i * concurrent) % (k - concurrent):][:concurrent])),
+            max(20, n // 10),
+        )
+    finally:
+        # stop the batcher's worker task before its loop goes away
+        worker = predictor.batcher._worker
+        if worker is not None:
+            worker.cancel()
+            loop.run_until_complete(asyncio.gather(worker, return_exceptions=True))
+        loop.close()
+    return results
+
+
+SUITES = {
+    "tools": bench_tools,
+    "pipeline": bench_pipeline,
+    "nest": bench_nest,
+    "predictor": bench_predictor,
+}
+
+
+def run(iterations: int, name_filter: Optional[str] = None) -> Dict[str, Any]:
+    from benchmarks import stub_upstream
+
+    stub = stub_upstream.install()
+    results: Dict[str, Dict[str, float]] = {}
+    for suite, bench in SUITES.items():
+        # names are "<suite>.<benchmark>"; a filter naming a suite only runs
+        # that suite, any other substring runs every suite
+        if name_filter and name_filter.split(".")[0] in SUITES and name_filter.split(".")[0] != suite:
+            continue
+        print(f"Running {suite} benchmarks...", flush=True)
+        for name, stats in bench(iterations).items():
+            if not name_filter or name_filter in name:
+                results[name] = stats
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "iterations": iterations,
+            "stub_upstream_calls": stub.calls,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print a p50 comparison table and return the names that regressed."""
+    regressions = []
+    print(f"\n{'benchmark':45} {'baseline p50':>14} {'current p50':>14} {'change':>9}")
+    for name, stats in sorted(current["results"].items()):
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            print(f"{name:45} {'-':>14} {stats['p50_us']:>12.1f}us {'new':>9}")
+            continue
+        change = stats["p50_us"] / base["p50_us"] - 1 if base["p50_us"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:45} {base['p50_us']:>12.1f}us {stats['p50_us']:>12.1f}us {change:>+8.1%}{flag}")
+    return regressions
+
+
+def _print_results(report: Dict[str, Any]) -> None:
+    print(f"\n{'benchmark':45} {'p50':>11} {'p95':>11} {'p99':>11} {'ops/s':>10}")
+    for name, s in sorted(report["results"].items()):
+        print(f"{name:45} {s['p50_us']:>9.1f}us {s['p95_us']:>9.1f}us {s['p99_us']:>9.1f}us {s['ops_per_s']:>10.1f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--iterations", type=int, default=2000, help="calls per fast benchmark (slow ones run fewer)")
+    parser.add_argument("--filter", help="only report benchmarks whose name contains this; a filter starting with a "
+             "suite name (tools, pipeline, nest, predictor) only runs that suite")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="write this run to --baseline")
+    parser.add_argument("--compare", action="store_true", help="compare against --baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p50 slowdown, e.g. 0.25 = 25%%")
+    args = parser.parse_args(argv)
+
+    report = run(args.iterations, args.filter)
+    _print_results(report)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, datetime.utcnow().strftime("%Y%m%dT%H%M%SZ") + ".json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"Baseline written to {args.baseline}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}; run with --save-baseline first")
+            return 2
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        print(f"\nNo regressions above {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
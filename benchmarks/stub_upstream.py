@@ -0,0 +1,83 @@
+"""In-process stand-in for the Open-Meteo endpoints used by the data agent.
+
+``install()`` swaps the data agent's HTTP client for ``StubClient``, which
+answers air-quality and forecast requests with well-formed payloads for the
+requested date range after an optional fixed delay. No sockets are opened,
+so benchmarks measure our code rather than the network. The payload builders
+are shared with the HTTP stand-in in benchmarks/upstream_server.py.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+
+def days_between(start: str, end: str) -> List[str]:
+    """Inclusive list of YYYY-MM-DD days."""
+    first = datetime.strptime(start, "%Y-%m-%d")
+    count = (datetime.strptime(end, "%Y-%m-%d") - first).days + 1
+    return [(first + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(count)]
+
+
+def air_quality_payload(days: List[str], extra_variables: int = 0) -> Dict[str, Any]:
+    """Open-Meteo air-quality response body with hourly PM readings.
+
+    ``extra_variables`` adds that many more hourly series, to mimic requests
+    for more variables and grow the payload the client has to parse.
+    """
+    times = [f"{day}T{hour:02d}:00" for day in days for hour in range(24)]
+    hourly = {
+        "time": times,
+        "pm2_5": [40.0 + (i % 24) for i in range(len(times))],
+        "pm10": [70.0 + (i % 24) for i in range(len(times))],
+    }
+    for index in range(extra_variables):
+        hourly[f"extra_{index}"] = [float(i % 97) for i in range(len(times))]
+    return {"hourly": hourly}
+
+
+def forecast_payload(days: List[str], extra_variables: int = 0) -> Dict[str, Any]:
+    """Open-Meteo forecast response body with daily temperature and rain."""
+    daily = {
+        "time": days,
+        "temperature_2m_max": [32.0] * len(days),
+        "temperature_2m_min": [24.0] * len(days),
+        "precipitation_sum": [1.5] * len(days),
+    }
+    for index in range(extra_variables):
+        daily[f"extra_{index}"] = [float(i % 97) for i in range(len(days))]
+    return {"daily": daily}
+
+
+class StubResponse:
+    def __init__(self, payload: Dict[str, Any], status_code: int = 200):
+        self._payload = payload
+        self.status_code = status_code
+
+    def json(self) -> Dict[str, Any]:
+        return self._payload
+
+
+class StubClient:
+    """Drop-in for ``utils.http_client``'s module-level ``get``."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def get(self, url: str, params: Dict[str, Any] = None, timeout: float = None, **kwargs) -> StubResponse:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        days = days_between(params["start_date"], params["end_date"])
+        if "air-quality" in url:
+            return StubResponse(air_quality_payload(days))
+        return StubResponse(forecast_payload(days))
+
+
+def install(latency: float = 0.0) -> StubClient:
+    """Route the data agent's upstream calls to a StubClient and return it."""
+    from agents import data_agent
+
+    client = StubClient(latency)
+    data_agent.http_client = client
+    return client
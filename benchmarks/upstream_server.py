@@ -0,0 +1,158 @@
+"""Local HTTP stand-in for the Open-Meteo air-quality and forecast APIs.
+
+Serves ``/v1/air-quality`` and ``/v1/forecast`` with well-formed payloads
+for the requested date range. Latency, error rate and payload size are
+configurable, so production-like upstream slowness can be reproduced on a
+laptop. Point the data agent at it through the environment::
+
+    python -m benchmarks.upstream_server --port 8099 --latency 0.25 --jitter 0.1 --error-rate 0.02
+
+    OPEN_METEO_AIR_QUALITY_URL=http://127.0.0.1:8099/v1/air-quality \\
+    OPEN_METEO_FORECAST_URL=http://127.0.0.1:8099/v1/forecast \\
+    DATA_CACHE_ENABLED=0 uvicorn api.server:app --port 8000
+
+Disable the upstream cache (and the forecast cube and pipeline memo, with
+FORECAST_CUBE_ENABLED=0 PIPELINE_MEMO_SIZE=0) when every request should
+reach the stand-in. Then drive the API with ``python -m benchmarks.loadgen``.
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.stub_upstream import air_quality_payload, days_between, forecast_payload
+
+
+class UpstreamConfig:
+    """Behaviour knobs, adjustable while the server runs."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        extra_variables: int = 0,
+        seed: int = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.extra_variables = extra_variables
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def draw(self):
+        """Delay and error decision for the next request."""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return delay, failed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency": self.latency,
+            "jitter": self.jitter,
+            "error_rate": self.error_rate,
+            "extra_variables": self.extra_variables,
+        }
+
+
+def make_server(host: str, port: int, config: UpstreamConfig) -> ThreadingHTTPServer:
+    """Threaded stand-in server; call ``serve_forever()`` on the result."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = -1
+
+        def _send_json(self, obj, status=200):
+            data = json.dumps(obj).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            if parsed.path == "/stats":
+                self._send_json(config.stats())
+                return
+            if parsed.path not in ("/v1/air-quality", "/v1/forecast"):
+                self._send_json({"error": True, "reason": "Not found"}, status=404)
+                return
+
+            delay, failed = config.draw()
+            if delay:
+                time.sleep(delay)
+            if failed:
+                self._send_json({"error": True, "reason": "Injected failure"}, status=config.error_status)
+                return
+
+            query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+            try:
+                days = days_between(query["start_date"], query["end_date"])
+            except (KeyError, ValueError):
+                self._send_json({"error": True, "reason": "start_date and end_date are required"}, status=400)
+                return
+            if parsed.path == "/v1/air-quality":
+                self._send_json(air_quality_payload(days, config.extra_variables))
+            else:
+                self._send_json(forecast_payload(days, config.extra_variables))
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve a local Open-Meteo stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.0, help="base delay per request, seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra uniform random delay, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="status returned for failed requests")
+    parser.add_argument("--extra-variables", type=int, default=0, help="extra series per response (payload size)")
+    parser.add_argument("--seed", type=int, help="seed for jitter and error injection")
+    args = parser.parse_args(argv)
+
+    config = UpstreamConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        extra_variables=args.extra_variables,
+        seed=args.seed,
+    )
+    server = make_server(args.host, args.port, config)
+    print(f"Open-Meteo stand-in on http://{args.host}:{args.port} ({config.stats()})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"Served: {config.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,10 +2,11 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
 import os
-import requests
 from datetime import datetime
 from dotenv import load_dotenv
 
+from utils import http_client
+
 load_dotenv()
 
 OPENWEATHER_KEY = os.getenv("OPENWEATHER_KEY")  # optional
@@ -37,7 +38,7 @@ def fetch(req: FetchRequest):
     if OPENWEATHER_KEY:
         try:
             # simple get by city name
-            r = requests.get(f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={OPENWEATHER_KEY}&units=metric", timeout=5)
+            r = http_client.get(f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={OPENWEATHER_KEY}&units=metric", timeout=5)
             if r.ok:
                 data = r.json()
                 temp = int(data["main"]["temp"])
@@ -46,7 +47,7 @@ def fetch(req: FetchRequest):
 
     # If you want AQI from OpenAQ (city-level), try:
     try:
-        r = requests.get(OPENAQ_URL, params={"city": city, "limit":1}, timeout=5)
+        r = http_client.get(OPENAQ_URL, params={"city": city, "limit":1}, timeout=5)
         if r.ok:
             j = r.json()
             if j.get("results"):
@@ -1,42 +1,209 @@
 # generate_data.py
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import random
+"""Synthetic hospital load history.
+
+Without arguments this writes data/hospital_history.csv with 900 days for a
+single hospital, as before. For load tests it can generate many hospitals
+spread over cities::
+
+    python generate_data.py --days 3650 --hospitals 5000 --out data/synthetic --format parquet --workers 8
+
+Rows are generated with NumPy, a block of days at a time for a shard of
+hospitals, and appended to one part file per shard, so memory stays constant
+however large the output is. Each shard has its own generator seeded from
+(seed, shard), and shards have a fixed number of hospitals. The output for a
+given seed and start date is therefore the same for any number of workers.
+
+Pollution, temperature and viral cases are drawn per city and day and
+shared by that city's hospitals, from a generator seeded by (seed, city,
+chunk offset) rather than by shard. Load is drawn per hospital from the shard
+generator and scaled by hospital size.
+"""
+import argparse
 import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ["date", "city", "hospital_id", "aqi", "temp", "season", "viral_cases", "festival_flag", "hospital_load"]
+DEFAULT_CITIES = ["delhi", "mumbai", "bangalore", "chennai", "kolkata", "hyderabad", "pune"]
+# baseline pollution offset per city; unknown cities get 0
+CITY_AQI_OFFSET = {"delhi": 60, "kolkata": 30, "mumbai": 10, "pune": 0, "hyderabad": 0, "chennai": -10, "bangalore": -20}
+FESTIVAL_DAYS = {(10, 24), (11, 4), (3, 8), (8, 31)}  # example: placeholder dates (Diwali/Holi/Ganesh/others)
+HOSPITALS_PER_SHARD = 100
+CHUNK_DAYS = 365
+
+def _calendar(start: np.datetime64, n_days: int) -> Dict[str, np.ndarray]:
+    days = start + np.arange(n_days)
+    months = days.astype("datetime64[M]")
+    month = months.astype(np.int64) % 12 + 1
+    day = (days - months).astype(np.int64) + 1
+    festival = np.zeros(n_days, dtype=np.int64)
+    for m, d in FESTIVAL_DAYS:
+        festival |= (month == m) & (day == d)
+    return {"date": days, "season": (month % 12) // 3, "festival_flag": festival}
 
-def is_festival(date):
-    # very simple: treat fixed dates as festival examples (you can expand)
-    month_day = (date.month, date.day)
-    festivals = {(10,24), (11,4), (3,8), (8,31)}  # example: placeholder dates (Diwali/Holi/Ganesh/others)
-    return 1 if month_day in festivals else 0
+def _city_days(rng: np.random.Generator, season: np.ndarray, aqi_offset: np.ndarray) -> Dict[str, np.ndarray]:
+    """Per (city, day) pollution, temperature and viral cases; arrays are (cities, days)."""
+    shape = (len(aqi_offset), len(season))
+    aqi = np.maximum(10, np.trunc(rng.normal(80 + 30 * season + aqi_offset[:, None], 40, shape))).astype(np.int64)
+    temp = np.trunc(rng.normal(25 - 2 * season, 6, shape)).astype(np.int64)
+    viral_cases = rng.poisson(5 + 0.01 * aqi).astype(np.int64)
+    return {"aqi": aqi, "temp": temp, "viral_cases": viral_cases}
 
-def generate_days(n_days=900):
-    start = datetime.today() - timedelta(days=n_days)
+def _shared_city_days(seed: int, offset: int, cities: np.ndarray, season: np.ndarray) -> Dict[str, np.ndarray]:
+    """``_city_days`` for each city from its own (seed, city, offset) generator.
+
+    The draws depend only on the city and the chunk, not on which shard asks,
+    so every hospital in a city sees the same weather on the same day.
+    """
     rows = []
-    for i in range(n_days):
-        d = start + timedelta(days=i)
-        season = (d.month%12)//3  # rough season
-        aqi = max(10, int(np.random.normal(80 + 30*season, 40)))  # higher in some seasons
-        temp = int(np.random.normal(25 - 2*season, 6))
-        viral_cases = max(0,int(np.random.poisson(5 + 0.01*aqi)))
-        festival = is_festival(d)
-        # hospital load baseline + noise + festival/pollution effects
-        baseline = 50 + 0.3*aqi + 20*festival + 0.5*viral_cases + np.random.normal(0,10)
-        hospital_load = int(max(5, baseline))
-        rows.append({
-            "date": d.strftime("%Y-%m-%d"),
-            "aqi": aqi,
-            "temp": temp,
-            "season": season,
-            "viral_cases": viral_cases,
-            "festival_flag": festival,
-            "hospital_load": hospital_load
-        })
-    return pd.DataFrame(rows)
+    for city in cities:
+        rng = np.random.default_rng([seed, zlib.crc32(str(city).encode("utf-8")), offset])
+        rows.append(_city_days(rng, season, np.array([CITY_AQI_OFFSET.get(city, 0)], dtype=np.float64)))
+    return {key: np.concatenate([row[key] for row in rows]) for key in ("aqi", "temp", "viral_cases")}
+
+def generate_chunk(rng: np.random.Generator, start: np.datetime64, n_days: int,
+                   hospital_ids: List[str], hospital_cities: List[str], sizes: np.ndarray,
+                   seed: int = 0, offset: int = 0) -> pd.DataFrame:
+    """Rows for every (day, hospital) pair, ordered by date then hospital.
+
+    ``rng`` supplies the per-hospital noise; city weather comes from
+    generators seeded by (``seed``, city, ``offset``).
+    """
+    cal = _calendar(start, n_days)
+    cities, city_index = np.unique(np.asarray(hospital_cities), return_inverse=True)
+    weather = _shared_city_days(seed, offset, cities, cal["season"])
+
+    n_hosp = len(hospital_ids)
+    # (days, hospitals) views of the per-city draws
+    aqi = weather["aqi"][city_index].T
+    viral = weather["viral_cases"][city_index].T
+    festival = cal["festival_flag"][:, None]
+    baseline = sizes * (50 + 0.3 * aqi + 20 * festival + 0.5 * viral) + rng.normal(0, 10, (n_days, n_hosp))
+    load = np.trunc(np.maximum(5, baseline)).astype(np.int64)
+
+    return pd.DataFrame({
+        "date": np.datetime_as_string(np.repeat(cal["date"], n_hosp), unit="D"),
+        "city": np.tile(np.asarray(hospital_cities, dtype=object), n_days),
+        "hospital_id": np.tile(np.asarray(hospital_ids, dtype=object), n_days),
+        "aqi": aqi.ravel(),
+        "temp": weather["temp"][city_index].T.ravel(),
+        "season": np.repeat(cal["season"], n_hosp),
+        "viral_cases": viral.ravel(),
+        "festival_flag": np.repeat(cal["festival_flag"], n_hosp),
+        "hospital_load": load.ravel(),
+    }, columns=COLUMNS)
+
+def _write_shard(out_dir: str, shard: int, start: str, n_days: int, first: int, count: int,
+                 cities: List[str], fmt: str, seed: int, chunk_days: int) -> Dict[str, int]:
+    """Generate hospitals [first, first + count) and stream them to one part file."""
+    rng = np.random.default_rng([seed, shard])
+    ids = [f"H{i:06d}" for i in range(first, first + count)]
+    hospital_cities = [cities[i % len(cities)] for i in range(first, first + count)]
+    # hospital size relative to an average one
+    sizes = rng.lognormal(0.0, 0.4, count)
+    path = os.path.join(out_dir, f"part-{shard:05d}.{fmt}")
+    tmp_path = path + ".tmp"
+
+    writer = None
+    rows = 0
+    day0 = np.datetime64(start, "D")
+    try:
+        for offset in range(0, n_days, chunk_days):
+            chunk = generate_chunk(rng, day0 + offset, min(chunk_days, n_days - offset), ids, hospital_cities, sizes,
+                                   seed=seed, offset=offset)
+            if fmt == "parquet":
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema)
+                writer.write_table(table)
+            else:
+                chunk.to_csv(tmp_path, mode="w" if offset == 0 else "a", header=offset == 0, index=False)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, path)
+    return {"shard": shard, "rows": rows}
+
+def generate_dataset(out_dir: str, n_days: int, n_hospitals: int, start: str = None, cities: List[str] = None,
+                     fmt: str = "csv", workers: int = 1, seed: int = 0, chunk_days: int = CHUNK_DAYS) -> int:
+    """Write one part file per shard of HOSPITALS_PER_SHARD hospitals; returns the row count."""
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"Unsupported format '{fmt}'")
+    if fmt == "parquet":
+        # fail before starting workers
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as exc:
+            raise ImportError("parquet output needs pyarrow (pip install pyarrow); use --format csv without it") from exc
+    start = start or (datetime.today() - timedelta(days=n_days)).strftime("%Y-%m-%d")
+    cities = cities or DEFAULT_CITIES
+    os.makedirs(out_dir, exist_ok=True)
+
+    shards = [
+        (out_dir, shard, start, n_days, first, min(HOSPITALS_PER_SHARD, n_hospitals - first), cities, fmt, seed, chunk_days)
+        for shard, first in enumerate(range(0, n_hospitals, HOSPITALS_PER_SHARD))
+    ]
+    if workers <= 1:
+        results = [_write_shard(*args) for args in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_write_shard, *zip(*shards)))
+    return sum(r["rows"] for r in results)
+
+def generate_days(n_days=900, seed=None, start=None):
+    """Single-hospital history in the original data/hospital_history.csv layout."""
+    start = start or (datetime.today() - timedelta(days=n_days)).strftime("%Y-%m-%d")
+    rng = np.random.default_rng(seed)
+    cal = _calendar(np.datetime64(start, "D"), n_days)
+    weather = _city_days(rng, cal["season"], np.zeros(1))
+    aqi, viral = weather["aqi"][0], weather["viral_cases"][0]
+    baseline = 50 + 0.3 * aqi + 20 * cal["festival_flag"] + 0.5 * viral + rng.normal(0, 10, n_days)
+    return pd.DataFrame({
+        "date": np.datetime_as_string(cal["date"], unit="D"),
+        "aqi": aqi,
+        "temp": weather["temp"][0],
+        "season": cal["season"],
+        "viral_cases": viral,
+        "festival_flag": cal["festival_flag"],
+        "hospital_load": np.trunc(np.maximum(5, baseline)).astype(np.int64),
+    })
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic hospital history")
+    parser.add_argument("--days", type=int, default=900)
+    parser.add_argument("--hospitals", type=int, default=0, help="0 writes the single-hospital data/hospital_history.csv")
+    parser.add_argument("--cities", default=",".join(DEFAULT_CITIES))
+    parser.add_argument("--start", help="first date (YYYY-MM-DD); defaults to --days before today")
+    parser.add_argument("--out", default="data/synthetic")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--chunk-days", type=int, default=CHUNK_DAYS)
+    args = parser.parse_args()
+
+    if not args.hospitals:
+        df = generate_days(args.days, seed=args.seed, start=args.start)
+        os.makedirs("data", exist_ok=True)
+        df.to_csv("data/hospital_history.csv", index=False)
+        print("Saved data/hospital_history.csv")
+        return
+
+    try:
+        rows = generate_dataset(
+            args.out, args.days, args.hospitals, start=args.start, cities=args.cities.split(","),
+            fmt=args.format, workers=args.workers, seed=args.seed or 0, chunk_days=args.chunk_days,
+        )
+    except ImportError as exc:
+        parser.exit(1, f"error: {exc}\n")
+    print(f"Saved {rows} rows for {args.hospitals} hospitals to {args.out}")
 
 if __name__ == "__main__":
-    df = generate_days(900)
-    os.makedirs("data", exist_ok=True)
-    df.to_csv("data/hospital_history.csv", index=False)
-    print("Saved data/hospital_history.csv")
+    main()
@@ -1,6 +1,5 @@
 import NEST as nest
 
-import requests
 from datetime import datetime
 
 @nest.tool
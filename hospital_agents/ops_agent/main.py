@@ -1,10 +1,14 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
 import NEST as nest
 
-import requests
+from utils import http_client
 
 @nest.tool
 def generate_hospital_plan():
-    pred = requests.post("http://localhost:8020/run", json={"input": "predict"}).json()
+    pred = http_client.post("http://localhost:8020/run", json={"input": "predict"}).json()
     surge = pred["output"]
 
     level = surge["surge_level"]
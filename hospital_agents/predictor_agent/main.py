@@ -1,10 +1,14 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
 import NEST as nest
 
-import requests
+from utils import http_client
 
 @nest.tool
 def predict_patient_surge():
-    data = requests.post("http://localhost:8010/run", json={"input": "fetch data"}).json()
+    data = http_client.post("http://localhost:8010/run", json={"input": "fetch data"}).json()
     info = data["output"]
 
     pollution = info["pollution_index"]
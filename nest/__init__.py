@@ -1,5 +1,5 @@
 """NEST Agent Framework - Minimal implementation for agentic AI system."""
 from .nest import Agent, tool, run
+from .client import RemoteAgent, RemoteToolError, connect
 
-__all__ = ['Agent', 'tool', 'run']
-
+__all__ = ['Agent', 'tool', 'run', 'connect', 'RemoteAgent', 'RemoteToolError']
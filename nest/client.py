@@ -0,0 +1,177 @@
+"""Client for calling tools on remote nest agents.
+
+``connect(url)`` returns a RemoteAgent whose attributes are callable proxies
+for the agent's tools::
+
+    data_agent = connect("http://localhost:8010")
+    payload = data_agent.collect_all_data(city="Mumbai", date="2024-11-01")
+
+    # same host: skip loopback TCP, and use MessagePack for large payloads
+    data_agent = connect("unix:///tmp/data_agent.sock", encoding="msgpack")
+
+Each thread keeps one persistent HTTP/1.1 connection per agent, so repeated
+calls reuse the same socket instead of reconnecting.
+"""
+import http.client
+import select
+import socket
+import threading
+from typing import Any, Dict, List
+from urllib.parse import urlparse
+
+from . import codec
+
+
+class RemoteToolError(Exception):
+    """Raised when a remote tool call returns an error response."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"[{status}] {message}")
+        self.status = status
+        self.message = message
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over a Unix domain socket."""
+
+    def __init__(self, path: str, timeout: float = None):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            sock.settimeout(self.timeout)
+        sock.connect(self.unix_path)
+        self.sock = sock
+
+
+def _peer_closed(sock: socket.socket) -> bool:
+    """True if the server has closed (or reset) an idle keep-alive socket."""
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+    except (OSError, ValueError):
+        return True
+    # an idle connection has nothing to read unless the peer sent EOF
+    return bool(readable)
+
+
+class RemoteAgent:
+    """Proxy for a nest agent served by ``nest.run``.
+
+    Args:
+        url: ``http://host:port`` or ``unix:///path/to/socket``
+        encoding: ``"json"`` or ``"msgpack"`` (falls back to JSON if msgpack
+            isn't installed)
+        timeout: Socket timeout in seconds for each call
+        compress: Ask for gzip/brotli responses (worth it across slow links,
+            not on loopback)
+    """
+
+    def __init__(self, url: str, encoding: str = "json", timeout: float = 30.0, compress: bool = False):
+        parsed = urlparse(url)
+        if parsed.scheme == "unix":
+            self._unix_path = parsed.path
+            self._host, self._port = None, None
+        elif parsed.scheme == "http":
+            self._unix_path = None
+            self._host, self._port = parsed.hostname, parsed.port or 80
+        else:
+            raise ValueError(f"Unsupported nest URL scheme: {url}")
+        self.url = url
+        self.timeout = timeout
+        self.content_type = codec.normalize(codec.MSGPACK if encoding == "msgpack" else codec.JSON)
+        self.accept_encoding = ("br, gzip" if codec.brotli is not None else "gzip") if compress else None
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._unix_path:
+                conn = _UnixHTTPConnection(self._unix_path, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(self._host, self._port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _request(self, method: str, path: str, body: Any = None):
+        payload = codec.encode(body, self.content_type) if body is not None else None
+        headers = {"Accept": self.content_type}
+        if self.accept_encoding:
+            headers["Accept-Encoding"] = self.accept_encoding
+        if payload is not None:
+            headers["Content-Type"] = self.content_type
+
+        for attempt in range(2):
+            conn = self._connection()
+            if conn.sock is not None and _peer_closed(conn.sock):
+                # closed while idle; reconnect rather than send into a dead socket
+                conn.close()
+            reused = conn.sock is not None
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+            except (ConnectionResetError, BrokenPipeError):
+                # the server closed an idle keep-alive connection before it got
+                # the request, so nothing ran; reconnect once
+                conn.close()
+                if not reused or attempt:
+                    raise
+                continue
+            except Exception:
+                conn.close()
+                raise
+            try:
+                response = conn.getresponse()
+                raw = response.read()
+                break
+            except Exception:
+                # the request went out and may have run; replaying it could
+                # repeat the tool call, so let the caller decide
+                conn.close()
+                raise
+
+        if response.will_close:
+            conn.close()
+        raw = codec.decompress(raw, response.getheader("Content-Encoding"))
+        response_type = codec.normalize(response.getheader("Content-Type", ""))
+        data = codec.decode(raw, response_type) if raw else {}
+        if response.status >= 400:
+            message = data.get("error") if isinstance(data, dict) else None
+            raise RemoteToolError(response.status, message or response.reason)
+        return data
+
+    def call(self, tool_name: str, **kwargs) -> Any:
+        """Invoke a remote tool with keyword arguments and return its result."""
+        return self._request("POST", f"/tool/{tool_name}", kwargs).get("result")
+
+    def info(self) -> Dict[str, Any]:
+        """Return the agent's name, instructions and tool names."""
+        return self._request("GET", "/")
+
+    def tools(self) -> List[str]:
+        return list(self.info().get("tools", []))
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        def proxy(**kwargs):
+            return self.call(name, **kwargs)
+
+        proxy.__name__ = name
+        return proxy
+
+    def __repr__(self) -> str:
+        return f"RemoteAgent({self.url!r})"
+
+
+def connect(url: str, encoding: str = "json", timeout: float = 30.0, compress: bool = False) -> RemoteAgent:
+    """Return a RemoteAgent for the nest agent served at ``url``."""
+    return RemoteAgent(url, encoding=encoding, timeout=timeout, compress=compress)
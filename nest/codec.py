@@ -0,0 +1,175 @@
+"""Body encodings shared by the nest server and client and the API server.
+
+JSON is always available, and is encoded with ``orjson`` when it is
+installed. MessagePack is used when the optional ``msgpack`` package is
+installed and the peer asks for it through ``Content-Type`` / ``Accept``; it
+is noticeably smaller and faster for large payloads.
+
+Responses can also be trimmed and compressed:
+
+- ``project(obj, fields)`` keeps only the requested dotted subtrees, and
+  named views (``register_view``) bundle a field list under one name.
+- ``negotiate_encoding(accept_encoding)`` picks brotli (if the ``brotli``
+  package is installed) or gzip. ``compress`` applies it to bodies of at
+  least ``COMPRESS_MIN_BYTES`` bytes.
+"""
+import gzip
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+
+_MSGPACK_ALIASES = {MSGPACK, "application/x-msgpack", "application/vnd.msgpack"}
+
+# Bodies smaller than this aren't worth compressing
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# view name -> dotted field paths
+_VIEWS: Dict[str, Sequence[str]] = {}
+
+
+def normalize(content_type: str) -> str:
+    """Map a Content-Type/Accept value to JSON or MSGPACK (JSON if unsupported)."""
+    for part in (content_type or "").split(","):
+        media_type = part.split(";")[0].strip().lower()
+        if media_type in _MSGPACK_ALIASES and msgpack is not None:
+            return MSGPACK
+    return JSON
+
+
+def dumps_json(obj) -> bytes:
+    """UTF-8 JSON bytes; raises TypeError for values JSON can't represent."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode(obj, content_type: str = JSON) -> bytes:
+    if content_type == MSGPACK:
+        return msgpack.packb(obj, use_bin_type=True)
+    return dumps_json(obj)
+
+
+def decode(raw: bytes, content_type: str = JSON):
+    if not raw:
+        return {}
+    if content_type == MSGPACK:
+        return msgpack.unpackb(raw, raw=False)
+    return json.loads(raw.decode("utf-8"))
+
+
+def register_view(name: str, fields: Sequence[str]) -> None:
+    """Make ``view=name`` shorthand for a list of dotted field paths."""
+    _VIEWS[name] = tuple(fields)
+
+
+def resolve_fields(fields: Optional[str] = None, view: Optional[str] = None) -> Optional[List[str]]:
+    """Field paths requested through ``fields=a,b.c`` and/or ``view=name``.
+
+    Returns None when no projection was asked for; raises ValueError for an
+    unknown view.
+    """
+    paths: List[str] = []
+    if view and view != "full":
+        if view not in _VIEWS:
+            raise ValueError(f"Unknown view '{view}' (available: full, {', '.join(sorted(_VIEWS))})")
+        paths.extend(_VIEWS[view])
+    if fields:
+        paths.extend(part.strip() for part in fields.split(",") if part.strip())
+    return paths or None
+
+
+def project(obj: Any, fields: Optional[Iterable[str]]) -> Any:
+    """Copy of ``obj`` keeping only the given dotted subtrees.
+
+    Missing paths are skipped. Non-dict values are returned unchanged, and
+    a path that ends on a whole subtree keeps all of it.
+    """
+    if not fields or not isinstance(obj, dict):
+        return obj
+    tree: Dict[str, Any] = {}
+    for path in fields:
+        node = tree
+        parts = path.split(".")
+        for part in parts[:-1]:
+            child = node.setdefault(part, {})
+            if child is None:
+                # an earlier, shorter path already keeps this whole subtree
+                break
+            node = child
+        else:
+            node[parts[-1]] = None
+    return _project(obj, tree)
+
+
+def _project(obj: Dict[str, Any], tree: Dict[str, Any]) -> Dict[str, Any]:
+    out = {}
+    for key, subtree in tree.items():
+        if key not in obj:
+            continue
+        value = obj[key]
+        out[key] = value if subtree is None or not isinstance(value, dict) else _project(value, subtree)
+    return out
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported Content-Encoding for an Accept-Encoding header, if any."""
+    accepted = set()
+    for part in (accept_encoding or "").lower().split(","):
+        token, _, params = part.partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(token.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(data: bytes, encoding: Optional[str], min_bytes: int = None) -> Tuple[bytes, Optional[str]]:
+    """Compress ``data`` with the negotiated encoding when it is large enough.
+
+    Returns the body and the Content-Encoding to send (None if uncompressed).
+    """
+    if encoding is None or len(data) < (COMPRESS_MIN_BYTES if min_bytes is None else min_bytes):
+        return data, None
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY), "br"
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0), "gzip"
+
+
+def decompress(data: bytes, encoding: Optional[str]) -> bytes:
+    """Undo ``compress`` for a response's Content-Encoding."""
+    if not encoding or encoding == "identity":
+        return data
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "br" and brotli is not None:
+        return brotli.decompress(data)
+    raise ValueError(f"Unsupported Content-Encoding '{encoding}'")
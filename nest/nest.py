@@ -5,17 +5,59 @@ This implements:
 - Agent class to hold metadata and tools
 - run(agent, port=...) which starts a tiny HTTP server exposing:
   - GET / -> agent info
+  - GET /metrics -> Prometheus metrics (tool call counts and latency)
   - POST /tool/<tool_name> -> invoke the tool with JSON body as kwargs
+    (``?fields=`` / ``?view=`` trim the result, see codec.project)
 
 This is intentionally minimal and dependency-free so the repository can run
 without installing an external "nest" package. It's suitable for local
 testing and hackathon/demo purposes.
+
+The server speaks HTTP/1.1 with keep-alive and hands each connection to a
+bounded worker pool, so one slow tool call doesn't block other clients.
+Request bodies are size-limited, and SIGTERM/Ctrl+C stop accepting new
+connections and drain in-flight calls before exiting. Bodies may be JSON or
+MessagePack (see codec.py), large responses are gzip/brotli compressed for
+clients that send Accept-Encoding, and run(unix_socket=...) serves on a Unix
+domain socket instead of TCP for agents that share a host.
 """
 from http.server import BaseHTTPRequestHandler, HTTPServer
-import json
+from concurrent.futures import ThreadPoolExecutor
 import functools
+import socketserver
+import os
+import signal
+import socket
 import threading
-from urllib.parse import urlparse
+import time
+from urllib.parse import parse_qs, urlparse
+
+from . import codec
+
+try:
+    from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Counter, Histogram, render as render_metrics
+except ImportError:
+    # used outside this repository: serve without metrics
+    render_metrics = None
+
+
+DEFAULT_WORKERS = int(os.getenv("NEST_WORKERS", str(min(64, (os.cpu_count() or 1) * 4))))
+DEFAULT_MAX_BODY_BYTES = int(os.getenv("NEST_MAX_BODY_BYTES", str(1024 * 1024)))
+DEFAULT_KEEPALIVE_TIMEOUT = float(os.getenv("NEST_KEEPALIVE_TIMEOUT", "15"))
+DEFAULT_DRAIN_TIMEOUT = float(os.getenv("NEST_DRAIN_TIMEOUT", "30"))
+# open connections accepted per server; 0 means twice the worker count
+DEFAULT_MAX_CONNECTIONS = int(os.getenv("NEST_MAX_CONNECTIONS", "0"))
+
+_REJECT_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Content-Length: 0\r\nRetry-After: 1\r\nConnection: close\r\n\r\n"
+)
+
+if render_metrics is not None:
+    TOOL_CALLS = Counter("nest_tool_calls_total", "nest tool invocations by status", ["agent", "tool", "status"])
+    TOOL_SECONDS = Histogram("nest_tool_seconds", "nest tool execution latency", ["agent", "tool"])
+    ENCODE_SECONDS = Histogram("nest_encode_seconds", "nest response encoding latency", ["content_type"])
+    CONNECTIONS_REJECTED = Counter("nest_connections_rejected_total", "Connections refused at the connection cap")
 
 
 def tool(func):
@@ -36,24 +78,268 @@ class Agent:
 
 
 def _json_response(handler, obj, status=200):
-    data = json.dumps(obj).encode("utf-8")
+    # JSON unless the client negotiated MessagePack through Accept
+    content_type = getattr(handler, "response_type", codec.JSON)
+    started = time.perf_counter()
+    data = codec.encode(obj, content_type)
+    # gzip/brotli for large bodies when the client sent Accept-Encoding
+    data, content_encoding = codec.compress(data, getattr(handler, "response_encoding", None))
+    if render_metrics is not None:
+        ENCODE_SECONDS.observe(time.perf_counter() - started, content_type)
     handler.send_response(status)
-    handler.send_header("Content-Type", "application/json")
+    handler.send_header("Content-Type", content_type)
+    if content_encoding:
+        handler.send_header("Content-Encoding", content_encoding)
+    # the body depends on both headers, so shared caches must key on them
+    handler.send_header("Vary", "Accept, Accept-Encoding")
     handler.send_header("Content-Length", str(len(data)))
     handler.end_headers()
     handler.wfile.write(data)
 
 
-def run(agent: Agent, port: int = 8010):
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that serves each connection on a bounded thread pool.
+
+    Tracks open connections and in-flight requests so ``drain`` can wait for
+    running calls to finish and then close idle keep-alive connections.
+
+    At most ``max_connections`` connections are open at once; beyond that a
+    new connection gets an immediate 503 and is closed, so the pool's queue
+    stays bounded. While connections are queued for a worker, idle keep-alive
+    connections are closed and finished requests answer ``Connection: close``,
+    so workers go to waiting clients instead of idling until the keep-alive
+    timeout.
+    """
+
+    request_queue_size = 128
+    allow_reuse_address = True
+
+    def __init__(self, server_address, handler_class, workers: int = DEFAULT_WORKERS,
+                 max_connections: int = None):
+        super().__init__(server_address, handler_class)
+        self.workers = workers
+        self.max_connections = max_connections or DEFAULT_MAX_CONNECTIONS or workers * 2
+        self.draining = False
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nest-worker")
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._connections = set()
+        # connections waiting between requests, and connections waiting for a worker
+        self._waiting_for_request = set()
+        self._queued = 0
+        self._busy = 0
+
+    @property
+    def backlogged(self) -> bool:
+        """True while accepted connections are waiting for a worker."""
+        return self._queued > 0
+
+    def process_request(self, request, client_address):
+        idle = None
+        with self._lock:
+            if len(self._connections) >= self.max_connections:
+                idle = False
+            else:
+                self._connections.add(request)
+                self._queued += 1
+                if len(self._connections) - self._queued >= self.workers and self._waiting_for_request:
+                    idle = self._waiting_for_request.pop()
+        if idle is False:
+            self._reject(request)
+            return
+        if idle is not None:
+            # free that worker for the new connection; an idle keep-alive
+            # client reconnects on its next request
+            try:
+                idle.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass
+        self._pool.submit(self._process_request, request, client_address)
+
+    def _reject(self, request):
+        if render_metrics is not None:
+            CONNECTIONS_REJECTED.inc()
+        try:
+            request.sendall(_REJECT_RESPONSE)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def _process_request(self, request, client_address):
+        with self._lock:
+            self._queued -= 1
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self._lock:
+                self._connections.discard(request)
+                self._waiting_for_request.discard(request)
+            self.shutdown_request(request)
+
+    def waiting_for_request(self, connection):
+        """Mark a keep-alive connection as idle between requests."""
+        with self._lock:
+            self._waiting_for_request.add(connection)
+
+    def request_started(self, connection):
+        with self._lock:
+            self._waiting_for_request.discard(connection)
+
+    def begin_call(self):
+        with self._lock:
+            self._busy += 1
+
+    def end_call(self):
+        with self._lock:
+            self._busy -= 1
+            if self._busy == 0:
+                self._idle.notify_all()
+
+    def drain(self, timeout: float = DEFAULT_DRAIN_TIMEOUT):
+        """Wait for in-flight calls, then close idle connections and stop workers.
+
+        Call after ``shutdown()`` has stopped the accept loop.
+        """
+        self.draining = True
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self._busy and time.monotonic() < deadline:
+                self._idle.wait(deadline - time.monotonic())
+            remaining = self._busy
+            idle_connections = list(self._connections)
+        if remaining:
+            print(f"[nest stub] Drain timeout with {remaining} call(s) still running")
+        # Wake up keep-alive connections blocked waiting for the next request
+        for conn in idle_connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self._pool.shutdown(wait=True)
+        self.server_close()
+
+
+class PooledUnixHTTPServer(PooledHTTPServer):
+    """PooledHTTPServer listening on a Unix domain socket path."""
+
+    address_family = socket.AF_UNIX
+    allow_reuse_address = False
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        # HTTPServer.server_bind expects (host, port); bind the path directly
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = "localhost"
+        self.server_port = 0
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def run(
+    agent: Agent,
+    port: int = 8010,
+    workers: int = None,
+    max_body_bytes: int = None,
+    keepalive_timeout: float = None,
+    drain_timeout: float = None,
+    unix_socket: str = None,
+    max_connections: int = None,
+):
     """Start a tiny HTTP server exposing agent tools.
 
     Endpoints:
     - GET /           -> {name, instructions, tools: [names]}
+    - GET /metrics    -> Prometheus text metrics of this process
     - POST /tool/<t>  -> JSON body passed as kwargs to the tool; returns JSON result
+
+    Args:
+        agent: Agent whose tools are served
+        port: TCP port to listen on
+        workers: Worker threads serving connections (NEST_WORKERS)
+        max_connections: Open connections accepted before new ones get 503 (NEST_MAX_CONNECTIONS)
+        max_body_bytes: Largest accepted request body (NEST_MAX_BODY_BYTES)
+        keepalive_timeout: Seconds an idle keep-alive connection is kept (NEST_KEEPALIVE_TIMEOUT)
+        drain_timeout: Seconds to wait for in-flight calls on shutdown (NEST_DRAIN_TIMEOUT)
+        unix_socket: Serve on this Unix domain socket path instead of the TCP port
     """
+    workers = workers or DEFAULT_WORKERS
+    max_body_bytes = max_body_bytes or DEFAULT_MAX_BODY_BYTES
+    keepalive_timeout = keepalive_timeout or DEFAULT_KEEPALIVE_TIMEOUT
+    drain_timeout = drain_timeout if drain_timeout is not None else DEFAULT_DRAIN_TIMEOUT
 
     class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # buffer writes so headers and body leave in one send; separate small
+        # writes stall ~40ms on keep-alive connections (Nagle + delayed ACK)
+        wbufsize = -1
+        # idle keep-alive connections are closed after this many seconds
+        timeout = keepalive_timeout
+        response_type = codec.JSON
+        response_encoding = None
+
+        def handle_one_request(self):
+            self.server.waiting_for_request(self.connection)
+            super().handle_one_request()
+
+        def parse_request(self):
+            self.server.request_started(self.connection)
+            return super().parse_request()
+
+        def end_headers(self):
+            if self.server.backlogged:
+                # hand this worker to a queued connection after this response
+                self.close_connection = True
+            # tell the client when this response ends the connection
+            if self.close_connection and not any(
+                line.lower().startswith(b"connection:") for line in getattr(self, "_headers_buffer", [])
+            ):
+                self.send_header("Connection", "close")
+            super().end_headers()
+
+        def _empty_response(self, status):
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def _read_body(self):
+            """Return the request body, or None after sending an error response."""
+            if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+                self.close_connection = True
+                _json_response(self, {"error": "Chunked bodies are not supported"}, status=411)
+                return None
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+            except ValueError:
+                self.close_connection = True
+                _json_response(self, {"error": "Invalid Content-Length"}, status=400)
+                return None
+            if length > max_body_bytes:
+                # the unread body would corrupt the next request on this connection
+                self.close_connection = True
+                _json_response(
+                    self, {"error": f"Body exceeds {max_body_bytes} bytes"}, status=413
+                )
+                return None
+            return self.rfile.read(length) if length > 0 else b""
+
+        def address_string(self):
+            # Unix socket peers have no (host, port) address
+            return self.client_address[0] if self.client_address else "unix"
+
+        def _negotiate(self):
+            self.response_type = codec.normalize(self.headers.get("Accept", ""))
+            self.response_encoding = codec.negotiate_encoding(self.headers.get("Accept-Encoding", ""))
+
         def do_GET(self):
+            self._negotiate()
             parsed = urlparse(self.path)
             if parsed.path == "/":
                 _json_response(self, {
@@ -61,54 +347,117 @@ def run(agent: Agent, port: int = 8010):
                     "instructions": agent.instructions,
                     "tools": list(agent.tools.keys()),
                 })
-            else:
-                self.send_response(404)
+            elif parsed.path == "/metrics" and render_metrics is not None:
+                data = render_metrics().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", METRICS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(data)))
                 self.end_headers()
+                self.wfile.write(data)
+            else:
+                self._empty_response(404)
 
         def do_POST(self):
+            self.server.begin_call()
+            try:
+                self._handle_post()
+            finally:
+                self.server.end_call()
+                if self.server.draining:
+                    self.close_connection = True
+
+        def _handle_post(self):
+            self._negotiate()
             parsed = urlparse(self.path)
             parts = parsed.path.strip("/").split("/")
             if len(parts) == 2 and parts[0] == "tool":
+                raw = self._read_body()
+                if raw is None:
+                    return
+
                 tool_name = parts[1]
                 func = agent.tools.get(tool_name)
                 if func is None:
                     _json_response(self, {"error": f"Unknown tool '{tool_name}'"}, status=404)
                     return
 
-                length = int(self.headers.get("Content-Length", 0))
-                raw = self.rfile.read(length) if length else b""
+                # ?fields=a,b.c / ?view=compact trim the result before encoding
+                query = parse_qs(parsed.query)
+                try:
+                    fields = codec.resolve_fields(
+                        ",".join(query.get("fields", [])), (query.get("view") or [None])[0]
+                    )
+                except ValueError as e:
+                    _json_response(self, {"error": str(e)}, status=400)
+                    return
+
+                request_type = codec.normalize(self.headers.get("Content-Type", ""))
                 try:
-                    body = json.loads(raw.decode("utf-8")) if raw else {}
+                    body = codec.decode(raw, request_type)
                 except Exception:
-                    _json_response(self, {"error": "Invalid JSON body"}, status=400)
+                    name = "MessagePack" if request_type == codec.MSGPACK else "JSON"
+                    _json_response(self, {"error": f"Invalid {name} body"}, status=400)
                     return
 
                 # allow body to be a dict of kwargs
+                started = time.perf_counter()
                 try:
                     if isinstance(body, dict):
                         result = func(**body)
                     else:
                         # if body isn't a dict, pass it as single arg
                         result = func(body)
-                    _json_response(self, {"result": result})
                 except Exception as e:
+                    self._record_call(tool_name, "error", started)
+                    _json_response(self, {"error": str(e)}, status=500)
+                    return
+                self._record_call(tool_name, "ok", started)
+                try:
+                    _json_response(self, {"result": codec.project(result, fields)})
+                except Exception as e:
+                    # result not encodable
                     _json_response(self, {"error": str(e)}, status=500)
             else:
-                self.send_response(404)
-                self.end_headers()
+                # drain any body so the connection can be reused
+                if self._read_body() is not None:
+                    self._empty_response(404)
+
+        def _record_call(self, tool_name, status, started):
+            if render_metrics is not None:
+                TOOL_SECONDS.observe(time.perf_counter() - started, agent.name, tool_name)
+                TOOL_CALLS.inc(agent.name, tool_name, status)
 
         def log_message(self, format, *args):
             # keep server quiet by default; print minimal info
             print("[nest stub] %s - - %s" % (self.address_string(), format % args))
 
-    server = HTTPServer(("", port), Handler)
+    if unix_socket:
+        server = PooledUnixHTTPServer(unix_socket, Handler, workers=workers, max_connections=max_connections)
+        where = f"unix socket {unix_socket}"
+    else:
+        server = PooledHTTPServer(("", port), Handler, workers=workers, max_connections=max_connections)
+        where = f"port {port}"
+
+    print(
+        f"[nest stub] Agent '{agent.name}' listening on {where} with {workers} workers, "
+        f"{server.max_connections} max connections. "
+        f"Tools: {list(agent.tools.keys())}"
+    )
 
-    print(f"[nest stub] Agent '{agent.name}' listening on port {port}. Tools: {list(agent.tools.keys())}")
+    def _request_shutdown(signum, frame):
+        # shutdown() blocks until serve_forever returns, so call it off the main thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    try:
+        signal.signal(signal.SIGTERM, _request_shutdown)
+    except ValueError:
+        # not running in the main thread; rely on the caller to stop the server
+        pass
 
     try:
         # Run server in current thread (blocking). If you want non-blocking, run in a thread.
         server.serve_forever()
     except KeyboardInterrupt:
-        print("[nest stub] Shutting down")
-        server.shutdown()
-
+        pass
+    print("[nest stub] Shutting down, draining in-flight calls")
+    server.drain(drain_timeout)
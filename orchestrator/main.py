@@ -1,15 +1,36 @@
 # orchestrator/main.py
 from fastapi import FastAPI
 from pydantic import BaseModel
-import requests
+import asyncio
 import os
 from dotenv import load_dotenv
 
+from utils import http_client
+from utils.resilience import CircuitOpenError, HedgedEndpoint
+
 load_dotenv()
 FETCH_URL = os.getenv("FETCH_URL", "http://localhost:8001/fetch")
 PRED_URL  = os.getenv("PRED_URL", "http://localhost:8002/predict")
 REC_URL   = os.getenv("REC_URL", "http://localhost:8003/recommend")
 
+# Comma-separated replica lists; each request starts on the next replica in turn
+# and hedges to the ones after it
+FETCH_URLS = os.getenv("FETCH_URLS", FETCH_URL).split(",")
+PRED_URLS  = os.getenv("PRED_URLS", PRED_URL).split(",")
+REC_URLS   = os.getenv("REC_URLS", REC_URL).split(",")
+
+# Per-hop deadlines (seconds) and hedging/circuit breaker tuning
+FETCH_DEADLINE   = float(os.getenv("FETCH_DEADLINE", "8"))
+PRED_DEADLINE    = float(os.getenv("PRED_DEADLINE", "8"))
+REC_DEADLINE     = float(os.getenv("REC_DEADLINE", "8"))
+HEDGE_DELAY      = float(os.getenv("HEDGE_DELAY", "0.3"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET    = float(os.getenv("BREAKER_RESET", "10"))
+
+fetcher     = HedgedEndpoint("fetch", FETCH_URLS, HEDGE_DELAY, BREAKER_FAILURES, BREAKER_RESET)
+predictor   = HedgedEndpoint("predict", PRED_URLS, HEDGE_DELAY, BREAKER_FAILURES, BREAKER_RESET)
+recommender = HedgedEndpoint("recommend", REC_URLS, HEDGE_DELAY, BREAKER_FAILURES, BREAKER_RESET)
+
 app = FastAPI()
 
 class OrchestrateRequest(BaseModel):
@@ -17,13 +38,29 @@ class OrchestrateRequest(BaseModel):
     date: str = None
     hospital_id: str = None
 
+async def call_service(endpoint: HedgedEndpoint, payload, deadline: float):
+    """POST to a hedged endpoint; returns (json, None) or (None, error detail)."""
+    try:
+        r = await endpoint.post(http_client.get_async_client(), payload, deadline)
+    except CircuitOpenError as e:
+        return None, f"circuit open: {e}"
+    except asyncio.TimeoutError:
+        return None, f"{endpoint.name} deadline of {deadline}s exceeded"
+    except Exception as e:
+        return None, str(e)
+    if r.status_code >= 400:
+        return None, r.text
+    try:
+        return r.json(), None
+    except ValueError:
+        return None, f"{endpoint.name} returned a non-JSON response: {r.text[:200]}"
+
 @app.post("/run")
-def run(req: OrchestrateRequest):
+async def run(req: OrchestrateRequest):
     # 1) Fetch
-    r = requests.post(FETCH_URL, json={"city": req.city, "date": req.date}, timeout=8)
-    if not r.ok:
-        return {"error": "fetch failed", "detail": r.text}
-    fetch_out = r.json()
+    fetch_out, err = await call_service(fetcher, {"city": req.city, "date": req.date}, FETCH_DEADLINE)
+    if err is not None:
+        return {"error": "fetch failed", "detail": err}
 
     # 2) Predict
     pred_in = {
@@ -33,10 +70,9 @@ def run(req: OrchestrateRequest):
         "viral_cases": fetch_out.get("viral_cases", 0),
         "festival_flag": fetch_out.get("festival_flag", 0)
     }
-    r2 = requests.post(PRED_URL, json=pred_in, timeout=8)
-    if not r2.ok:
-        return {"error": "predict failed", "detail": r2.text}
-    pred_out = r2.json()
+    pred_out, err = await call_service(predictor, pred_in, PRED_DEADLINE)
+    if err is not None:
+        return {"error": "predict failed", "detail": err}
 
     # 3) Recommend
     rec_in = {
@@ -46,10 +82,9 @@ def run(req: OrchestrateRequest):
         "temp": fetch_out["temp"],
         "festival_flag": fetch_out["festival_flag"]
     }
-    r3 = requests.post(REC_URL, json=rec_in, timeout=8)
-    if not r3.ok:
-        return {"error": "recommend failed", "detail": r3.text}
-    rec_out = r3.json()
+    rec_out, err = await call_service(recommender, rec_in, REC_DEADLINE)
+    if err is not None:
+        return {"error": "recommend failed", "detail": err}
 
     # Compose final response
     return {
@@ -57,3 +92,15 @@ def run(req: OrchestrateRequest):
         "predict": pred_out,
         "recommendation": rec_out
     }
+
+@app.get("/health")
+async def health():
+    # circuit breaker state per downstream replica
+    return {
+        "status": "ok",
+        "downstream": {e.name: e.status() for e in (fetcher, predictor, recommender)},
+    }
+
+@app.on_event("shutdown")
+async def shutdown():
+    await http_client.close_async_client()
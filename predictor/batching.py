@@ -0,0 +1,164 @@
+# predictor/batching.py
+"""Micro-batching queue for single-row model inference.
+
+Concurrent single-row requests are collected for up to ``max_batch_size``
+rows or ``max_wait_ms`` milliseconds, whichever comes first, and scored with
+one matrix ``predict`` call in a worker thread. Each caller gets its own row
+back. Batch sizes, queue wait and end-to-end latency are recorded so the two
+knobs can be tuned from ``stats()``. If the worker task dies, every row it
+held or that was still queued fails with the worker's error, and a new
+worker is started.
+"""
+import asyncio
+import bisect
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Sequence
+
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+
+def _percentiles(samples: Sequence[float]) -> Dict[str, float]:
+    if not samples:
+        return {"p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "p50": round(pick(0.50), 3),
+        "p90": round(pick(0.90), 3),
+        "p99": round(pick(0.99), 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+class MicroBatcher:
+    """Collects single rows into batches for a vectorized predict function.
+
+    Args:
+        predict_fn: Callable taking a list of feature rows and returning one
+            prediction per row
+        max_batch_size: Largest batch sent to predict_fn
+        max_wait_ms: Longest time the first row of a batch waits for company
+        sample_size: Number of recent latency samples kept for percentiles
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[List[float]]], Sequence[float]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        sample_size: int = 10_000,
+    ):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: asyncio.Queue = None
+        self._worker: asyncio.Task = None
+        # batch the worker is scoring, failed with it if the worker dies
+        self._inflight: List[tuple] = []
+        self._batch_sizes = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._batches = 0
+        self._rows = 0
+        self._waits_ms = deque(maxlen=sample_size)
+        self._latencies_ms = deque(maxlen=sample_size)
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._start_worker()
+
+    def _start_worker(self) -> None:
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+        self._worker.add_done_callback(self._worker_done)
+
+    def _worker_done(self, worker: asyncio.Task) -> None:
+        if worker is not self._worker:
+            return
+        if worker.cancelled():
+            error = RuntimeError("batch worker was cancelled")
+        else:
+            error = worker.exception() or RuntimeError("batch worker exited")
+        pending = list(self._inflight)
+        self._inflight = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future, _ in pending:
+            if not future.done():
+                future.set_exception(error)
+        if not worker.cancelled():
+            print(f"Batch worker died, restarting: {error!r}")
+            self._start_worker()
+
+    async def submit(self, row: List[float]) -> Any:
+        """Queue one feature row and wait for its prediction."""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        enqueued = time.perf_counter()
+        await self._queue.put((row, future, enqueued))
+        try:
+            return await future
+        finally:
+            self._latencies_ms.append((time.perf_counter() - enqueued) * 1000)
+
+    async def predict_many(self, rows: List[List[float]]) -> List[Any]:
+        """Score an explicit batch directly, bypassing the queue."""
+        started = time.perf_counter()
+        predictions = await asyncio.get_running_loop().run_in_executor(None, self.predict_fn, rows)
+        self._record_batch(len(rows))
+        self._latencies_ms.append((time.perf_counter() - started) * 1000)
+        return list(predictions)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            self._inflight = batch
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                self._waits_ms.append((started - enqueued) * 1000)
+            rows = [row for row, _, _ in batch]
+            try:
+                predictions = await loop.run_in_executor(None, self.predict_fn, rows)
+            except Exception as exc:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                self._inflight = []
+                continue
+            if len(predictions) != len(batch):
+                raise RuntimeError(f"predict_fn returned {len(predictions)} predictions for {len(batch)} rows")
+            self._record_batch(len(batch))
+            for (_, future, _), prediction in zip(batch, predictions):
+                if not future.done():
+                    future.set_result(prediction)
+            self._inflight = []
+
+    def _record_batch(self, size: int) -> None:
+        self._batches += 1
+        self._rows += size
+        self._batch_sizes[bisect.bisect_left(BATCH_SIZE_BUCKETS, size)] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch size distribution, queue wait and request latency percentiles (ms)."""
+        labels = [f"<={b}" for b in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+        return {
+            "config": {"max_batch_size": self.max_batch_size, "max_wait_ms": self.max_wait * 1000},
+            "batches": self._batches,
+            "rows": self._rows,
+            "mean_batch_size": round(self._rows / self._batches, 2) if self._batches else 0.0,
+            "batch_size_histogram": dict(zip(labels, self._batch_sizes)),
+            "queue_wait_ms": _percentiles(list(self._waits_ms)),
+            "latency_ms": _percentiles(list(self._latencies_ms)),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
@@ -1,13 +1,52 @@
 # predictor/main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-import joblib
+from typing import Any, List, NamedTuple
 import os
 from dotenv import load_dotenv
 
+from predictor.batching import MicroBatcher
+from utils.forest_eval import COMPACT_DIR, CompactForest
+from utils.model_registry import DEFAULT_REGISTRY_ROOT, ModelHandle, ModelRegistry, ModelUnavailableError
+
 load_dotenv()
-MODEL_PATH = os.getenv("MODEL_PATH", "models/hospital_model.pkl")
-model = joblib.load(MODEL_PATH)
+# The active registry version is served; MODEL_PATH (or the files written by
+# train_model.py) is only used while the registry is empty
+MODEL_REGISTRY = os.getenv("MODEL_REGISTRY", DEFAULT_REGISTRY_ROOT)
+MODEL_PATH = os.getenv("MODEL_PATH")
+MODEL_REFRESH_SECONDS = float(os.getenv("MODEL_REFRESH_SECONDS", "5"))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "64"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+# largest /predict/batch request; scored in one predict call
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", "10000"))
+# "compact" serves the flattened forest from utils.forest_eval, "sklearn" the estimator itself
+PREDICTOR_ENGINE = os.getenv("PREDICTOR_ENGINE", "compact")
+# Larger batches go to the sklearn estimator. On the bundled 100-tree model
+# the compact evaluator wins up to ~200 rows (128: 3.9ms vs 6.1ms) and loses
+# beyond (256: 9.0ms vs 7.8ms, 1000: 23.6ms vs 10.8ms); 128 leaves a margin
+COMPACT_MAX_ROWS = int(os.getenv("COMPACT_MAX_ROWS", "128"))
+
+class ServedForest(NamedTuple):
+    compact: CompactForest
+    estimator: Any
+
+def to_compact(loaded, artifact_dir):
+    """Serve the compact arrays exported next to the artifact (or built in memory)
+    together with the estimator, which scores the large batches."""
+    if artifact_dir:
+        compact_dir = os.path.join(artifact_dir, COMPACT_DIR)
+        if os.path.isdir(compact_dir):
+            return ServedForest(CompactForest.load(compact_dir), loaded)
+    return ServedForest(CompactForest.from_model(loaded), loaded)
+
+registry = ModelRegistry(MODEL_REGISTRY)
+# loaded lazily on the first prediction, so the service starts without a model
+model = ModelHandle(
+    registry,
+    fallback_paths=[MODEL_PATH, "models/hospital_model.pkl", "models/hospital_models.pkl"],
+    refresh_seconds=MODEL_REFRESH_SECONDS,
+    adapter=to_compact if PREDICTOR_ENGINE == "compact" else None,
+)
 
 app = FastAPI()
 
@@ -18,10 +57,29 @@ class PredictRequest(BaseModel):
     viral_cases: int = 0
     festival_flag: int = 0
 
-@app.post("/predict")
-def predict(req: PredictRequest):
-    features = [[req.aqi, req.temp, req.season, req.viral_cases, req.festival_flag]]
-    pred = model.predict(features)[0]
+    def features(self):
+        return [self.aqi, self.temp, self.season, self.viral_cases, self.festival_flag]
+
+class BatchPredictRequest(BaseModel):
+    rows: List[PredictRequest]
+
+class PromoteRequest(BaseModel):
+    version: str
+
+def predict_rows(rows):
+    served = model.get()
+    if isinstance(served, ServedForest):
+        if len(rows) == 1:
+            return [served.compact.predict_one(rows[0])]
+        if len(rows) <= COMPACT_MAX_ROWS:
+            return served.compact.predict(rows)
+        served = served.estimator
+    return served.predict(rows)
+
+# Concurrent /predict calls are scored together in one model.predict call
+batcher = MicroBatcher(predict_rows, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
+
+def to_response(pred):
     # return rounded + risk level
     pred_int = int(max(0, round(pred)))
     risk = "low"
@@ -30,3 +88,46 @@ def predict(req: PredictRequest):
     elif pred_int > 80:
         risk = "medium"
     return {"predicted_load": pred_int, "risk_level": risk}
+
+@app.post("/predict")
+async def predict(req: PredictRequest):
+    try:
+        pred = await batcher.submit(req.features())
+    except ModelUnavailableError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    return to_response(pred)
+
+@app.post("/predict/batch")
+async def predict_batch(req: BatchPredictRequest):
+    if not req.rows:
+        return {"predictions": []}
+    if len(req.rows) > MAX_BATCH_ROWS:
+        raise HTTPException(
+            status_code=413, detail=f"batch of {len(req.rows)} rows exceeds limit of {MAX_BATCH_ROWS}"
+        )
+    try:
+        preds = await batcher.predict_many([row.features() for row in req.rows])
+    except ModelUnavailableError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+    return {"predictions": [to_response(p) for p in preds]}
+
+@app.get("/model")
+def model_info():
+    return {**model.info(), "engine": PREDICTOR_ENGINE, "versions": registry.versions()}
+
+@app.post("/model/promote")
+def promote(req: PromoteRequest):
+    # other workers pick up the manifest change within MODEL_REFRESH_SECONDS
+    try:
+        registry.promote(req.version)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from exc
+    try:
+        return {"serving": model.reload()}
+    except ModelUnavailableError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
+
+@app.get("/stats")
+def stats():
+    # batching metrics for tuning BATCH_MAX_SIZE / BATCH_MAX_WAIT_MS
+    return batcher.stats()
@@ -0,0 +1,24 @@
+import os
+import sys
+import time
+
+import pytest
+
+# keep tests off the on-disk caches and the background cube refresh
+os.environ.setdefault("DATA_CACHE_ENABLED", "0")
+os.environ.setdefault("FORECAST_CUBE_ENABLED", "0")
+os.environ.setdefault("PIPELINE_MEMO_SIZE", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def wait_until():
+    """Poll ``condition`` until it holds, failing after ``timeout`` seconds."""
+    def wait(condition, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                raise AssertionError("condition not met in time")
+            time.sleep(0.005)
+    return wait
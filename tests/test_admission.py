@@ -0,0 +1,113 @@
+"""Admission control: queue limits, timeouts and slot accounting."""
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import server
+from api.admission import AdmissionController, Saturated
+
+
+def test_full_queue_is_rejected_with_429():
+    async def scenario():
+        pool = AdmissionController("test-full", max_concurrency=1, max_queue=0, queue_timeout=1)
+        release = threading.Event()
+        running = await pool.start(release.wait)
+        try:
+            with pytest.raises(Saturated) as info:
+                await pool.run(lambda: None)
+        finally:
+            release.set()
+            await running
+        assert info.value.status_code == 429
+        assert info.value.retry_after >= 1
+
+    asyncio.run(scenario())
+
+
+def test_queue_timeout_is_rejected_with_503():
+    async def scenario():
+        pool = AdmissionController("test-timeout", max_concurrency=1, max_queue=1, queue_timeout=0.05)
+        release = threading.Event()
+        running = await pool.start(release.wait)
+        try:
+            with pytest.raises(Saturated) as info:
+                await pool.run(lambda: None)
+        finally:
+            release.set()
+            await running
+        assert info.value.status_code == 503
+        assert pool.waiting == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def scenario():
+        pool = AdmissionController("test-cancel-waiter", max_concurrency=1, max_queue=1, queue_timeout=5)
+        release = threading.Event()
+        running = await pool.start(release.wait)
+        waiter = asyncio.ensure_future(pool.run(lambda: "late"))
+        await asyncio.sleep(0.01)
+        assert pool.waiting == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert pool.waiting == 0
+
+        release.set()
+        await running
+        # the slot came back instead of going to the cancelled waiter
+        await asyncio.sleep(0.01)
+        assert pool.running == 0
+        assert await pool.run(lambda: "next") == "next"
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_call_keeps_its_slot_until_the_thread_finishes(wait_until):
+    async def scenario():
+        pool = AdmissionController("test-cancel-running", max_concurrency=1, max_queue=0, queue_timeout=1)
+        release = threading.Event()
+        call = asyncio.ensure_future(pool.run(release.wait))
+        await asyncio.sleep(0.01)
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        # the thread is still running, so the slot is still taken
+        assert pool.running == 1
+        release.set()
+        await asyncio.get_running_loop().run_in_executor(None, wait_until, lambda: pool.running == 0)
+        assert await pool.run(lambda: "free") == "free"
+
+    asyncio.run(scenario())
+
+
+def test_predict_returns_429_with_retry_after_when_saturated(monkeypatch, wait_until):
+    pool = AdmissionController("test-http", max_concurrency=1, max_queue=0, queue_timeout=1)
+    release = threading.Event()
+
+    def compute(city, date):
+        release.wait(5)
+        return {"city": city, "date": date, "generated_at": "2024-01-01T00:00:00Z"}
+
+    monkeypatch.setattr(server, "predict_admission", pool)
+    monkeypatch.setattr(server, "_compute_prediction", compute)
+    client = TestClient(server.app)
+
+    first = {}
+    thread = threading.Thread(
+        target=lambda: first.update(response=client.post("/predict", json={"city": "Mumbai", "date": "2024-01-01"}))
+    )
+    thread.start()
+    try:
+        wait_until(lambda: pool.running == 1)
+        rejected = client.post("/predict", json={"city": "Delhi", "date": "2024-01-01"})
+    finally:
+        release.set()
+        thread.join(5)
+
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert first["response"].status_code == 200
@@ -0,0 +1,38 @@
+"""Forecast cube write-through from live predictions."""
+from datetime import date
+
+from api import server
+
+
+class _Cube:
+    def __init__(self):
+        self.cells = {}
+
+    def put(self, city, day, result):
+        self.cells[(city, day)] = result
+
+
+def _result(pollution_source, weather_source="open-meteo", **extra):
+    data = {"pollution": {"source": pollution_source}, "weather": {"source": weather_source}, **extra}
+    return {"city": "Mumbai", "date": date.today().isoformat(), "data": data}
+
+
+def _compute(monkeypatch, result):
+    cube = _Cube()
+    monkeypatch.setattr(server, "forecast_cube", cube)
+    monkeypatch.setattr(server, "run_prediction_pipeline", lambda city, date: result)
+    server._compute_prediction("Mumbai", result["date"])
+    return cube.cells
+
+
+def test_live_result_is_written_to_the_cube(monkeypatch):
+    assert len(_compute(monkeypatch, _result("open-meteo"))) == 1
+
+
+def test_synthetic_result_is_not_written_to_the_cube(monkeypatch):
+    assert _compute(monkeypatch, _result("synthetic")) == {}
+    assert _compute(monkeypatch, _result("open-meteo", weather_source="synthetic")) == {}
+
+
+def test_failed_collection_is_not_written_to_the_cube(monkeypatch):
+    assert _compute(monkeypatch, _result("open-meteo", error="upstream down")) == {}
@@ -0,0 +1,37 @@
+"""History store integer column encoding."""
+import pandas as pd
+import pytest
+
+from utils.history_store import HistoryStore
+
+
+def _dataset(tmp_path):
+    dataset = HistoryStore(str(tmp_path)).dataset("visits")
+    dataset.append(pd.DataFrame({"date": ["2024-01-01", "2024-01-02"], "count": [1, 2]}))
+    return dataset
+
+
+def test_missing_value_in_integer_column_is_rejected(tmp_path):
+    dataset = _dataset(tmp_path)
+    with pytest.raises(ValueError, match="Missing values"):
+        dataset.append(pd.DataFrame({"date": ["2024-01-03", "2024-01-04"], "count": [3, None]}))
+    assert dataset.read()["count"].tolist() == [1, 2]
+
+
+def test_fractional_value_in_integer_column_is_rejected(tmp_path):
+    dataset = _dataset(tmp_path)
+    with pytest.raises(ValueError, match="Non-integral"):
+        dataset.append(pd.DataFrame({"date": ["2024-01-03"], "count": [2.7]}))
+
+
+def test_integral_floats_are_accepted(tmp_path):
+    dataset = _dataset(tmp_path)
+    dataset.append(pd.DataFrame({"date": ["2024-01-03"], "count": [3.0]}))
+    assert dataset.read()["count"].tolist() == [1, 2, 3]
+
+
+def test_large_integers_get_an_int64_column(tmp_path):
+    dataset = HistoryStore(str(tmp_path)).dataset("visits")
+    dataset.append(pd.DataFrame({"date": ["2024-01-01"], "count": [5_000_000_000]}))
+    assert dataset.schema()["columns"]["count"] == "int64"
+    assert dataset.read()["count"].tolist() == [5_000_000_000]
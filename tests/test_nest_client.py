@@ -0,0 +1,99 @@
+"""RemoteAgent reconnects stale keep-alive sockets without replaying calls."""
+import http.client
+import json
+import socket
+import struct
+import threading
+
+import pytest
+
+from nest.client import RemoteAgent
+
+
+def _read_request(conn):
+    data = b""
+    while b"\r\n\r\n" not in data:
+        chunk = conn.recv(4096)
+        if not chunk:
+            return None
+        data += chunk
+    head, body = data.split(b"\r\n\r\n", 1)
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    while len(body) < length:
+        body += conn.recv(4096)
+    return head.split(b"\r\n")[0]
+
+
+def _respond(conn, result):
+    body = json.dumps({"result": result}).encode()
+    conn.sendall(
+        b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+        + f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+
+
+def _reset(conn):
+    conn.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+    conn.close()
+
+
+@pytest.fixture
+def server():
+    """Scripted server: ``handlers[i]`` serves the i-th accepted connection."""
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    requests, handlers = [], []
+
+    def serve():
+        for handler in handlers:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            handler(conn, requests)
+
+    def start(*scripted):
+        handlers.extend(scripted)
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+        return f"http://127.0.0.1:{listener.getsockname()[1]}", requests
+
+    yield start
+    listener.close()
+
+
+def test_reset_while_reading_is_not_replayed(server):
+    def answer_then_reset(conn, requests):
+        requests.append(_read_request(conn))
+        _respond(conn, 1)
+        requests.append(_read_request(conn))
+        _reset(conn)
+
+    url, requests = server(answer_then_reset, answer_then_reset)
+    agent = RemoteAgent(url, timeout=5)
+    assert agent.call("bump") == 1
+    with pytest.raises((http.client.RemoteDisconnected, ConnectionResetError)):
+        agent.call("bump")
+    assert len(requests) == 2
+
+
+def test_idle_connection_closed_by_server_reconnects(server):
+    closed = threading.Event()
+
+    def answer_then_close(conn, requests):
+        requests.append(_read_request(conn))
+        _respond(conn, len(requests))
+        conn.close()
+        closed.set()
+
+    url, requests = server(answer_then_close, answer_then_close)
+    agent = RemoteAgent(url, timeout=5)
+    assert agent.call("bump") == 1
+    assert closed.wait(5)
+    assert agent.call("bump") == 2
+    assert len(requests) == 2
@@ -0,0 +1,59 @@
+"""HedgedEndpoint replica rotation and breaker accounting."""
+import asyncio
+
+import pytest
+
+from utils.resilience import HedgedEndpoint
+
+
+class _Response:
+    status_code = 200
+    text = "ok"
+
+    def __init__(self, url):
+        self.url = url
+
+
+class FakeClient:
+    """Answers after ``delays[url]`` seconds (default immediately)."""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.calls = []
+
+    async def post(self, url, json=None, timeout=None):
+        self.calls.append(url)
+        await asyncio.sleep(self.delays.get(url, 0))
+        return _Response(url)
+
+
+def test_first_attempt_rotates_across_replicas():
+    urls = ["http://a", "http://b", "http://c"]
+    endpoint = HedgedEndpoint("test", urls, hedge_delay=1.0)
+    client = FakeClient()
+
+    async def run():
+        return [(await endpoint.post(client, {}, deadline=1.0)).url for _ in range(6)]
+
+    assert asyncio.run(run()) == urls + urls
+
+
+def test_losing_hedge_is_not_a_breaker_failure():
+    endpoint = HedgedEndpoint("test", ["http://a", "http://b"], hedge_delay=0.01, failure_threshold=1)
+    # "a" is slow, so the hedge to "b" wins and the attempt on "a" is cancelled
+    client = FakeClient({"http://a": 0.5})
+
+    response = asyncio.run(endpoint.post(client, {}, deadline=1.0))
+    assert response.url == "http://b"
+    assert endpoint.hedges_sent == 1
+    assert endpoint.breakers["http://a"].failures == 0
+    assert endpoint.breakers["http://a"].state == "closed"
+
+
+def test_attempt_cancelled_by_deadline_is_a_failure():
+    endpoint = HedgedEndpoint("test", ["http://a"], hedge_delay=1.0, failure_threshold=1)
+    client = FakeClient({"http://a": 0.5})
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(endpoint.post(client, {}, deadline=0.02))
+    assert endpoint.breakers["http://a"].state == "open"
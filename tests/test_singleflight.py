@@ -0,0 +1,77 @@
+"""Single-flight coalescing for threads and coroutines."""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from agents import data_agent
+from utils.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_followers_receive_the_leaders_exception(wait_until):
+    flight = SingleFlight("test-error")
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        raise ValueError("upstream down")
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(flight.do, "key", fail)
+        started.wait(5)
+        followers = [pool.submit(flight.do, "key", fail) for _ in range(3)]
+        try:
+            wait_until(lambda: flight.coalesced == 3)
+        finally:
+            release.set()
+        for future in [leader, *followers]:
+            with pytest.raises(ValueError, match="upstream down"):
+                future.result(5)
+
+    assert len(calls) == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_async_followers_receive_the_leaders_exception():
+    flight = AsyncSingleFlight("test-async-error")
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def scenario():
+        return await asyncio.gather(*[flight.do("key", fail) for _ in range(4)], return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.coalesced == 3
+
+
+def test_collect_all_data_does_not_share_across_modes(monkeypatch, wait_until):
+    release = threading.Event()
+    calls = []
+
+    def collect(city, date, concurrent):
+        calls.append(concurrent)
+        release.wait(5)
+        return {"city": city, "date": date, "concurrent": concurrent}
+
+    monkeypatch.setattr(data_agent, "_collect_all_data", collect)
+    with ThreadPoolExecutor(2) as pool:
+        parallel = pool.submit(data_agent.collect_all_data, "Mumbai", "2024-01-01", True)
+        sequential = pool.submit(data_agent.collect_all_data, "Mumbai", "2024-01-01", False)
+        try:
+            wait_until(lambda: len(calls) == 2)
+        finally:
+            release.set()
+        assert parallel.result(5)["concurrent"] is True
+        assert sequential.result(5)["concurrent"] is False
+    assert sorted(calls) == [False, True]
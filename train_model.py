@@ -1,22 +1,246 @@
 # train_model.py
+"""Train the hospital load models.
+
+One global model is fitted on all history, and one model per city when the
+history has a ``city`` column with enough rows. Hyperparameters are picked
+by k-fold cross-validation with successive halving: every configuration
+starts with a small forest, and only the best third of each round goes on to
+a larger one, so bad configurations are dropped early. Each (group, config,
+fold) fit is a separate task on a process pool. Workers load the history
+once in their initializer, so tasks only carry indices and parameters.
+
+Every model goes into the registry with its CV and holdout metrics and
+compact arrays (see utils.forest_eval). The global model is promoted and
+also written to models/hospital_model.pkl. A summary with wall-clock time
+per phase and peak memory is printed and saved as training_report.json in
+the registry root.
+
+History is read from the history store (utils.history_store) once
+data/store/hospital_history has been ingested, otherwise from the CSV.
+
+Usage:
+    python train_model.py [--data data/store/hospital_history | data/hospital_history.csv] [--workers N]
+"""
+import argparse
+import itertools
+import json
+import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+import joblib
+import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
-import joblib
-import os
+from sklearn.model_selection import KFold, train_test_split
+
+from utils.forest_eval import export_to_registry
+from utils.history_store import DEFAULT_CITY, SCHEMA_NAME, Dataset
+from utils.model_registry import ModelRegistry, _atomic_write
+
+FEATURES = ["aqi", "temp", "season", "viral_cases", "festival_flag"]
+TARGET = "hospital_load"
+GLOBAL_GROUP = "global"
+
+TRAIN_WORKERS = int(os.getenv("TRAIN_WORKERS", str(os.cpu_count() or 1)))
+CV_FOLDS = int(os.getenv("TRAIN_CV_FOLDS", "3"))
+MIN_CITY_ROWS = int(os.getenv("TRAIN_MIN_CITY_ROWS", "200"))
+# forest sizes per halving round; the last one is the size of the final model
+HALVING_TREES = [25, 50, 100]
+HALVING_KEEP = 1 / 3
+
+SEARCH_SPACE = {
+    "max_depth": [None, 10, 20],
+    "min_samples_leaf": [1, 2, 4],
+    "max_features": [1.0, 0.6],
+}
+
+# per-process training data, filled by _init_worker
+_GROUPS: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+
+def default_data_path() -> str:
+    """The history store dataset when it has been ingested, else the CSV."""
+    store_path = os.path.join("data", "store", "hospital_history")
+    return store_path if os.path.exists(os.path.join(store_path, SCHEMA_NAME)) else "data/hospital_history.csv"
+
+
+def load_history(path: str) -> pd.DataFrame:
+    """Read history from a CSV file or a history store dataset directory."""
+    if os.path.isdir(path):
+        root, name = os.path.split(os.path.normpath(path))
+        df = Dataset(root, name).read(FEATURES + [TARGET])
+        if set(df["city"].unique()) <= {DEFAULT_CITY}:
+            df = df.drop(columns="city")
+    else:
+        df = pd.read_csv(path)
+    missing = [c for c in FEATURES + [TARGET] if c not in df.columns]
+    if missing:
+        raise ValueError(f"{path} is missing columns {missing}")
+    return df
+
+
+def split_groups(df: pd.DataFrame, min_city_rows: int) -> Dict[str, Dict[str, np.ndarray]]:
+    """Holdout split per training group (global plus cities with enough rows)."""
+    frames = {GLOBAL_GROUP: df}
+    if "city" in df.columns:
+        for city, frame in df.groupby("city"):
+            if len(frame) >= min_city_rows:
+                frames[str(city).lower()] = frame
+            else:
+                print(f"Skipping city model for {city}: {len(frame)} rows < {min_city_rows}")
+
+    groups = {}
+    for name, frame in frames.items():
+        X = frame[FEATURES].to_numpy(dtype=np.float64)
+        y = frame[TARGET].to_numpy(dtype=np.float64)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.15, random_state=42)
+        groups[name] = {"X_train": X_train, "y_train": y_train, "X_test": X_test, "y_test": y_test}
+    return groups
+
+
+def _init_worker(path: str, min_city_rows: int) -> None:
+    global _GROUPS
+    groups = split_groups(load_history(path), min_city_rows)
+    _GROUPS = {name: (g["X_train"], g["y_train"]) for name, g in groups.items()}
+
+
+def _make_model(params: Dict[str, Any], n_estimators: int) -> RandomForestRegressor:
+    return RandomForestRegressor(n_estimators=n_estimators, random_state=42, n_jobs=1, **params)
+
+
+def _cv_fold(group: str, config_id: int, params: Dict[str, Any], n_estimators: int, fold: int) -> Tuple[str, int, float]:
+    """Fit one CV fold in a worker and return its R^2."""
+    X, y = _GROUPS[group]
+    train_idx, val_idx = list(KFold(CV_FOLDS, shuffle=True, random_state=42).split(X))[fold]
+    model = _make_model(params, n_estimators).fit(X[train_idx], y[train_idx])
+    return group, config_id, model.score(X[val_idx], y[val_idx])
+
+
+def _fit_final(group: str, params: Dict[str, Any], n_estimators: int) -> Tuple[str, RandomForestRegressor]:
+    X, y = _GROUPS[group]
+    return group, _make_model(params, n_estimators).fit(X, y)
+
+
+def search_configs() -> List[Dict[str, Any]]:
+    keys = sorted(SEARCH_SPACE)
+    return [dict(zip(keys, values)) for values in itertools.product(*(SEARCH_SPACE[k] for k in keys))]
+
+
+def successive_halving(pool, group_names: List[str], configs: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Cross-validated search per group; returns the best config and its CV score."""
+    alive = {group: list(range(len(configs))) for group in group_names}
+    scores: Dict[str, Dict[int, float]] = {}
+    for round_no, n_estimators in enumerate(HALVING_TREES):
+        futures = [
+            pool.submit(_cv_fold, group, cid, configs[cid], n_estimators, fold)
+            for group, cids in alive.items()
+            for cid in cids
+            for fold in range(CV_FOLDS)
+        ]
+        fold_scores: Dict[Tuple[str, int], List[float]] = {}
+        for future in futures:
+            group, cid, score = future.result()
+            fold_scores.setdefault((group, cid), []).append(score)
+        scores = {group: {} for group in alive}
+        for (group, cid), values in fold_scores.items():
+            scores[group][cid] = float(np.mean(values))
+
+        if round_no < len(HALVING_TREES) - 1:
+            for group, by_config in scores.items():
+                keep = max(1, int(np.ceil(len(by_config) * HALVING_KEEP)))
+                alive[group] = sorted(by_config, key=by_config.get, reverse=True)[:keep]
+            print(f"Round {round_no} ({n_estimators} trees): kept "
+                  + ", ".join(f"{g}={len(c)}" for g, c in alive.items()))
+
+    best = {}
+    for group, by_config in scores.items():
+        cid = max(by_config, key=by_config.get)
+        best[group] = {"params": configs[cid], "cv_r2": by_config[cid]}
+    return best
+
+
+def peak_memory_mb() -> Dict[str, float]:
+    # ru_maxrss is in KiB on Linux
+    return {
+        "parent_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "largest_worker_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+def train(data_path: str, workers: int = TRAIN_WORKERS, min_city_rows: int = MIN_CITY_ROWS) -> Dict[str, Any]:
+    started = time.perf_counter()
+    timings = {}
+    groups = split_groups(load_history(data_path), min_city_rows)
+    configs = search_configs()
+    print(f"Training {len(groups)} model(s) {sorted(groups)} over {len(configs)} configs with {workers} worker(s)")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data_path, min_city_rows)) as pool:
+        t = time.perf_counter()
+        best = successive_halving(pool, list(groups), configs)
+        timings["search_s"] = round(time.perf_counter() - t, 2)
+
+        t = time.perf_counter()
+        futures = [pool.submit(_fit_final, group, best[group]["params"], HALVING_TREES[-1]) for group in groups]
+        models = dict(future.result() for future in futures)
+        timings["final_fit_s"] = round(time.perf_counter() - t, 2)
+
+    t = time.perf_counter()
+    registry = ModelRegistry()
+    stamp = datetime.utcnow().strftime("v%Y%m%d%H%M%S")
+    results = {}
+    for group, model in models.items():
+        data = groups[group]
+        metrics = {
+            "cv_r2": best[group]["cv_r2"],
+            "train_r2": model.score(data["X_train"], data["y_train"]),
+            "test_r2": model.score(data["X_test"], data["y_test"]),
+            "rows": int(len(data["y_train"]) + len(data["y_test"])),
+        }
+        metadata = {"features": FEATURES, "group": group, "params": best[group]["params"]}
+        version = registry.publish(model, version=f"{stamp}-{group}", metrics=metrics, metadata=metadata)
+        # compact arrays go in before promotion so serving workers can mmap them
+        export_to_registry(registry, version, model)
+        results[group] = {"version": version, **metrics, "params": best[group]["params"]}
+
+    registry.promote(results[GLOBAL_GROUP]["version"])
+    os.makedirs("models", exist_ok=True)
+    joblib.dump(models[GLOBAL_GROUP], "models/hospital_model.pkl")
+    timings["publish_s"] = round(time.perf_counter() - t, 2)
+    timings["total_s"] = round(time.perf_counter() - started, 2)
+
+    report = {
+        "finished_at": datetime.utcnow().isoformat() + "Z",
+        "data": data_path,
+        "workers": workers,
+        "configs": len(configs),
+        "halving_trees": HALVING_TREES,
+        "models": results,
+        "wall_clock": timings,
+        "peak_memory": peak_memory_mb(),
+    }
+    _atomic_write(os.path.join(registry.root, "training_report.json"), json.dumps(report, indent=2).encode("utf-8"))
+    return report
+
 
-df = pd.read_csv("data/hospital_history.csv")
-features = ["aqi", "temp", "season", "viral_cases", "festival_flag"]
-X = df[features]
-y = df["hospital_load"]
+def main():
+    parser = argparse.ArgumentParser(description="Train hospital load models")
+    parser.add_argument("--data", default=None, help="CSV file or history store dataset directory")
+    parser.add_argument("--workers", type=int, default=TRAIN_WORKERS)
+    parser.add_argument("--min-city-rows", type=int, default=MIN_CITY_ROWS)
+    args = parser.parse_args()
 
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.15, random_state=42)
-model = RandomForestRegressor(n_estimators=100, random_state=42)
-model.fit(X_train, y_train)
+    report = train(args.data or default_data_path(), workers=args.workers, min_city_rows=args.min_city_rows)
+    for group, result in report["models"].items():
+        print(f"[{group}] {result['version']} cv_r2={result['cv_r2']:.3f} "
+              f"train_r2={result['train_r2']:.3f} test_r2={result['test_r2']:.3f} params={result['params']}")
+    print("Global model promoted and saved to models/hospital_model.pkl")
+    print("Wall clock:", report["wall_clock"])
+    print("Peak memory:", report["peak_memory"])
 
-os.makedirs("models", exist_ok=True)
-joblib.dump(model, "models/hospital_model.pkl")
 
-print("Model saved to models/hospital_model.pkl")
-print("Train score:", model.score(X_train, y_train))
-print("Test score:", model.score(X_test, y_test))
+if __name__ == "__main__":
+    main()
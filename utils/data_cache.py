@@ -0,0 +1,223 @@
+"""Persistent SQLite cache for upstream environmental data.
+
+Entries are keyed by (source, latitude, longitude, date, variables) and hold
+one per-day record as JSON. Past dates never change upstream, so they are
+kept without expiry; today and future (forecast) dates expire after a short
+TTL. The cache is capped at a maximum number of entries and evicts the least
+recently used ones. The database survives restarts and is safe to share
+between worker processes (WAL mode).
+
+Hits don't write on the read path: an entry's ``last_access`` is refreshed
+only once it is older than ``touch_interval`` seconds, and those refreshes
+are batched and written with the next ``put_many`` (or once enough have
+piled up). Eviction keeps a running upper bound of the row count and only
+runs ``COUNT(*)`` when that bound passes the cap; it then trims to 90% of
+the cap.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date as date_cls
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS upstream_cache (
+    source TEXT NOT NULL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL,
+    day TEXT NOT NULL,
+    variables TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    expires_at REAL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (source, latitude, longitude, day, variables)
+);
+CREATE INDEX IF NOT EXISTS upstream_cache_lru ON upstream_cache (last_access);
+"""
+
+
+class UpstreamCache:
+    """SQLite-backed per-day record cache with TTL and LRU eviction."""
+
+    # pending last_access refreshes written in one go once this many pile up
+    TOUCH_BATCH = 256
+    # seconds between sweeps for expired forecast rows
+    PURGE_INTERVAL = 60.0
+    # eviction trims to this share of max_entries, so a full cache isn't
+    # recounted and trimmed again on every put
+    LOW_WATER = 0.9
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 100_000,
+        forecast_ttl: float = 3600.0,
+        touch_interval: float = 60.0,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.forecast_ttl = forecast_ttl
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._touches: Dict[Tuple[str, float, float, str, str], float] = {}
+        self._purged_at = 0.0
+        # upper bound on the rows in the table; recounted when it passes the cap
+        self._entries = self._count()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM upstream_cache").fetchone()[0]
+
+    def get_many(
+        self, source: str, latitude: float, longitude: float, variables: str, days: Iterable[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Return cached records for the given days, keyed by date."""
+        days = list(days)
+        if not days:
+            return {}
+        now = time.time()
+        found: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            placeholders = ",".join("?" * len(days))
+            rows = self._conn.execute(
+                f"SELECT day, payload, expires_at, last_access FROM upstream_cache "
+                f"WHERE source=? AND latitude=? AND longitude=? AND variables=? AND day IN ({placeholders})",
+                (source, latitude, longitude, variables, *days),
+            ).fetchall()
+            for day, payload, expires_at, last_access in rows:
+                if expires_at is None or expires_at > now:
+                    found[day] = json.loads(payload)
+                    if now - last_access >= self.touch_interval:
+                        self._touches[(source, latitude, longitude, day, variables)] = now
+            if len(self._touches) >= self.TOUCH_BATCH:
+                self._flush_touches()
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(days) - len(found)
+        return found
+
+    def put_many(
+        self,
+        source: str,
+        latitude: float,
+        longitude: float,
+        variables: str,
+        records: Dict[str, Dict[str, Any]],
+    ) -> None:
+        """Store per-day records, then evict least recently used entries over the cap."""
+        if not records:
+            return
+        now = time.time()
+        today = date_cls.today().isoformat()
+        rows = [
+            (
+                source, latitude, longitude, day, variables, json.dumps(record),
+                None if day < today else now + self.forecast_ttl, now,
+            )
+            for day, record in records.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO upstream_cache "
+                "(source, latitude, longitude, day, variables, payload, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            # replaced rows are counted too, hence an upper bound
+            self._entries += len(rows)
+            # recency must be up to date before choosing what to evict
+            self._flush_touches()
+            self._evict()
+            self._conn.commit()
+
+    def _flush_touches(self) -> None:
+        """Write the pending last_access refreshes; caller commits."""
+        if not self._touches:
+            return
+        self._conn.executemany(
+            "UPDATE upstream_cache SET last_access=? "
+            "WHERE source=? AND latitude=? AND longitude=? AND day=? AND variables=?",
+            [(touched, *key) for key, touched in self._touches.items()],
+        )
+        self._touches.clear()
+
+    def _evict(self) -> None:
+        """Drop expired rows and the least recently used rows beyond max_entries."""
+        now = time.time()
+        over_cap = self._entries > self.max_entries
+        if over_cap or now - self._purged_at >= self.PURGE_INTERVAL:
+            self._purged_at = now
+            cursor = self._conn.execute(
+                "DELETE FROM upstream_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+            )
+            self._entries -= max(cursor.rowcount, 0)
+        if self._entries <= self.max_entries:
+            return
+        # the estimate passed the cap: count for real (other processes write too)
+        self._entries = self._count()
+        if self._entries <= self.max_entries:
+            return
+        excess = self._entries - int(self.max_entries * self.LOW_WATER)
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM upstream_cache WHERE rowid IN "
+                "(SELECT rowid FROM upstream_cache ORDER BY last_access LIMIT ?)",
+                (excess,),
+            )
+            self._entries -= excess
+            self.evictions += excess
+
+    def clear(self) -> None:
+        """Remove every entry and reset counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM upstream_cache")
+            self._conn.commit()
+            self._touches.clear()
+            self._entries = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            entries = self._count()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "path": self.path,
+        }
+
+
+def open_default_cache() -> Optional[UpstreamCache]:
+    """Open the cache configured through the environment, or None if disabled."""
+    if os.getenv("DATA_CACHE_ENABLED", "1") == "0":
+        return None
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    path = os.getenv("DATA_CACHE_PATH", os.path.join(root, "data", "cache", "upstream.sqlite3"))
+    try:
+        return UpstreamCache(
+            path,
+            max_entries=int(os.getenv("DATA_CACHE_MAX_ENTRIES", "100000")),
+            forecast_ttl=float(os.getenv("DATA_CACHE_FORECAST_TTL", "3600")),
+            touch_interval=float(os.getenv("DATA_CACHE_TOUCH_INTERVAL", "60")),
+        )
+    except sqlite3.Error as e:
+        print(f"Upstream cache unavailable ({path}): {e}")
+        return None
@@ -0,0 +1,137 @@
+"""Indexed, multi-year festival calendar.
+
+Festivals are loaded from a CSV file (``date,name,type,impact_score,region``)
+and kept sorted by ordinal day, so window queries are a pair of binary
+searches plus the matching rows. ``region`` is ``all`` for national festivals
+or a ``;``-separated list of cities for regional ones.
+"""
+import csv
+import hashlib
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date as date_cls
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+
+DEFAULT_CALENDAR_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "festival_calendar.csv"
+)
+# Festivals within this many days of a target date are considered, by both
+# the data agent and the festival agent
+FESTIVAL_WINDOW_DAYS = 2
+
+
+class FestivalCalendar:
+    """Sorted festival index supporting O(log n + hits) date window queries."""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        entries: List[Tuple[int, Dict[str, Any], Optional[FrozenSet[str]]]] = []
+        for row in rows:
+            region = (row.get("region") or "all").strip()
+            regions = None if region.lower() == "all" else frozenset(
+                part.strip() for part in region.split(";") if part.strip()
+            )
+            festival = {
+                "name": row["name"],
+                "type": row.get("type") or "religious",
+                "impact_score": float(row.get("impact_score", 0.5)),
+            }
+            entries.append((date_cls.fromisoformat(row["date"]).toordinal(), festival, regions))
+        entries.sort(key=lambda entry: entry[0])
+        # content hash, so derived caches can tell when the calendar changed
+        self.version = hashlib.sha256(
+            repr([(o, sorted(f.items()), sorted(r or ())) for o, f, r in entries]).encode("utf-8")
+        ).hexdigest()[:16]
+        self._ordinals = [entry[0] for entry in entries]
+        self._entries = entries
+
+    @classmethod
+    def from_csv(cls, path: str) -> "FestivalCalendar":
+        with open(path, newline="", encoding="utf-8") as handle:
+            return cls(list(csv.DictReader(handle)))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _scan(self, first: int, last: int, city: Optional[str]):
+        """Yield (ordinal, festival) for entries with first <= ordinal <= last."""
+        lo = bisect_left(self._ordinals, first)
+        hi = bisect_right(self._ordinals, last)
+        for ordinal, festival, regions in self._entries[lo:hi]:
+            if regions is None or (city is not None and city in regions):
+                yield ordinal, festival
+
+    def between(self, start: str, end: str, city: Optional[str] = None) -> List[Dict[str, Any]]:
+        """All festivals dated in [start, end], each with its ``date``."""
+        first = date_cls.fromisoformat(start).toordinal()
+        last = date_cls.fromisoformat(end).toordinal()
+        return [
+            {**festival, "date": date_cls.fromordinal(ordinal).isoformat()}
+            for ordinal, festival in self._scan(first, last, city)
+        ]
+
+    def window(self, day: str, days: int = 2, city: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Festivals within +/- ``days`` of ``day``.
+
+        Festivals on the day itself come first without ``days_away``; nearby
+        ones follow in date order with ``days_away`` set to their offset.
+        """
+        target = date_cls.fromisoformat(day).toordinal()
+        return _window_from(list(self._scan(target - days, target + days, city)), target)
+
+    def windows(
+        self, start: str, end: str, days: int = 2, city: Optional[str] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """``window`` for every date in [start, end] from a single index scan."""
+        first = date_cls.fromisoformat(start).toordinal()
+        last = date_cls.fromisoformat(end).toordinal()
+        hits = list(self._scan(first - days, last + days, city))
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        lo = 0
+        for target in range(first, last + 1):
+            # hits is sorted, so the window's left edge only moves forward
+            while lo < len(hits) and hits[lo][0] < target - days:
+                lo += 1
+            hi = lo
+            while hi < len(hits) and hits[hi][0] <= target + days:
+                hi += 1
+            result[date_cls.fromordinal(target).isoformat()] = _window_from(hits[lo:hi], target)
+        return result
+
+
+def _window_from(hits: List[Tuple[int, Dict[str, Any]]], target: int) -> List[Dict[str, Any]]:
+    exact = [dict(festival) for ordinal, festival in hits if ordinal == target]
+    nearby = [
+        {**festival, "days_away": ordinal - target}
+        for ordinal, festival in hits
+        if ordinal != target
+    ]
+    return exact + nearby
+
+
+_calendar: Optional[FestivalCalendar] = None
+_calendar_lock = threading.Lock()
+
+
+def get_calendar() -> FestivalCalendar:
+    """Return the shared calendar, loading it from FESTIVAL_CALENDAR_PATH on first use."""
+    global _calendar
+    if _calendar is None:
+        with _calendar_lock:
+            if _calendar is None:
+                _calendar = FestivalCalendar.from_csv(
+                    os.getenv("FESTIVAL_CALENDAR_PATH", DEFAULT_CALENDAR_PATH)
+                )
+    return _calendar
+
+
+def reload_calendar(path: Optional[str] = None) -> FestivalCalendar:
+    """Reload the shared calendar, e.g. after the data file was updated."""
+    global _calendar
+    calendar = FestivalCalendar.from_csv(
+        path or os.getenv("FESTIVAL_CALENDAR_PATH", DEFAULT_CALENDAR_PATH)
+    )
+    with _calendar_lock:
+        _calendar = calendar
+    return calendar
@@ -0,0 +1,254 @@
+"""Compact evaluator for trained random forest regressors.
+
+``export_forest`` flattens every tree of a fitted sklearn forest into five
+contiguous NumPy arrays (feature, threshold, left, right, value) with global
+node indices, so the whole forest can be walked with a handful of vectorized
+steps instead of sklearn's per-call validation and per-tree dispatch. Leaves
+point at themselves, so a single row advances all trees in lock-step for
+``max_depth`` iterations; batches drop (row, tree) lanes as they hit a leaf.
+
+Inputs are cast to float32 before comparison and tree outputs are summed in
+tree order, exactly like sklearn, so predictions match ``model.predict``.
+
+The lane-based walk beats sklearn for single rows and small batches but not
+for large ones: on the bundled 100-tree model the crossover is around 200
+rows, so the predictor sends batches above COMPACT_MAX_ROWS to sklearn.
+
+Command line::
+
+    python -m utils.forest_eval export [--version V]   # add compact arrays to a registry version
+    python -m utils.forest_eval verify [--version V]   # compare against sklearn
+    python -m utils.forest_eval bench  [--version V]   # latency benchmark
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+from typing import Any, Dict
+
+import numpy as np
+
+
+ARRAY_NAMES = ("feature", "threshold", "left", "right", "value", "roots")
+# lookup arrays derived from the node arrays; saved too, so workers map them
+# instead of each building a private copy
+DERIVED_NAMES = ("children", "is_leaf")
+COMPACT_DIR = "compact"
+
+
+def export_forest(model: Any) -> Dict[str, np.ndarray]:
+    """Flatten a fitted single-output forest regressor into contiguous arrays."""
+    estimators = getattr(model, "estimators_", None)
+    if not estimators:
+        raise ValueError("export_forest needs a fitted forest with estimators_")
+    trees = [est.tree_ for est in estimators]
+    if any(tree.n_outputs != 1 for tree in trees):
+        raise ValueError("Only single-output forests are supported")
+
+    sizes = np.array([tree.node_count for tree in trees])
+    roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+    feature, threshold, left, right, value = [], [], [], [], []
+    for root, tree in zip(roots, trees):
+        is_leaf = tree.children_left == -1
+        node_ids = np.arange(tree.node_count) + root
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+        # leaves loop back to themselves so extra steps are no-ops
+        left.append(np.where(is_leaf, node_ids, tree.children_left + root))
+        right.append(np.where(is_leaf, node_ids, tree.children_right + root))
+        value.append(tree.value[:, 0, 0])
+
+    return {
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "left": np.concatenate(left).astype(np.int64),
+        "right": np.concatenate(right).astype(np.int64),
+        "value": np.concatenate(value).astype(np.float64),
+        "roots": roots,
+        "max_depth": np.array(max(tree.max_depth for tree in trees), dtype=np.int64),
+        "n_features": np.array(model.n_features_in_, dtype=np.int64),
+    }
+
+
+class CompactForest:
+    """Forest evaluator over flattened node arrays."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.max_depth = int(arrays["max_depth"])
+        self.n_features = int(arrays["n_features"])
+        self.n_trees = len(self.roots)
+        # interleaved (right, left) children so one gather picks the branch
+        self._children = arrays.get("children")
+        if self._children is None:
+            self._children = np.stack([self.right, self.left], axis=1).ravel()
+        self._is_leaf = arrays.get("is_leaf")
+        if self._is_leaf is None:
+            self._is_leaf = self.left == np.arange(len(self.left))
+
+    @classmethod
+    def from_model(cls, model: Any) -> "CompactForest":
+        return cls(export_forest(model))
+
+    def save(self, directory: str) -> None:
+        """Write one .npy file per array so they can be memory-mapped."""
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+        for name in DERIVED_NAMES:
+            np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(getattr(self, f"_{name}")))
+        np.save(os.path.join(directory, "max_depth.npy"), np.array(self.max_depth, dtype=np.int64))
+        np.save(os.path.join(directory, "n_features.npy"), np.array(self.n_features, dtype=np.int64))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "CompactForest":
+        """Load arrays saved by ``save``; with mmap they are shared across processes."""
+        mode = "r" if mmap else None
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode)
+            for name in ARRAY_NAMES
+        }
+        for name in DERIVED_NAMES:
+            # exports written before these were saved rebuild them in memory
+            path = os.path.join(directory, f"{name}.npy")
+            if os.path.exists(path):
+                arrays[name] = np.load(path, mmap_mode=mode)
+        arrays["max_depth"] = np.load(os.path.join(directory, "max_depth.npy"))
+        arrays["n_features"] = np.load(os.path.join(directory, "n_features.npy"))
+        return cls(arrays)
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node index per (row, tree).
+
+        Every (row, tree) pair is a lane; lanes that reach a leaf are dropped
+        from the working set so deep trees don't slow down shallow paths.
+        """
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        leaves = np.tile(self.roots, n_rows)
+        offsets = np.repeat(np.arange(n_rows, dtype=np.int64) * n_features, self.n_trees)
+        lanes = np.flatnonzero(~self._is_leaf[leaves])
+        node = leaves[lanes]
+        offsets = offsets[lanes]
+        while lanes.size:
+            go_left = np.take(flat, offsets + np.take(self.feature, node)) <= np.take(self.threshold, node)
+            node = np.take(self._children, node * 2 + go_left)
+            done = np.take(self._is_leaf, node)
+            if done.any():
+                leaves[lanes[done]] = node[done]
+                keep = ~done
+                lanes, node, offsets = lanes[keep], node[keep], offsets[keep]
+        return leaves.reshape(n_rows, self.n_trees)
+
+    def predict(self, X) -> np.ndarray:
+        """Vectorized batch prediction, matching ``model.predict(X)``."""
+        # sklearn evaluates splits on float32 inputs
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected shape (n, {self.n_features}), got {X.shape}")
+        leaf_values = self.value[self._leaves(X)]
+        # accumulate in tree order like sklearn for identical rounding
+        total = np.zeros(X.shape[0])
+        for column in leaf_values.T:
+            total += column
+        return total / self.n_trees
+
+    def predict_one(self, row) -> float:
+        """Single-row prediction."""
+        x = np.asarray(row, dtype=np.float32).astype(np.float64)
+        node = self.roots
+        for _ in range(self.max_depth):
+            node = np.where(x[self.feature[node]] <= self.threshold[node], self.left[node], self.right[node])
+        total = 0.0
+        for leaf_value in self.value[node].tolist():
+            total += leaf_value
+        return total / self.n_trees
+
+
+def verify(model: Any, forest: CompactForest, X) -> Dict[str, float]:
+    """Compare compact predictions against sklearn on X."""
+    expected = model.predict(np.asarray(X))
+    batch = forest.predict(X)
+    single = np.array([forest.predict_one(row) for row in np.asarray(X)])
+    return {
+        "rows": int(len(expected)),
+        "max_abs_diff_batch": float(np.max(np.abs(batch - expected))),
+        "max_abs_diff_single": float(np.max(np.abs(single - expected))),
+        "exact_match_ratio": float(np.mean(batch == expected)),
+    }
+
+
+def _time_per_call(fn, repeats: int) -> float:
+    fn()  # warm-up
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - started) / repeats * 1e6
+
+
+def benchmark(model: Any, forest: CompactForest, X, repeats: int = 200, batch_size: int = 256) -> Dict[str, float]:
+    """Mean latency in microseconds per call for single-row and batch inference."""
+    X = np.asarray(X, dtype=np.float64)
+    row = X[:1]
+    batch = X[:batch_size]
+    return {
+        "sklearn_single_us": round(_time_per_call(lambda: model.predict(row), repeats), 1),
+        "compact_single_us": round(_time_per_call(lambda: forest.predict_one(row[0]), repeats), 1),
+        "sklearn_batch_us": round(_time_per_call(lambda: model.predict(batch), max(1, repeats // 10)), 1),
+        "compact_batch_us": round(_time_per_call(lambda: forest.predict(batch), max(1, repeats // 10)), 1),
+        "batch_size": int(len(batch)),
+    }
+
+
+def export_to_registry(registry, version: str, model: Any = None) -> str:
+    """Write compact arrays next to a registry version's model artifact."""
+    if model is None:
+        _, model = registry.load(version, mmap=False)
+    directory = os.path.join(registry.artifact_dir(version), COMPACT_DIR)
+    CompactForest.from_model(model).save(directory)
+    return directory
+
+
+def _sample_features(n: int = 1000) -> np.ndarray:
+    import pandas as pd
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    df = pd.read_csv(os.path.join(root, "data", "hospital_history.csv"))
+    return df[["aqi", "temp", "season", "viral_cases", "festival_flag"]].to_numpy(dtype=np.float64)[:n]
+
+
+def main(argv=None) -> int:
+    from utils.model_registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description="Compact random forest evaluator")
+    parser.add_argument("command", choices=["export", "verify", "bench"])
+    parser.add_argument("--version", help="registry version (default: active)")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args(argv)
+    # the model is fitted on a DataFrame; plain arrays are fine here
+    warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+    registry = ModelRegistry()
+    version, model = registry.load(args.version, mmap=False)
+    if args.command == "export":
+        print(f"Compact forest for {version} written to {export_to_registry(registry, version, model)}")
+        return 0
+
+    forest = CompactForest.from_model(model)
+    X = _sample_features()
+    if args.command == "verify":
+        result = verify(model, forest, X)
+        print(result)
+        return 0 if result["max_abs_diff_batch"] <= 1e-9 and result["max_abs_diff_single"] <= 1e-9 else 1
+    print(benchmark(model, forest, X, repeats=args.repeats))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
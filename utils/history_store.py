@@ -0,0 +1,360 @@
+"""Columnar, date-indexed store for hospital history.
+
+Each dataset is a directory of partitions with one raw binary file per column::
+
+    data/store/<dataset>/schema.json
+    data/store/<dataset>/city=<city>/year=<yyyy>/<column>.bin
+
+``schema.json`` holds the column dtypes and the category list of every
+string column; strings are stored as int32 codes into that list. Integer
+columns are int32 unless the first rows need int64, and later rows outside
+a column's range, missing or fractional are rejected rather than cast. Dates are int32 days
+since 1970-01-01 and rows are kept sorted by date inside a
+partition, so the date column doubles as the index: a range query prunes
+partitions by city and year, memory-maps only the requested columns and
+slices them with ``searchsorted``.
+
+New days are appended to the end of each column file, so nothing is
+rewritten. Only a backfill that lands before a partition's last date
+rewrites that one partition. A partially written append is cut back to the
+shortest column on read.
+
+Rows without a city go to ``city=all``.
+
+Command line::
+
+    python -m utils.history_store ingest                 # rebuild from the CSVs in data/
+    python -m utils.history_store query hospital_history --city all --days 365
+"""
+import argparse
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.model_registry import _atomic_write
+
+
+DEFAULT_SOURCE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+DEFAULT_STORE_ROOT = os.path.join(DEFAULT_SOURCE_DIR, "store")
+SCHEMA_NAME = "schema.json"
+DATE_COLUMN = "date"
+CITY_COLUMN = "city"
+DEFAULT_CITY = "all"
+# CSV sources ingested by ``ingest``: dataset name -> file under DEFAULT_SOURCE_DIR
+CSV_SOURCES = {
+    "hospital_history": "hospital_history.csv",
+    "workflow": "workflowdataset.csv",
+}
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def _to_days(values) -> np.ndarray:
+    return pd.to_datetime(values).to_numpy().astype("datetime64[D]").astype(np.int32)
+
+
+def _infer_dtype(series: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(series):
+        return "int32"
+    if pd.api.types.is_integer_dtype(series):
+        info = np.iinfo(np.int32)
+        if series.empty or (info.min <= series.min() and series.max() <= info.max):
+            return "int32"
+        return "int64"
+    if pd.api.types.is_float_dtype(series):
+        return "float64"
+    return "category"
+
+
+class Dataset:
+    """One partitioned, columnar table inside a HistoryStore."""
+
+    def __init__(self, root: str, name: str):
+        self.name = name
+        self.path = os.path.join(root, name)
+        self.schema_path = os.path.join(self.path, SCHEMA_NAME)
+
+    # schema -----------------------------------------------------------------
+
+    def schema(self) -> Dict[str, Any]:
+        try:
+            with open(self.schema_path, encoding="utf-8") as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return {"columns": {}, "categories": {}}
+
+    def exists(self) -> bool:
+        return os.path.exists(self.schema_path)
+
+    def _write_schema(self, schema: Dict[str, Any]) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        _atomic_write(self.schema_path, json.dumps(schema, indent=2).encode("utf-8"))
+
+    def _encode(self, frame: pd.DataFrame, schema: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """Column arrays in storage dtypes, extending the schema for new columns/categories."""
+        columns = schema["columns"]
+        has_rows = any(True for _ in self._partitions())
+        added = [n for n in frame.columns if n not in columns and n not in (DATE_COLUMN, CITY_COLUMN)]
+        if added and has_rows:
+            raise ValueError(f"Columns {added} are not in the {self.name} schema")
+        for name in added:
+            columns[name] = _infer_dtype(frame[name])
+        missing = set(columns) - set(frame.columns)
+        if missing:
+            raise ValueError(f"Rows for {self.name} are missing columns {sorted(missing)}")
+
+        arrays = {DATE_COLUMN: _to_days(frame[DATE_COLUMN])}
+        for name, dtype in columns.items():
+            if dtype == "category":
+                categories = schema["categories"].setdefault(name, [])
+                lookup = {value: code for code, value in enumerate(categories)}
+                values = frame[name].fillna("").astype(str)
+                for value in pd.unique(values):
+                    if value not in lookup:
+                        lookup[value] = len(categories)
+                        categories.append(value)
+                arrays[name] = values.map(lookup).to_numpy(dtype=np.int32)
+            else:
+                if dtype.startswith("int") and len(frame):
+                    # casting would silently turn NaN into INT_MIN, truncate
+                    # fractions and wrap values outside the column's range
+                    if frame[name].isna().any():
+                        raise ValueError(f"Missing values in integer column {self.name}.{name}")
+                    if (frame[name] % 1 != 0).any():
+                        raise ValueError(f"Non-integral values in integer column {self.name}.{name}")
+                    info = np.iinfo(dtype)
+                    low, high = frame[name].min(), frame[name].max()
+                    if low < info.min or high > info.max:
+                        raise ValueError(
+                            f"Values of {self.name}.{name} in [{low}, {high}] don't fit its {dtype} column"
+                        )
+                arrays[name] = frame[name].to_numpy(dtype=dtype)
+        return arrays
+
+    # partitions -------------------------------------------------------------
+
+    def _partition_dir(self, city: str, year: int) -> str:
+        return os.path.join(self.path, f"city={city}", f"year={year}")
+
+    def _partitions(self, city: str = None, start_year: int = None, end_year: int = None):
+        """Yield (city, year, directory) for partitions matching the filters."""
+        if not os.path.isdir(self.path):
+            return
+        for city_dir in sorted(os.listdir(self.path)):
+            if not city_dir.startswith("city="):
+                continue
+            name = city_dir[len("city="):]
+            if city is not None and name != city.lower():
+                continue
+            for year_dir in sorted(os.listdir(os.path.join(self.path, city_dir))):
+                if not year_dir.startswith("year="):
+                    continue
+                year = int(year_dir[len("year="):])
+                if (start_year is not None and year < start_year) or (end_year is not None and year > end_year):
+                    continue
+                yield name, year, os.path.join(self.path, city_dir, year_dir)
+
+    def _column_dtype(self, schema: Dict[str, Any], column: str) -> str:
+        if column == DATE_COLUMN:
+            return "int32"
+        dtype = schema["columns"][column]
+        return "int32" if dtype == "category" else dtype
+
+    def _open_columns(self, directory: str, columns: List[str], schema: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """Memory-map columns of one partition, cut to the shortest (torn appends)."""
+        arrays = {}
+        for column in columns:
+            path = os.path.join(directory, f"{column}.bin")
+            dtype = np.dtype(self._column_dtype(schema, column))
+            if not os.path.exists(path) or os.path.getsize(path) < dtype.itemsize:
+                arrays[column] = np.empty(0, dtype=dtype)
+            else:
+                arrays[column] = np.memmap(path, dtype=dtype, mode="r")
+        rows = min(len(a) for a in arrays.values())
+        return {name: array[:rows] for name, array in arrays.items()}
+
+    def _write_partition(self, directory: str, arrays: Dict[str, np.ndarray], mode: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        for column, values in arrays.items():
+            with open(os.path.join(directory, f"{column}.bin"), mode) as handle:
+                handle.write(np.ascontiguousarray(values).tobytes())
+
+    # writes -----------------------------------------------------------------
+
+    def append(self, frame: pd.DataFrame, city: str = None) -> int:
+        """Append rows; ``city`` is used when the frame has no city column."""
+        if frame.empty:
+            return 0
+        schema = self.schema()
+        arrays = self._encode(frame, schema)
+        if CITY_COLUMN in frame.columns:
+            cities = frame[CITY_COLUMN].fillna(DEFAULT_CITY).astype(str).str.lower().to_numpy()
+        else:
+            cities = np.full(len(frame), (city or DEFAULT_CITY).lower(), dtype=object)
+        years = (arrays[DATE_COLUMN].astype("datetime64[D]").astype("datetime64[Y]").astype(np.int64) + 1970)
+        self._write_schema(schema)
+
+        keys = pd.DataFrame({"city": cities, "year": years})
+        for (part_city, year), index in keys.groupby(["city", "year"]).indices.items():
+            order = index[np.argsort(arrays[DATE_COLUMN][index], kind="stable")]
+            part = {name: values[order] for name, values in arrays.items()}
+            self._append_partition(self._partition_dir(part_city, int(year)), part, schema)
+        return len(frame)
+
+    def _append_partition(self, directory: str, part: Dict[str, np.ndarray], schema: Dict[str, Any]) -> None:
+        existing = self._open_columns(directory, list(part), schema)
+        dates = existing[DATE_COLUMN]
+        if not len(dates) or part[DATE_COLUMN][0] >= dates[-1]:
+            # drop the tail of a torn append before adding to it
+            for column, values in part.items():
+                path = os.path.join(directory, f"{column}.bin")
+                if os.path.exists(path) and os.path.getsize(path) > len(dates) * values.dtype.itemsize:
+                    os.truncate(path, len(dates) * values.dtype.itemsize)
+            self._write_partition(directory, part, "ab")
+            return
+        # backfill: merge and rewrite just this partition
+        merged = {c: np.concatenate([np.asarray(existing[c]), part[c]]) for c in part}
+        order = np.argsort(merged[DATE_COLUMN], kind="stable")
+        self._rewrite_partition(directory, {c: values[order] for c, values in merged.items()})
+
+    def _rewrite_partition(self, directory: str, arrays: Dict[str, np.ndarray]) -> None:
+        arrays = {c: np.array(values) for c, values in arrays.items()}
+        tmp_dir = directory + ".tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        self._write_partition(tmp_dir, arrays, "wb")
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+
+    def drop(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    # reads ------------------------------------------------------------------
+
+    def cities(self) -> List[str]:
+        return sorted({city for city, _, _ in self._partitions()})
+
+    def read(
+        self,
+        columns: List[str] = None,
+        city: str = None,
+        start: str = None,
+        end: str = None,
+    ) -> pd.DataFrame:
+        """Rows with start <= date <= end (inclusive ISO dates), optionally for one city."""
+        schema = self.schema()
+        wanted = [c for c in (columns or list(schema["columns"])) if c not in (DATE_COLUMN, CITY_COLUMN)]
+        unknown = set(wanted) - set(schema["columns"])
+        if unknown:
+            raise KeyError(f"Unknown columns {sorted(unknown)} in {self.name}")
+        lo_day = _to_days([start])[0] if start else None
+        hi_day = _to_days([end])[0] if end else None
+        start_year = int(start[:4]) if start else None
+        end_year = int(end[:4]) if end else None
+
+        pieces: Dict[str, List[np.ndarray]] = {c: [] for c in [DATE_COLUMN, CITY_COLUMN] + wanted}
+        for part_city, _, directory in self._partitions(city, start_year, end_year):
+            dates = self._open_columns(directory, [DATE_COLUMN], schema)[DATE_COLUMN]
+            lo = 0 if lo_day is None else int(np.searchsorted(dates, lo_day, side="left"))
+            hi = len(dates) if hi_day is None else int(np.searchsorted(dates, hi_day, side="right"))
+            if hi <= lo:
+                continue
+            arrays = self._open_columns(directory, [DATE_COLUMN] + wanted, schema)
+            for column in [DATE_COLUMN] + wanted:
+                pieces[column].append(np.array(arrays[column][lo:hi]))
+            pieces[CITY_COLUMN].append(np.full(hi - lo, part_city, dtype=object))
+
+        data = {}
+        for column, chunks in pieces.items():
+            dtype = object if column == CITY_COLUMN else np.dtype(self._column_dtype(schema, column))
+            values = np.concatenate(chunks) if chunks else np.empty(0, dtype=dtype)
+            if column == DATE_COLUMN:
+                values = pd.to_datetime(values.astype("datetime64[D]"))
+            elif schema["columns"].get(column) == "category":
+                values = pd.Categorical.from_codes(values, schema["categories"][column])
+            data[column] = values
+        return pd.DataFrame(data)
+
+    def last_days(self, days: int, city: str = None, columns: List[str] = None, until: str = None) -> pd.DataFrame:
+        """The ``days`` days ending at ``until`` (default: latest stored date)."""
+        if until is None:
+            latest = self.latest_date(city)
+            if latest is None:
+                return self.read(columns, city=city)
+            until = latest
+        end = np.datetime64(until, "D")
+        return self.read(columns, city=city, start=str(end - (days - 1)), end=str(end))
+
+    def latest_date(self, city: str = None) -> Optional[str]:
+        schema = self.schema()
+        latest = None
+        for _, _, directory in self._partitions(city):
+            dates = self._open_columns(directory, [DATE_COLUMN], schema)[DATE_COLUMN]
+            if len(dates) and (latest is None or dates[-1] > latest):
+                latest = int(dates[-1])
+        return None if latest is None else str(_EPOCH + latest)
+
+
+class HistoryStore:
+    """Root directory holding one Dataset per source."""
+
+    def __init__(self, root: str = DEFAULT_STORE_ROOT):
+        self.root = root
+
+    def dataset(self, name: str) -> Dataset:
+        return Dataset(self.root, name)
+
+    def datasets(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root) if os.path.exists(os.path.join(self.root, d, SCHEMA_NAME)))
+
+    def ingest_csv(self, name: str, path: str, city: str = None, replace: bool = True, chunksize: int = 1_000_000) -> int:
+        """Load a CSV into dataset ``name`` in chunks; ``replace`` rebuilds it from scratch."""
+        dataset = self.dataset(name)
+        if replace:
+            dataset.drop()
+        rows = 0
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            rows += dataset.append(chunk, city=city)
+        return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Columnar hospital history store")
+    parser.add_argument("--root", default=DEFAULT_STORE_ROOT)
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="rebuild datasets from CSV files")
+    ingest.add_argument("--csv", help="CSV to ingest (default: every file in CSV_SOURCES)")
+    ingest.add_argument("--dataset", help="dataset name for --csv")
+    ingest.add_argument("--city", help="city for rows without a city column")
+    ingest.add_argument("--append", action="store_true", help="append instead of rebuilding")
+    ingest.add_argument(
+        "--source-dir", default=DEFAULT_SOURCE_DIR, help="directory holding the CSV_SOURCES files"
+    )
+    query = sub.add_parser("query", help="print a date range")
+    query.add_argument("dataset")
+    query.add_argument("--city")
+    query.add_argument("--days", type=int, default=365)
+    query.add_argument("--columns", help="comma-separated column list")
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.root)
+    if args.command == "ingest":
+        sources = {args.dataset or os.path.splitext(os.path.basename(args.csv))[0]: args.csv} if args.csv else {
+            name: os.path.join(args.source_dir, filename) for name, filename in CSV_SOURCES.items()
+        }
+        for name, path in sources.items():
+            rows = store.ingest_csv(name, path, city=args.city, replace=not args.append)
+            print(f"Ingested {rows} rows from {path} into {name} ({', '.join(store.dataset(name).cities())})")
+        return 0
+
+    columns = args.columns.split(",") if args.columns else None
+    print(store.dataset(args.dataset).last_days(args.days, city=args.city, columns=columns).to_string(max_rows=20))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,213 @@
+"""Shared outbound HTTP client used by every service in the project.
+
+One pooled ``requests.Session`` is shared per process so connections to the
+same host are kept alive and reused instead of paying a TCP/TLS handshake on
+every call. On top of the session this adds:
+
+- per-host connection pools (``HTTP_POOL_HOSTS`` hosts, ``HTTP_POOL_SIZE``
+  connections each)
+- bounded retries with exponential backoff and full jitter for connection
+  errors and retryable statuses (idempotent methods only, unless asked)
+- a per-destination concurrency limit so one slow upstream cannot absorb
+  every worker thread
+- an optional total ``deadline`` per call that bounds the slot wait, every
+  attempt and the backoff between them together
+
+Use the module-level ``get``/``post`` helpers as drop-in replacements for
+``requests.get``/``requests.post``. Async services use ``get_async_client()``,
+a shared ``httpx.AsyncClient`` with the same pool sizing.
+"""
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+RETRYABLE_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class HttpClient:
+    """Pooled keep-alive HTTP client with retries and per-host limits."""
+
+    def __init__(
+        self,
+        pool_hosts: int = 16,
+        pool_size: int = 32,
+        max_retries: int = 2,
+        backoff: float = 0.2,
+        max_backoff: float = 2.0,
+        per_host_limit: int = 32,
+        acquire_timeout: float = 10.0,
+    ):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.per_host_limit = per_host_limit
+        self.acquire_timeout = acquire_timeout
+        self._limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._limits_lock = threading.Lock()
+
+        self.session = requests.Session()
+        # Retries are handled here (with jitter), not by urllib3
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _limit_for(self, url: str) -> threading.BoundedSemaphore:
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        with self._limits_lock:
+            if host not in self._limits:
+                self._limits[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._limits[host]
+
+    def _backoff_delay(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(max_backoff, backoff * 2^attempt)]
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def request(
+        self, method: str, url: str, retry: Optional[bool] = None, deadline: Optional[float] = None, **kwargs
+    ) -> requests.Response:
+        """Send a request through the shared session.
+
+        Args:
+            method: HTTP method
+            url: Absolute URL
+            retry: Force retries on/off; defaults to on for idempotent methods
+            deadline: Total seconds for the call, including the wait for a
+                concurrency slot, all attempts and backoff; each attempt's
+                timeout is capped to what is left, and no retry is started
+                that could not finish in time
+            **kwargs: Passed through to ``requests.Session.request``
+
+        Raises:
+            requests.exceptions.RequestException: on the final failed attempt,
+                or Timeout if the host's concurrency slot can't be acquired
+                or the deadline has passed
+        """
+        method = method.upper()
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+        attempts = 1 + (self.max_retries if retry else 0)
+        expires = time.monotonic() + deadline if deadline is not None else None
+
+        acquire_timeout = self.acquire_timeout
+        if expires is not None:
+            acquire_timeout = max(0.0, min(acquire_timeout, expires - time.monotonic()))
+        limit = self._limit_for(url)
+        if not limit.acquire(timeout=acquire_timeout):
+            raise requests.exceptions.Timeout(f"concurrency limit reached for {url}")
+        try:
+            for attempt in range(attempts):
+                if expires is not None:
+                    remaining = expires - time.monotonic()
+                    if remaining <= 0:
+                        raise requests.exceptions.Timeout(f"deadline exceeded for {url}")
+                    kwargs["timeout"] = _cap_timeout(kwargs.get("timeout"), remaining)
+                delay = self._backoff_delay(attempt)
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    if self._last_attempt(attempt, attempts, expires, delay):
+                        raise
+                else:
+                    if response.status_code not in RETRYABLE_STATUSES or self._last_attempt(
+                        attempt, attempts, expires, delay
+                    ):
+                        return response
+                    response.close()
+                time.sleep(delay)
+        finally:
+            limit.release()
+
+    @staticmethod
+    def _last_attempt(attempt: int, attempts: int, expires: Optional[float], delay: float) -> bool:
+        if attempt == attempts - 1:
+            return True
+        # no point backing off past the deadline
+        return expires is not None and time.monotonic() + delay >= expires
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def _cap_timeout(
+    timeout: Union[None, float, Tuple[float, float]], remaining: float
+) -> Union[float, Tuple[float, float]]:
+    """Limit a requests timeout (seconds or a (connect, read) pair) to ``remaining``."""
+    if isinstance(timeout, tuple):
+        return tuple(remaining if part is None else min(part, remaining) for part in timeout)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """Return the process-wide client, creating it from the environment on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient(
+                    pool_hosts=int(os.getenv("HTTP_POOL_HOSTS", "16")),
+                    pool_size=int(os.getenv("HTTP_POOL_SIZE", "32")),
+                    max_retries=int(os.getenv("HTTP_MAX_RETRIES", "2")),
+                    backoff=float(os.getenv("HTTP_RETRY_BACKOFF", "0.2")),
+                    per_host_limit=int(os.getenv("HTTP_PER_HOST_LIMIT", "32")),
+                )
+    return _client
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    return get_client().request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return get_client().get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return get_client().post(url, **kwargs)
+
+
+_async_client = None
+
+
+def get_async_client():
+    """Return the process-wide ``httpx.AsyncClient`` for non-blocking callers.
+
+    Must be used from a single event loop (the service's); httpx is imported
+    lazily so sync-only services don't need it installed.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        import httpx
+
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("HTTP_POOL_HOSTS", "16")) * int(os.getenv("HTTP_POOL_SIZE", "32")),
+                max_keepalive_connections=int(os.getenv("HTTP_POOL_SIZE", "32")),
+            ),
+        )
+    return _async_client
+
+
+async def close_async_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
@@ -0,0 +1,89 @@
+"""In-process LRU memoization with per-entry TTL and code fingerprints.
+
+``LRUMemo`` keeps up to ``max_entries`` results in insertion/access order and
+drops the least recently used one when full. Entries can carry a TTL. Expired
+entries are dropped lazily on lookup.
+
+``file_fingerprint`` hashes the contents of a set of source/data files. Mixing
+it into cache keys makes cached results invalidate themselves when the rule
+code or reference data they were computed with changes.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+
+_MISSING = object()
+
+
+def file_fingerprint(paths: Iterable[str]) -> str:
+    """Short sha256 over the contents of ``paths`` (missing files count as empty)."""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode("utf-8"))
+        try:
+            with open(path, "rb") as handle:
+                digest.update(handle.read())
+        except FileNotFoundError:
+            pass
+    return digest.hexdigest()[:16]
+
+
+class LRUMemo:
+    """Thread-safe LRU mapping with optional per-entry expiry."""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None, count_miss: bool = True) -> Any:
+        """Cached value or ``default``.
+
+        ``count_miss=False`` is for fast-path probes whose miss is followed by
+        a counted ``get`` on the slow path.
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            if count_miss:
+                self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
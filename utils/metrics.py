@@ -0,0 +1,235 @@
+"""Minimal in-process metrics with Prometheus text exposition.
+
+Counters and histograms are created once at import time and looked up by
+label values on the hot path. Recording is a dict lookup plus a short
+locked update, cheap enough to leave on in production. ``render()``
+produces the Prometheus text format (version 0.0.4) for ``/metrics``
+endpoints. Values that already live elsewhere can be exposed through
+callbacks instead of being mirrored, such as the cache hit counters.
+
+Example::
+
+    from utils.metrics import Histogram
+
+    STAGE_SECONDS = Histogram("pipeline_stage_seconds", "Pipeline stage latency", ["stage"])
+
+    with STAGE_SECONDS.time("collect"):
+        ...
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[str, str] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: List = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if any(m.name == metric.name for m in self._metrics):
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Registry = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labelvalues -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labelvalues: str) -> "_Timer":
+        """Context manager observing the wall-clock duration of its block."""
+        return _Timer(self, labelvalues)
+
+    def count(self, *labelvalues: str) -> int:
+        series = self._series.get(labelvalues)
+        return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        for labelvalues, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, labelvalues, ("le", _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labelvalues", "started")
+
+    def __init__(self, histogram: Histogram, labelvalues: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labelvalues)
+        return False
+
+
+class CallbackMetric:
+    """Counter or gauge whose samples are read from a callback at scrape time.
+
+    The callback returns ``{labelvalues_tuple: value}``; failures are skipped
+    so a broken source never breaks the whole scrape.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str],
+        callback: Callable[[], Dict[Tuple[str, ...], float]],
+        kind: str = "gauge",
+        registry: Registry = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self.kind = kind
+        registry.register(self)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            samples = self.callback()
+        except Exception:
+            return lines
+        for labelvalues, value in sorted(samples.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+# Cache statistics are registered by the caches' owners as (hits, misses) sources
+_cache_sources: Dict[str, Callable[[], Tuple[float, float]]] = {}
+
+
+def register_cache(name: str, stats: Callable[[], Tuple[float, float]]) -> None:
+    """Expose a cache's (hits, misses) counters as cache_* metrics."""
+    _cache_sources[name] = stats
+
+
+def _cache_samples(pick: Callable[[float, float], float]) -> Dict[Tuple[str, ...], float]:
+    samples = {}
+    for name, stats in list(_cache_sources.items()):
+        try:
+            hits, misses = stats()
+        except Exception:
+            continue
+        samples[(name,)] = pick(hits, misses)
+    return samples
+
+
+CallbackMetric("cache_hits_total", "Cache hits", ["cache"], lambda: _cache_samples(lambda h, m: h), kind="counter")
+CallbackMetric("cache_misses_total", "Cache misses", ["cache"], lambda: _cache_samples(lambda h, m: m), kind="counter")
+CallbackMetric(
+    "cache_hit_ratio", "Cache hits / lookups since start", ["cache"],
+    lambda: _cache_samples(lambda h, m: round(h / (h + m), 4) if h + m else 0.0),
+)
+
+
+def render() -> str:
+    """Prometheus text exposition of every registered metric."""
+    return REGISTRY.render()
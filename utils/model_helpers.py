@@ -73,6 +73,48 @@ def predict_icu_load(base_icu: int, factors: Dict[str, float]) -> int:
     return int(base_icu * multiplier)
 
 
+def predict_opd_load_array(base_load, aqi, festival_score, disease_score, temperature) -> np.ndarray:
+    """Vectorized predict_opd_load over column arrays.
+    
+    Multiplier terms are accumulated in the same order as the scalar version
+    (adding 0.0 where a rule does not fire), so results are bit-identical.
+    """
+    aqi = np.asarray(aqi, dtype=np.float64)
+    temp = np.asarray(temperature, dtype=np.float64)
+    multiplier = np.ones(np.broadcast(base_load, aqi, festival_score, disease_score, temp).shape)
+    
+    multiplier += np.where(aqi > 200, 0.3, np.where(aqi > 150, 0.2, np.where(aqi > 100, 0.1, 0.0)))
+    multiplier += np.asarray(festival_score, dtype=np.float64) * 0.4
+    multiplier += np.asarray(disease_score, dtype=np.float64) * 0.3
+    multiplier += np.where((temp > 40) | (temp < 10), 0.15, 0.0)
+    
+    return np.trunc(np.asarray(base_load) * multiplier).astype(np.int64)
+
+
+def predict_emergency_load_array(base_emergency, aqi, festival_score, disease_score) -> np.ndarray:
+    """Vectorized predict_emergency_load over column arrays (bit-identical)."""
+    aqi = np.asarray(aqi, dtype=np.float64)
+    multiplier = np.ones(np.broadcast(base_emergency, aqi, festival_score, disease_score).shape)
+    
+    multiplier += np.asarray(festival_score, dtype=np.float64) * 0.5
+    multiplier += np.where(aqi > 200, 0.25, 0.0)
+    multiplier += np.asarray(disease_score, dtype=np.float64) * 0.4
+    
+    return np.trunc(np.asarray(base_emergency) * multiplier).astype(np.int64)
+
+
+def predict_icu_load_array(base_icu, aqi, disease_score) -> np.ndarray:
+    """Vectorized predict_icu_load over column arrays (bit-identical)."""
+    aqi = np.asarray(aqi, dtype=np.float64)
+    disease_score = np.asarray(disease_score, dtype=np.float64)
+    multiplier = np.ones(np.broadcast(base_icu, aqi, disease_score).shape)
+    
+    multiplier += np.where(aqi > 300, 0.4, np.where(aqi > 200, 0.2, 0.0))
+    multiplier += np.where(disease_score > 0.7, 0.5, np.where(disease_score > 0.4, 0.3, 0.0))
+    
+    return np.trunc(np.asarray(base_icu) * multiplier).astype(np.int64)
+
+
 def calculate_resource_requirements(loads: Dict[str, int]) -> Dict[str, Any]:
     """Calculate resource requirements based on predicted loads."""
     opd = loads.get('opd', 0)
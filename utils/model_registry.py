@@ -0,0 +1,240 @@
+"""Versioned model registry with memory-mapped loading and hot swap.
+
+Layout under the registry root (``models/registry`` by default)::
+
+    manifest.json           {"active": "<version>", "versions": {...}}
+    <version>/model.joblib  uncompressed joblib dump of the estimator
+
+Artifacts are dumped uncompressed so ``joblib.load(mmap_mode="r")`` can map
+plain NumPy arrays from the page cache. sklearn trees copy their node arrays
+when unpickled, so a forest loaded this way is still private to each worker;
+what workers share is the compact forest export (``utils.forest_eval``),
+whose .npy arrays are mapped read-only by every worker serving that version.
+Manifest updates are written to a temp file and renamed into place, so
+readers never see a half-written manifest.
+
+Services hold a ModelHandle: it loads lazily on first use, watches the
+manifest, and swaps in a newly promoted version without a restart while the
+old one keeps serving until the new one is ready.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+
+
+DEFAULT_REGISTRY_ROOT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "registry"
+)
+MANIFEST_NAME = "manifest.json"
+ARTIFACT_NAME = "model.joblib"
+
+
+class ModelUnavailableError(RuntimeError):
+    """Raised when no model version can be loaded."""
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class ModelRegistry:
+    """Directory of versioned model artifacts plus a manifest."""
+
+    def __init__(self, root: str = DEFAULT_REGISTRY_ROOT):
+        self.root = root
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        self._lock = threading.Lock()
+
+    def manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return {"active": None, "versions": {}}
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        _atomic_write(self.manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+
+    def versions(self) -> List[str]:
+        return sorted(self.manifest().get("versions", {}))
+
+    def active_version(self) -> Optional[str]:
+        return self.manifest().get("active")
+
+    def artifact_dir(self, version: str) -> str:
+        return os.path.join(self.root, version)
+
+    def publish(
+        self,
+        model: Any,
+        version: str = None,
+        metrics: Dict[str, Any] = None,
+        metadata: Dict[str, Any] = None,
+        promote: bool = False,
+    ) -> str:
+        """Store a model as a new version and optionally make it active."""
+        version = version or datetime.utcnow().strftime("v%Y%m%d%H%M%S%f")
+        directory = self.artifact_dir(version)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, f".{ARTIFACT_NAME}.tmp")
+        # no compression: compressed artifacts can't be memory-mapped
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, os.path.join(directory, ARTIFACT_NAME))
+
+        with self._lock:
+            manifest = self.manifest()
+            manifest.setdefault("versions", {})[version] = {
+                "artifact": f"{version}/{ARTIFACT_NAME}",
+                "created_at": datetime.utcnow().isoformat() + "Z",
+                "metrics": metrics or {},
+                "metadata": metadata or {},
+            }
+            if promote or not manifest.get("active"):
+                manifest["active"] = version
+            self._write_manifest(manifest)
+        return version
+
+    def promote(self, version: str) -> None:
+        """Atomically make ``version`` the active model."""
+        with self._lock:
+            manifest = self.manifest()
+            if version not in manifest.get("versions", {}):
+                raise KeyError(f"Unknown model version '{version}'")
+            manifest["active"] = version
+            manifest["promoted_at"] = datetime.utcnow().isoformat() + "Z"
+            self._write_manifest(manifest)
+
+    def load(self, version: str = None, mmap: bool = True) -> Tuple[str, Any]:
+        """Load ``version`` (default: active) and return (version, model)."""
+        manifest = self.manifest()
+        version = version or manifest.get("active")
+        if not version or version not in manifest.get("versions", {}):
+            raise ModelUnavailableError(f"No model version available in {self.root}")
+        path = os.path.join(self.root, manifest["versions"][version]["artifact"])
+        return version, joblib.load(path, mmap_mode="r" if mmap else None)
+
+
+class ModelHandle:
+    """Lazily loaded, hot-swappable reference to the active model.
+
+    Falls back to ``fallback_paths`` (plain pickle/joblib files) when the
+    registry has no active version. The manifest is re-checked at most every
+    ``refresh_seconds``; a changed active version is loaded by the first
+    caller that notices while other callers keep using the current model.
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        fallback_paths: List[str] = None,
+        refresh_seconds: float = 5.0,
+        mmap: bool = True,
+        adapter=None,
+    ):
+        self.registry = registry
+        self.fallback_paths = [p for p in (fallback_paths or []) if p]
+        self.refresh_seconds = refresh_seconds
+        self.mmap = mmap
+        # adapter(model, artifact_dir) -> served object; artifact_dir is None
+        # for fallback files. Used to serve a compiled form of the model.
+        self.adapter = adapter
+        self._current: Optional[Tuple[str, Any]] = None
+        self._checked_at = 0.0
+        self._manifest_mtime = None
+        self._load_lock = threading.Lock()
+        self.loaded_at: Optional[float] = None
+
+    def _load_active(self) -> Tuple[str, Any]:
+        version = self.registry.active_version()
+        if version:
+            version, loaded = self.registry.load(version, mmap=self.mmap)
+            return version, self._adapt(loaded, self.registry.artifact_dir(version))
+        for path in self.fallback_paths:
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                loaded = joblib.load(path, mmap_mode="r" if self.mmap else None)
+                return f"file:{path}", self._adapt(loaded, None)
+        raise ModelUnavailableError(
+            f"No active model in {self.registry.root} and no fallback file among {self.fallback_paths}"
+        )
+
+    def _adapt(self, loaded: Any, artifact_dir: Optional[str]) -> Any:
+        return self.adapter(loaded, artifact_dir) if self.adapter is not None else loaded
+
+    def _read_manifest_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.registry.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def get(self) -> Any:
+        """Return the current model, loading or hot-swapping it if needed."""
+        now = time.monotonic()
+        if self._current is not None and now - self._checked_at < self.refresh_seconds:
+            return self._current[1]
+
+        # someone else is loading: keep serving the current model meanwhile
+        blocking = self._current is None
+        if not self._load_lock.acquire(blocking=blocking):
+            return self._current[1]
+        try:
+            if self._current is not None and time.monotonic() - self._checked_at < self.refresh_seconds:
+                return self._current[1]
+            self._checked_at = time.monotonic()
+            # read before loading: a manifest written during the load is
+            # picked up on the next check
+            mtime = self._read_manifest_mtime()
+            if self._current is None or mtime != self._manifest_mtime:
+                try:
+                    new = self._load_active()
+                except Exception as e:
+                    if self._current is None:
+                        raise
+                    # mtime stays unrecorded, so the next check retries
+                    print(f"Model reload failed, keeping {self._current[0]}: {e}")
+                    return self._current[1]
+                self._manifest_mtime = mtime
+                if self._current is None or new[0] != self._current[0]:
+                    self._current = new
+                    self.loaded_at = time.time()
+            return self._current[1]
+        finally:
+            self._load_lock.release()
+
+    def reload(self) -> str:
+        """Force a manifest check now and return the serving version."""
+        with self._load_lock:
+            # matches no stat result, not even a missing manifest
+            self._manifest_mtime = -1
+            self._checked_at = 0.0
+        self.get()
+        return self.version
+
+    @property
+    def version(self) -> Optional[str]:
+        return self._current[0] if self._current else None
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "registry": self.registry.root,
+            "active_in_manifest": self.registry.active_version(),
+        }
@@ -0,0 +1,183 @@
+"""Circuit breakers and hedged requests for calls between services.
+
+A CircuitBreaker tracks consecutive failures of one downstream replica and
+rejects calls while it is open, so an unhealthy service fails fast instead
+of tying up callers until their timeouts. A HedgedEndpoint sends a request
+to a healthy replica (rotating the first choice between calls) and, if no
+answer arrives within the hedge delay, races a second copy against it on the
+next replica; the first successful response wins and the others are
+cancelled.
+
+Both are meant for use from a single asyncio event loop.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised when every replica of an endpoint has an open circuit."""
+
+
+class UpstreamError(Exception):
+    """Raised when a replica answers with a server error."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker (closed -> open -> half-open)."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go through; half-open admits a single trial call."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Give back a half-open trial slot when the call was cancelled."""
+        self._trial_in_flight = False
+
+
+class HedgedEndpoint:
+    """A downstream endpoint served by one or more replicas."""
+
+    def __init__(
+        self,
+        name: str,
+        urls: List[str],
+        hedge_delay: float = 0.3,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+    ):
+        if not urls:
+            raise ValueError(f"{name}: at least one replica URL is required")
+        self.name = name
+        self.urls = list(urls)
+        self.hedge_delay = hedge_delay
+        self.breakers: Dict[str, CircuitBreaker] = {
+            url: CircuitBreaker(failure_threshold, reset_timeout) for url in self.urls
+        }
+        self.hedges_sent = 0
+        # index of the replica tried first by the next call (round-robin)
+        self._next = 0
+
+    async def _attempt(self, client, url: str, payload: Any, timeout: float):
+        breaker = self.breakers[url]
+        try:
+            response = await client.post(url, json=payload, timeout=timeout)
+        except asyncio.CancelledError:
+            # post() settles the breaker of abandoned attempts
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            breaker.record_failure()
+            raise UpstreamError(f"{url} returned {response.status_code}: {response.text[:200]}")
+        breaker.record_success()
+        return response
+
+    async def post(self, client, payload: Any, deadline: float):
+        """POST ``payload``, hedging across replicas, within ``deadline`` seconds.
+
+        Returns the first non-5xx response. Raises CircuitOpenError when no
+        replica is available, asyncio.TimeoutError when the deadline passes,
+        or the last replica error when every attempt failed.
+
+        Attempts cancelled because the deadline passed count as failures of
+        their replica, so hanging replicas open their circuits. Attempts
+        cancelled because another replica answered first are not failures.
+        """
+        loop = asyncio.get_running_loop()
+        expires = loop.time() + deadline
+        # spread first attempts over the replicas instead of always loading urls[0]
+        start = self._next
+        self._next = (start + 1) % len(self.urls)
+        candidates = iter(self.urls[start:] + self.urls[:start])
+        pending = set()
+        launched: Dict[asyncio.Future, str] = {}
+        last_error: Optional[BaseException] = None
+        # "deadline", "won" or None (caller went away)
+        outcome: Optional[str] = None
+
+        def launch_next() -> bool:
+            for url in candidates:
+                if self.breakers[url].allow():
+                    remaining = max(0.001, expires - loop.time())
+                    task = asyncio.ensure_future(self._attempt(client, url, payload, remaining))
+                    pending.add(task)
+                    launched[task] = url
+                    return True
+            return False
+
+        if not launch_next():
+            raise CircuitOpenError(f"{self.name}: all replicas have open circuits")
+
+        try:
+            while pending:
+                remaining = expires - loop.time()
+                if remaining <= 0:
+                    outcome = "deadline"
+                    raise asyncio.TimeoutError(f"{self.name}: deadline of {deadline}s exceeded")
+                done, _ = await asyncio.wait(
+                    pending, timeout=min(self.hedge_delay, remaining), return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    pending.discard(task)
+                    if task.exception() is None:
+                        outcome = "won"
+                        return task.result()
+                    last_error = task.exception()
+                if not done:
+                    # slow first response: race a hedge on the next replica
+                    if launch_next():
+                        self.hedges_sent += 1
+                elif not pending:
+                    # every in-flight attempt failed: fail over to the next replica
+                    launch_next()
+        finally:
+            for task in pending:
+                task.cancel()
+                breaker = self.breakers[launched[task]]
+                if outcome == "deadline":
+                    breaker.record_failure()
+                else:
+                    # lost the race to another replica, or the caller was cancelled
+                    breaker.release()
+
+        raise last_error or CircuitOpenError(f"{self.name}: no replica available")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "replicas": {url: breaker.state for url, breaker in self.breakers.items()},
+            "hedges_sent": self.hedges_sent,
+        }
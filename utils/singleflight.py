@@ -0,0 +1,112 @@
+"""Single-flight call coalescing.
+
+Concurrent calls with the same key share one execution. The first caller
+(the leader) runs the function, and callers that arrive while it is running
+wait for it and receive the same result, or the same exception. Nothing is
+cached: once the call finishes, the next caller for that key starts a new
+one. Results are shared objects, so callers must not mutate them.
+
+``SingleFlight`` is for threads, and ``AsyncSingleFlight`` for coroutines on
+one event loop. Both count leader and coalesced calls in
+``singleflight_calls_total{group,role}``.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from utils.metrics import Counter
+
+
+CALLS = Counter("singleflight_calls_total", "Single-flight calls by group and role", ["group", "role"])
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread-safe coalescing of concurrent identical calls."""
+
+    def __init__(self, group: str):
+        self.group = group
+        self.leaders = 0
+        self.coalesced = 0
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Return ``fn(*args, **kwargs)``, sharing the run with concurrent callers of ``key``."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        CALLS.inc(self.group, "leader" if leader else "coalesced")
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> Dict[str, Any]:
+        return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """Coalescing of concurrent identical awaitables on an event loop.
+
+    The shared work runs as its own task, so a caller that is cancelled (for
+    example, a client that disconnects) does not cancel it for the others.
+    """
+
+    def __init__(self, group: str):
+        self.group = group
+        self.leaders = 0
+        self.coalesced = 0
+        self._tasks: Dict[Tuple[int, Hashable], asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Await ``fn(*args, **kwargs)``, sharing it with concurrent callers of ``key``."""
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        task = self._tasks.get(task_key)
+        if task is None:
+            task = loop.create_task(fn(*args, **kwargs))
+            self._tasks[task_key] = task
+            task.add_done_callback(lambda done: self._finished(task_key, done))
+            self.leaders += 1
+            CALLS.inc(self.group, "leader")
+        else:
+            self.coalesced += 1
+            CALLS.inc(self.group, "coalesced")
+        return await asyncio.shield(task)
+
+    def _finished(self, task_key: Tuple[int, Hashable], task: asyncio.Task) -> None:
+        if self._tasks.get(task_key) is task:
+            del self._tasks[task_key]
+        if not task.cancelled():
+            # mark the exception retrieved in case every caller went away
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._tasks)}